@@ -24,7 +24,9 @@ from app.models.models import (
     DocumentType, Document, ItemType, Item, TransactionType,
     Transaction, ReligiousDocumentBase, BaptismDocument,
     BurialDocument, MarriageDocument, MembershipDocument,
-    AuditLog
+    AuditLog, AuditOutbox, SerialCounter, Person, PersonDocument,
+    ImportJob, ImportRowError, ReferenceVersion, StockMovement, OverdueDigest,
+    Reservation
 )
 
 target_metadata = Base.metadata
@@ -0,0 +1,54 @@
+"""add serial counters
+
+Revision ID: 6b1e2f3a9c10
+Revises: aeb1b0643564
+Create Date: 2026-10-18 09:12:41.207113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1e2f3a9c10'
+down_revision: Union[str, None] = 'aeb1b0643564'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SERIAL_TABLES = [
+    'items',
+    'documents',
+    'membership_documents',
+    'baptism_documents',
+    'burial_documents',
+    'marriage_documents',
+]
+
+
+def upgrade() -> None:
+    op.create_table('serial_counters',
+        sa.Column('prefix', sa.String(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('prefix', 'year')
+    )
+
+    # Continue every existing PREFIX-YEAR-SEQUENCE series where it left off
+    for table in SERIAL_TABLES:
+        op.execute(f"""
+            INSERT INTO serial_counters (prefix, year, value)
+            SELECT split_part(serial_number, '-', 1),
+                   split_part(serial_number, '-', 2)::int,
+                   max(split_part(serial_number, '-', 3)::int)
+            FROM {table}
+            WHERE serial_number ~ '^[^-]+-[0-9]{{4}}-[0-9]+$'
+            GROUP BY 1, 2
+            ON CONFLICT (prefix, year)
+            DO UPDATE SET value = GREATEST(serial_counters.value, EXCLUDED.value)
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('serial_counters')
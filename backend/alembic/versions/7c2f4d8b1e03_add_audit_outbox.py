@@ -0,0 +1,31 @@
+"""add audit outbox
+
+Revision ID: 7c2f4d8b1e03
+Revises: 6b1e2f3a9c10
+Create Date: 2026-10-18 10:04:17.582930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2f4d8b1e03'
+down_revision: Union[str, None] = '6b1e2f3a9c10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('audit_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('payload', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('audit_outbox')
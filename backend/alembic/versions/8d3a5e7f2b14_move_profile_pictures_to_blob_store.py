@@ -0,0 +1,93 @@
+"""move profile pictures to blob store
+
+Revision ID: 8d3a5e7f2b14
+Revises: 7c2f4d8b1e03
+Create Date: 2026-10-18 11:26:53.104472
+
+"""
+from typing import Optional, Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3a5e7f2b14'
+down_revision: Union[str, None] = '7c2f4d8b1e03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copies of the blob store rules when this revision was written, so
+# replaying it doesn't depend on app code that may change later
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', 'blobs')
+MAX_BYTES = int(os.getenv('PROFILE_PICTURE_MAX_BYTES', 5 * 1024 * 1024))
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+# Users read per query; each picture may be several MB
+BATCH_SIZE = 20
+
+def decode_picture(value: str) -> Optional[bytes]:
+    """Bytes of a base64 string or ``data:...;base64,`` URL, None if it is neither"""
+    if value.startswith("data:"):
+        value = value.split(",", 1)[-1]
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+def write_blob(data: bytes) -> str:
+    """Store ``data`` at <BLOB_STORE_DIR>/<aa>/<sha256> and return the digest"""
+    digest = hashlib.sha256(data).hexdigest()
+    target = os.path.join(BLOB_STORE_DIR, digest[:2], digest)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=BLOB_STORE_DIR, prefix=".upload-")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, target)
+    return digest
+
+def upgrade() -> None:
+    connection = op.get_bind()
+
+    # Replace inline base64 images with their blob reference; anything that
+    # is not base64 (e.g. an external URL) is left untouched. Users are read
+    # in id order, BATCH_SIZE at a time, and each batch is one executemany.
+    users = table('users',
+        column('id', sa.Integer),
+        column('profile_picture', sa.String)
+    )
+    update = (
+        users.update()
+        .where(users.c.id == sa.bindparam('user_id'))
+        .values(profile_picture=sa.bindparam('digest'))
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(users)
+            .where(users.c.id > last_id, users.c.profile_picture.isnot(None))
+            .order_by(users.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        moved = []
+        for user in rows:
+            if DIGEST_RE.match(user.profile_picture):
+                continue
+            data = decode_picture(user.profile_picture)
+            if data is None or len(data) > MAX_BYTES:
+                continue
+            moved.append({'user_id': user.id, 'digest': write_blob(data)})
+        if moved:
+            connection.execute(update, moved)
+        last_id = rows[-1].id
+
+def downgrade() -> None:
+    # References stay valid; the blobs are still served from the store
+    pass
@@ -0,0 +1,67 @@
+"""add trigram search indexes
+
+Revision ID: 9e4b6c1d3f25
+Revises: 8d3a5e7f2b14
+Create Date: 2026-10-18 12:41:09.516280
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b6c1d3f25'
+down_revision: Union[str, None] = '8d3a5e7f2b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NAME_FIELDS = [
+    'english_name',
+    'english_christian_name',
+    'english_father_name',
+    'english_mother_name',
+    'amharic_name',
+    'amharic_christian_name',
+    'amharic_father_name',
+    'amharic_mother_name',
+]
+BRIDE_FIELDS = [
+    'english_bride_name',
+    'english_bride_christian_name',
+    'english_bride_father_name',
+    'english_bride_mother_name',
+    'amharic_bride_name',
+    'amharic_bride_christian_name',
+    'amharic_bride_father_name',
+    'amharic_bride_mother_name',
+]
+SEARCH_TABLES = {
+    'membership_documents': NAME_FIELDS,
+    'baptism_documents': NAME_FIELDS,
+    'burial_documents': NAME_FIELDS,
+    'marriage_documents': NAME_FIELDS + BRIDE_FIELDS,
+}
+
+
+def search_expression(fields):
+    # Must match app.db.search.search_expression for the planner to use it
+    joined = " || ' ' || ".join(f"coalesce({field}, '')" for field in fields)
+    return f"lower({joined})"
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, fields in SEARCH_TABLES.items():
+        op.execute(
+            f"CREATE INDEX ix_{table}_search_trgm ON {table} "
+            f"USING gin (({search_expression(fields)}) gin_trgm_ops)"
+        )
+    # Lets the existing name ILIKE '%q%' document search use an index
+    op.execute("CREATE INDEX ix_documents_name_trgm ON documents USING gin (name gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_documents_name_trgm")
+    for table in SEARCH_TABLES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_trgm")
@@ -0,0 +1,162 @@
+"""add phonetic name keys
+
+Revision ID: a1c7e9d2b4f6
+Revises: 9e4b6c1d3f25
+Create Date: 2026-10-18 13:58:30.724615
+
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import column, table
+import re
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c7e9d2b4f6'
+down_revision: Union[str, None] = '9e4b6c1d3f25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_TABLES = [
+    'membership_documents',
+    'baptism_documents',
+    'burial_documents',
+    'marriage_documents',
+]
+
+# Frozen copies of app.core.transliteration and app.db.search when this
+# revision was written, so replaying it doesn't depend on app code that may
+# change later
+NAME_FIELDS = [
+    'english_name',
+    'english_christian_name',
+    'english_father_name',
+    'english_mother_name',
+    'amharic_name',
+    'amharic_christian_name',
+    'amharic_father_name',
+    'amharic_mother_name',
+]
+BRIDE_FIELDS = [
+    'english_bride_name',
+    'english_bride_christian_name',
+    'english_bride_father_name',
+    'english_bride_mother_name',
+    'amharic_bride_name',
+    'amharic_bride_christian_name',
+    'amharic_bride_father_name',
+    'amharic_bride_mother_name',
+]
+
+FIDEL_ROWS = {
+    0x1200: "h", 0x1208: "l", 0x1210: "h", 0x1218: "m", 0x1220: "s",
+    0x1228: "r", 0x1230: "s", 0x1238: "sh", 0x1240: "q", 0x1260: "b",
+    0x1268: "v", 0x1270: "t", 0x1278: "ch", 0x1280: "h", 0x1290: "n",
+    0x1298: "ny", 0x12A0: "", 0x12A8: "k", 0x12B8: "kh", 0x12C8: "w",
+    0x12D0: "", 0x12D8: "z", 0x12E0: "zh", 0x12E8: "y", 0x12F0: "d",
+    0x1300: "j", 0x1308: "g", 0x1320: "t", 0x1328: "ch", 0x1330: "p",
+    0x1338: "ts", 0x1340: "ts", 0x1348: "f", 0x1350: "p",
+}
+FIRST_ORDER_A = {0x1200, 0x1210, 0x1280, 0x12A0, 0x12D0}
+VOWEL_ORDERS = ("e", "u", "i", "a", "e", "", "o", "wa")
+PUNCTUATION = {"፡": " ", "።": " ", "፣": " ", "፤": " ", "፥": " ", "፦": " ", "፧": " ", "፨": " "}
+LETTER_FOLDS = str.maketrans({"q": "k", "v": "b"})
+DIGRAPH_FOLDS = [
+    ("ts", "q"), ("sh", "x"), ("ch", "c"), ("zh", "j"),
+    ("ny", "n"), ("gn", "n"), ("ph", "f"), ("th", "t"), ("kh", "h"),
+]
+NON_LETTERS = re.compile(r"[^a-z]")
+WEAK_LETTERS = re.compile(r"[aeiouyw]")
+REPEATS = re.compile(r"(.)\1+")
+
+
+def fidel_table() -> Dict[int, str]:
+    mapping = {ord(mark): latin for mark, latin in PUNCTUATION.items()}
+    for base, consonant in FIDEL_ROWS.items():
+        for order, vowel in enumerate(VOWEL_ORDERS):
+            if order == 0 and base in FIRST_ORDER_A:
+                vowel = "a"
+            if not consonant and order in (5, 7):
+                vowel = "e" if order == 5 else "a"
+            mapping[base + order] = consonant + vowel
+    return mapping
+
+
+FIDEL_TO_LATIN = fidel_table()
+
+
+@lru_cache(maxsize=65536)
+def phonetic_key(word: str) -> str:
+    latin = NON_LETTERS.sub("", word.translate(FIDEL_TO_LATIN).lower()).translate(LETTER_FOLDS)
+    if not latin:
+        return ""
+    for variant, folded in DIGRAPH_FOLDS:
+        latin = latin.replace(variant, folded)
+    head = "a" if latin[0] in "aeiou" else latin[0]
+    return REPEATS.sub(r"\1", head + WEAK_LETTERS.sub("", latin[1:]))
+
+
+def field_keys(row, fields: List[str]) -> List[str]:
+    """Sorted ``field:key`` entries of a row, the script prefix dropped from the field"""
+    keys = set()
+    for field in fields:
+        value: Optional[str] = row[field]
+        if value:
+            name = field.split("_", 1)[1]
+            for word in value.translate(FIDEL_TO_LATIN).split():
+                key = phonetic_key(word)
+                if key:
+                    keys.add(f"{name}:{key}")
+    return sorted(keys)
+
+
+def backfill_name_keys(connection, batch_size: int = 1000) -> None:
+    """Compute name_keys of every row in id order, one UPDATE per batch"""
+    for table_name in SEARCH_TABLES:
+        fields = NAME_FIELDS + BRIDE_FIELDS if table_name == 'marriage_documents' else NAME_FIELDS
+        documents = table(table_name,
+            column('id', sa.Integer),
+            column('name_keys', postgresql.ARRAY(sa.String)),
+            column('updated_at', sa.DateTime),
+            *(column(field, sa.String) for field in fields)
+        )
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                sa.select(documents.c.id, *(documents.c[field] for field in fields))
+                .where(documents.c.id > last_id)
+                .order_by(documents.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            batch = sa.values(
+                column('id', sa.Integer), column('name_keys', postgresql.ARRAY(sa.String)), name='batch'
+            ).data([(row['id'], field_keys(row, fields)) for row in rows])
+            connection.execute(
+                documents.update()
+                .where(documents.c.id == batch.c.id)
+                .values(name_keys=batch.c.name_keys, updated_at=documents.c.updated_at)
+            )
+            last_id = rows[-1]['id']
+
+
+def upgrade() -> None:
+    for table in SEARCH_TABLES:
+        op.add_column(table, sa.Column('name_keys', postgresql.ARRAY(sa.String()), nullable=True))
+
+    # Compute the keys in bulk before indexing them
+    backfill_name_keys(op.get_bind())
+
+    for table in SEARCH_TABLES:
+        op.create_index(f'ix_{table}_name_keys', table, ['name_keys'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    for table in SEARCH_TABLES:
+        op.drop_index(f'ix_{table}_name_keys', table_name=table)
+        op.drop_column(table, 'name_keys')
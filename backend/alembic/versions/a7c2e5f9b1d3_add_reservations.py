@@ -0,0 +1,48 @@
+"""add reservations
+
+Revision ID: a7c2e5f9b1d3
+Revises: f3b9d6e2a8c4
+Create Date: 2026-10-18 11:26:52.917340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e5f9b1d3'
+down_revision: Union[str, None] = 'f3b9d6e2a8c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+transaction_status = postgresql.ENUM('pending', 'approved', 'rejected', name='transaction_status', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table('reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('period', postgresql.TSRANGE(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', transaction_status, server_default='pending', nullable=False),
+        sa.Column('requested_by_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.CheckConstraint('quantity > 0', name='ck_reservations_quantity'),
+        sa.CheckConstraint('NOT isempty(period) AND NOT lower_inf(period) AND NOT upper_inf(period)',
+                           name='ck_reservations_period'),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['requested_by_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_reservations_item_id'), 'reservations', ['item_id'], unique=False)
+    op.create_index('ix_reservations_period', 'reservations', ['period'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservations_period', table_name='reservations', postgresql_using='gist')
+    op.drop_index(op.f('ix_reservations_item_id'), table_name='reservations')
+    op.drop_table('reservations')
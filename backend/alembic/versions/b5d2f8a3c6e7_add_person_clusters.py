@@ -0,0 +1,44 @@
+"""add person clusters
+
+Revision ID: b5d2f8a3c6e7
+Revises: a1c7e9d2b4f6
+Create Date: 2026-10-18 15:12:47.380261
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d2f8a3c6e7'
+down_revision: Union[str, None] = 'a1c7e9d2b4f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('persons',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('person_documents',
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('person_id', sa.Integer(), nullable=False),
+        sa.Column('block_key', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['person_id'], ['persons.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('kind', 'document_id', 'role')
+    )
+    op.create_index(op.f('ix_person_documents_person_id'), 'person_documents', ['person_id'], unique=False)
+    op.create_index(op.f('ix_person_documents_block_key'), 'person_documents', ['block_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_person_documents_block_key'), table_name='person_documents')
+    op.drop_index(op.f('ix_person_documents_person_id'), table_name='person_documents')
+    op.drop_table('person_documents')
+    op.drop_table('persons')
@@ -0,0 +1,29 @@
+"""add schedule calendar indexes
+
+Revision ID: b8d4f1a6c3e9
+Revises: a7c2e5f9b1d3
+Create Date: 2026-10-18 13:05:37.481926
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f1a6c3e9'
+down_revision: Union[str, None] = 'a7c2e5f9b1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_schedules_date', 'schedules', ['date'], unique=False)
+    op.create_index('ix_schedules_user_id_date', 'schedules', ['user_id', 'date'], unique=False)
+    op.create_index(op.f('ix_schedules_shift_id'), 'schedules', ['shift_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_schedules_shift_id'), table_name='schedules')
+    op.drop_index('ix_schedules_user_id_date', table_name='schedules')
+    op.drop_index('ix_schedules_date', table_name='schedules')
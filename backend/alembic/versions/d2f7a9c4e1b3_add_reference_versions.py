@@ -0,0 +1,30 @@
+"""add reference versions
+
+Revision ID: d2f7a9c4e1b3
+Revises: c8e1f4a7d2b9
+Create Date: 2026-10-18 20:05:37.204113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f7a9c4e1b3'
+down_revision: Union[str, None] = 'c8e1f4a7d2b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('reference_versions',
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('reference_versions')
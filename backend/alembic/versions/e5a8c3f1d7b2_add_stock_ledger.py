@@ -0,0 +1,68 @@
+"""add stock ledger
+
+Revision ID: e5a8c3f1d7b2
+Revises: d2f7a9c4e1b3
+Create Date: 2026-10-18 21:12:48.630518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8c3f1d7b2'
+down_revision: Union[str, None] = 'd2f7a9c4e1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE items SET quantity = 0 WHERE quantity IS NULL")
+    op.alter_column('items', 'quantity', existing_type=sa.Integer(), nullable=False)
+    op.add_column('items', sa.Column('checked_out', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('items', sa.Column('overdue', sa.Integer(), server_default='0', nullable=False))
+
+    op.add_column('transactions', sa.Column('item_id', sa.Integer(), nullable=True))
+    op.add_column('transactions', sa.Column('due_date', sa.DateTime(), nullable=True))
+    op.add_column('transactions', sa.Column('overdue', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.create_foreign_key('transactions_item_id_fkey', 'transactions', 'items', ['item_id'], ['id'], ondelete='SET NULL')
+    op.create_index(op.f('ix_transactions_item_id'), 'transactions', ['item_id'], unique=False)
+
+    op.create_table('stock_movements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('on_hand', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_movements_item_id'), 'stock_movements', ['item_id'], unique=False)
+    op.create_index(op.f('ix_stock_movements_transaction_id'), 'stock_movements', ['transaction_id'], unique=False)
+
+    # Existing stock enters the ledger as each item's opening balance
+    op.execute("""
+        INSERT INTO stock_movements (item_id, kind, quantity, on_hand)
+        SELECT id, 'opening', quantity, quantity FROM items ORDER BY id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_stock_movements_transaction_id'), table_name='stock_movements')
+    op.drop_index(op.f('ix_stock_movements_item_id'), table_name='stock_movements')
+    op.drop_table('stock_movements')
+    op.drop_index(op.f('ix_transactions_item_id'), table_name='transactions')
+    op.drop_constraint('transactions_item_id_fkey', 'transactions', type_='foreignkey')
+    op.drop_column('transactions', 'overdue')
+    op.drop_column('transactions', 'due_date')
+    op.drop_column('transactions', 'item_id')
+    op.drop_column('items', 'overdue')
+    op.drop_column('items', 'checked_out')
+    op.alter_column('items', 'quantity', existing_type=sa.Integer(), nullable=True)
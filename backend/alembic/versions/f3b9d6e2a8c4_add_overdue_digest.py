@@ -0,0 +1,58 @@
+"""add transaction status enum, open loan index and overdue digest
+
+Revision ID: f3b9d6e2a8c4
+Revises: e5a8c3f1d7b2
+Create Date: 2026-10-18 09:41:06.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d6e2a8c4'
+down_revision: Union[str, None] = 'e5a8c3f1d7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+transaction_status = postgresql.ENUM('pending', 'approved', 'rejected', name='transaction_status', create_type=False)
+
+
+def upgrade() -> None:
+    # Free-text statuses were written as PENDING as well as pending. Returns
+    # are told by date_returned, so a returned loan was approved; anything
+    # else unrecognised goes back to pending for someone to decide
+    op.execute("UPDATE transactions SET status = lower(trim(status)) WHERE status IS NOT NULL")
+    op.execute("UPDATE transactions SET status = 'approved' WHERE status = 'returned'")
+    op.execute("""
+        UPDATE transactions SET status = 'pending'
+        WHERE status IS NULL OR status NOT IN ('pending', 'approved', 'rejected')
+    """)
+    transaction_status.create(op.get_bind())
+    op.alter_column('transactions', 'status', existing_type=sa.String(), type_=transaction_status,
+                    postgresql_using='status::transaction_status', nullable=False, server_default='pending')
+
+    op.create_index('ix_transactions_open_due_date', 'transactions', ['due_date'], unique=False,
+                    postgresql_where=sa.text('date_returned IS NULL'))
+
+    op.create_table('overdue_digest',
+        sa.Column('requested_by_id', sa.Integer(), nullable=False),
+        sa.Column('loans', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('oldest_due_date', sa.DateTime(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['requested_by_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('requested_by_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('overdue_digest')
+    op.drop_index('ix_transactions_open_due_date', table_name='transactions',
+                  postgresql_where=sa.text('date_returned IS NULL'))
+    op.alter_column('transactions', 'status', existing_type=transaction_status, type_=sa.String(),
+                    postgresql_using='status::text', nullable=True, server_default=None)
+    transaction_status.drop(op.get_bind())
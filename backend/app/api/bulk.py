@@ -0,0 +1,151 @@
+from typing import Any, Callable, Dict, List, Optional, Type
+import json
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..core.audit import record_bulk_create
+from ..core.config import settings
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Request body of the bulk endpoints, for the OpenAPI schema
+BULK_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+def too_many_rows() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ROWS} rows per request")
+
+async def read_rows(request: Request) -> List[Any]:
+    """
+    Rows of a bulk request body.
+
+    The body is either a JSON array or, with an NDJSON content type, one JSON
+    object per line, which is parsed as it streams in.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in NDJSON_TYPES:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array")
+        if len(rows) > settings.BULK_MAX_ROWS:
+            raise too_many_rows()
+        return rows
+
+    rows, buffer = [], b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            rows.append(parse_line(line, len(rows)))
+        if len(rows) > settings.BULK_MAX_ROWS:
+            raise too_many_rows()
+    rows.append(parse_line(buffer, len(rows)))
+    return [row for row in rows if row is not None]
+
+def parse_line(line: bytes, index: int) -> Optional[Any]:
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Line {index + 1} is not valid JSON")
+
+def error(index: int, errors: List[Any]) -> Dict[str, Any]:
+    return {"index": index, "status": "error", "errors": errors}
+
+def missing_references(db: Session, table, rows: List[Dict[str, Any]]) -> Dict[int, List[str]]:
+    """
+    Rows referencing rows that don't exist, checked with one query per
+    foreign key so a bad reference fails its row instead of its chunk.
+    """
+    problems: Dict[int, List[str]] = {}
+    for fk in table.foreign_keys:
+        column = fk.parent.key
+        wanted = {row[column] for row in rows if row.get(column) is not None}
+        if not wanted:
+            continue
+        target = fk.column
+        found = set(db.execute(select(target).where(target.in_(wanted))).scalars())
+        for position, row in enumerate(rows):
+            if row.get(column) is not None and row[column] not in found:
+                problems.setdefault(position, []).append(f"{column} {row[column]} does not exist")
+    return problems
+
+def chunked(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def bulk_create(db: Session, model, schema: Type[BaseModel], payload: List[Any],
+                prepare: Callable[[Session, List[Dict[str, Any]]], None],
+                finish: Optional[Callable[[Session, List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+    """
+    Validate ``payload`` against ``schema`` and insert the valid rows.
+
+    Rows are inserted ``BULK_CHUNK_SIZE`` at a time, each chunk in its own
+    transaction with one multi-row INSERT and one batch of audit records.
+    ``prepare`` fills in server-side values (serial numbers, dates) for a
+    chunk in place and ``finish`` writes what depends on the new ids, in
+    the chunk's transaction. A failing chunk is rolled back and reported
+    row by row; the chunks before it stay committed.
+    """
+    table = model.__table__
+    columns = set(table.c.keys())
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payload)
+
+    valid = []
+    for index, row in enumerate(payload):
+        try:
+            values = schema.model_validate(row).model_dump()
+        except ValidationError as e:
+            results[index] = error(index, e.errors(include_url=False, include_context=False))
+            continue
+        valid.append((index, {key: value for key, value in values.items() if key in columns}))
+
+    problems = missing_references(db, table, [values for _, values in valid])
+    for position, messages in problems.items():
+        index = valid[position][0]
+        results[index] = error(index, messages)
+    valid = [entry for position, entry in enumerate(valid) if position not in problems]
+
+    returning = [table.c.id] + ([table.c.serial_number] if "serial_number" in columns else [])
+    for chunk in chunked(valid, settings.BULK_CHUNK_SIZE):
+        rows = [values for _, values in chunk]
+        try:
+            prepare(db, rows)
+            inserted = db.execute(
+                insert(table).returning(*returning, sort_by_parameter_order=True), rows
+            ).all()
+            for row, created in zip(rows, inserted):
+                row.update(created._mapping)
+            if finish is not None:
+                finish(db, rows)
+            record_bulk_create(db, table.name, rows)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            message = str(getattr(e, "orig", None) or e).splitlines()[0]
+            for index, _ in chunk:
+                results[index] = error(index, [message])
+            continue
+        for (index, _), row in zip(chunk, rows):
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "id": row["id"],
+                "serial_number": row.get("serial_number"),
+            }
+
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
@@ -1,17 +1,18 @@
-from typing import Generator, Tuple
+from typing import Tuple
 from fastapi import Depends
 from sqlalchemy.orm import Session
-from ..db.session import SessionLocal
+from ..db.session import get_db
 from ..core.security import get_current_user
 from .. import models
 
-def get_db_user() -> Generator[Tuple[Session, models.User], None, None]:
+def get_db_user(
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user)
+) -> Tuple[Session, models.User]:
     """
-    Get both database session and current user
+    Get both database session and current user.
+
+    The user is loaded through the same request-scoped session, so handlers
+    that need both still hold a single connection.
     """
-    db = SessionLocal()
-    try:
-        user = get_current_user(db=db)
-        yield db, user
-    finally:
-        db.close()
+    return db, user
@@ -0,0 +1,17 @@
+from typing import Optional
+from fastapi import Request, Response
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Tag ``response`` with ``etag`` and return a 304 response when the
+    client's ``If-None-Match`` already names it.
+
+    Clients must revalidate on every use (``no-cache``); the 304 saves the
+    body, not the round trip.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in tags or f"W/{etag}" in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    return None
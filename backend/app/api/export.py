@@ -0,0 +1,147 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Iterable, Iterator, List, Literal, Sequence
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import JSON, Boolean, Date, DateTime, Float, Integer, Numeric, Time
+from sqlalchemy.dialects.postgresql import ARRAY
+
+# ``format`` query parameter of the export endpoint
+ExportFormat = Literal["csv", "ndjson", "parquet"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def as_json_text(value: Any) -> Any:
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, default=json_default)
+
+def structured_columns(columns: List) -> List[int]:
+    """Positions of JSON and array columns, which flat formats carry as JSON text"""
+    return [i for i, column in enumerate(columns) if isinstance(column.type, (JSON, ARRAY))]
+
+def encode_csv(columns: List, batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """Header line, then one chunk of CSV per batch of rows"""
+    structured = structured_columns(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in columns])
+    yield buffer.getvalue().encode()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        if structured:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for i in structured:
+                    row[i] = as_json_text(row[i])
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+def encode_ndjson(columns: List, batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """One JSON object per row, one chunk per batch"""
+    keys = [column.key for column in columns]
+    encoder = json.JSONEncoder(ensure_ascii=False, default=json_default)
+    for rows in batches:
+        yield "".join(encoder.encode(dict(zip(keys, row))) + "\n" for row in rows).encode()
+
+def arrow_type(column):
+    import pyarrow as pa
+
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, (Float, Numeric)):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, Time):
+        return pa.time64("us")
+    if isinstance(column_type, ARRAY):
+        return pa.list_(pa.string())
+    # Strings, text, enums; JSON is stored as its text
+    return pa.string()
+
+class ChunkSink:
+    """Write-only file object collecting what pyarrow writes until drained"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def encode_parquet(columns: List, batches: Iterable[Sequence[Sequence[Any]]],
+                   compression: str = "snappy") -> Iterator[bytes]:
+    """
+    One Parquet row group per batch, sent as soon as it is written.
+
+    Parquet keeps its index in a footer, so a reader needs the complete
+    stream, but the server never holds more than one batch.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([pa.field(column.key, arrow_type(column)) for column in columns])
+    as_text = [i for i, column in enumerate(columns) if isinstance(column.type, JSON)]
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    for rows in batches:
+        values = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+        for i in as_text:
+            values[i] = [as_json_text(value) for value in values[i]]
+        writer.write_table(pa.Table.from_arrays(values, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Incremental gzip of a byte stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
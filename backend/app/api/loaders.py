@@ -0,0 +1,48 @@
+from typing import List, Optional
+from sqlalchemy.orm import Session, selectinload
+from ..core.config import settings
+from .. import models, schemas
+
+USER_FIELDS = list(schemas.UserBase.model_fields) + ["id"]
+
+def user_load_options(depth: Optional[int] = None) -> List:
+    """
+    Loader options for ``schemas.User`` responses.
+
+    Every relationship the schema serializes is loaded with ``selectinload``
+    down to ``depth`` levels of the kristna_abat tree. The number of queries
+    per page therefore depends on the depth, not on the number of rows.
+    """
+    depth = settings.USER_TREE_DEPTH if depth is None else depth
+
+    def walk(path, remaining: int) -> List:
+        load = selectinload if path is None else path.selectinload
+        options = [load(models.User.user_type).selectinload(models.UserType.roles)]
+        if remaining > 0:
+            for relationship in (models.User.kristna_abat, models.User.kristna_children):
+                options.extend(walk(load(relationship), remaining - 1))
+        return options
+
+    return walk(None, depth)
+
+def user_tree(user: models.User, depth: Optional[int] = None) -> dict:
+    """
+    Serialize a user loaded with ``user_load_options`` for ``schemas.User``.
+
+    Nesting stops at ``depth``, which also breaks the abat -> children -> abat
+    cycle that would otherwise recurse forever.
+    """
+    depth = settings.USER_TREE_DEPTH if depth is None else depth
+    data = {field: getattr(user, field) for field in USER_FIELDS}
+    data["user_type"] = user.user_type
+    data["kristna_abat"] = None
+    data["kristna_children"] = []
+    if depth > 0:
+        if user.kristna_abat is not None:
+            data["kristna_abat"] = user_tree(user.kristna_abat, depth - 1)
+        data["kristna_children"] = [user_tree(child, depth - 1) for child in user.kristna_children]
+    return data
+
+def load_user_tree(db: Session, user_id: int) -> Optional[dict]:
+    user = db.query(models.User).options(*user_load_options()).filter(models.User.id == user_id).first()
+    return user_tree(user) if user is not None else None
@@ -0,0 +1,55 @@
+from typing import Any, List, Optional
+import base64
+import json
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(value: Any) -> str:
+    """Encode the last key of a page as an opaque cursor"""
+    raw = json.dumps(value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Any:
+    """Decode a cursor from ``encode_cursor``; an empty cursor means the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset(query, column, limit: int, cursor: str):
+    """
+    Restrict ``query`` to the page after ``cursor``.
+
+    Works on both ``Query`` and ``select()``. One extra row is fetched so
+    ``page_rows`` can tell whether another page follows.
+    """
+    after = decode_cursor(cursor)
+    if after is not None and not isinstance(after, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if after is not None:
+        query = query.filter(column > after)
+    return query.order_by(column).limit(limit + 1)
+
+def page_rows(rows, limit: int, response: Response) -> List:
+    """Trim the look-ahead row and expose the next cursor as a header"""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+    return rows
+
+def paginate(query, column, skip: int, limit: int, cursor: Optional[str], response: Response) -> List:
+    """
+    Offset pagination by default, keyset pagination when ``cursor`` is given.
+
+    Pass ``cursor=`` (empty) to request the first keyset page, then follow the
+    ``X-Next-Cursor`` response header until it is absent. Keyset pages seek on
+    an indexed column, so their cost doesn't grow with page depth.
+    """
+    if cursor is None:
+        return query.offset(skip).limit(limit).all()
+    return page_rows(keyset(query, column, limit, cursor).all(), limit, response)
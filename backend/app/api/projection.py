@@ -0,0 +1,50 @@
+from functools import lru_cache
+from typing import List, Literal, Optional, Tuple, Type
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+from .pagination import paginate
+
+# ``view`` query parameter of the list endpoints
+View = Literal["full", "summary"]
+
+@lru_cache(maxsize=None)
+def summary_columns(model: type, schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Mapped columns of ``model`` that ``schema`` reads"""
+    columns = {attr.key for attr in inspect(model).column_attrs}
+    return tuple(name for name in schema.model_fields if name in columns)
+
+def project(query, schema: Type[BaseModel]):
+    """
+    Load only the columns ``schema`` needs.
+
+    Works on both ``Query`` and ``select()``. Every other column is deferred,
+    so heavy text columns are never read from the database for list pages.
+    """
+    model = query.column_descriptions[0]["entity"]
+    return query.options(load_only(*(getattr(model, key) for key in summary_columns(model, schema))))
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+def summary_response(schema: Type[BaseModel], rows, response: Response) -> Response:
+    """
+    Serialize ``rows`` with the summary ``schema``.
+
+    The endpoint's ``response_model`` describes the full view, so the summary
+    is returned as a ready-made response. Headers set on the injected
+    ``response`` (such as the next cursor) are carried over.
+    """
+    adapter = list_adapter(schema)
+    content = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return Response(content, media_type="application/json", headers=dict(response.headers))
+
+def list_view(query, column, summary: Type[BaseModel], view: View, skip: int, limit: int,
+              cursor: Optional[str], response: Response):
+    """``paginate`` for list endpoints; ``view=summary`` returns ``summary`` rows"""
+    if view != "summary":
+        return paginate(query, column, skip, limit, cursor, response)
+    rows = paginate(project(query, summary), column, skip, limit, cursor, response)
+    return summary_response(summary, rows, response)
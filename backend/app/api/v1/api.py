@@ -1,11 +1,25 @@
 from fastapi import APIRouter
-from .endpoints import users, items, transactions, documents, schedules, auth
+from ...core.config import settings
+from .endpoints import users, items, transactions, documents, schedules, auth, metrics, blobs, imports, exports, certificates, reservations
+from .endpoints import items_async, documents_async
 
 api_router = APIRouter()
 
+# Routes are matched in registration order, so the async CRUD routes shadow
+# their sync equivalents while the remaining sync routes stay reachable.
+if settings.ASYNC_DB:
+    api_router.include_router(items_async.router, prefix="/items", tags=["items"])
+    api_router.include_router(documents_async.router, prefix="/documents", tags=["documents"])
+
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(items.router, prefix="/items", tags=["items"])
 api_router.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
+api_router.include_router(reservations.router, prefix="/reservations", tags=["reservations"])
+api_router.include_router(certificates.router, prefix="/documents/certificates", tags=["documents"])
 api_router.include_router(documents.router, prefix="/documents", tags=["documents"]) 
-api_router.include_router(schedules.router, prefix="/schedules", tags=["schedules"])
\ No newline at end of file
+api_router.include_router(schedules.router, prefix="/schedules", tags=["schedules"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(blobs.router, prefix="/blobs", tags=["blobs"])
+api_router.include_router(imports.router, prefix="/imports", tags=["imports"])
+api_router.include_router(exports.router, prefix="/export", tags=["export"])
\ No newline at end of file
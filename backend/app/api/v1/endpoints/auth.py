@@ -2,28 +2,27 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ....core import security
 from ....core.security import create_access_token, get_current_user
-from ....db.session import SessionLocal
+from ....core.permissions import ADMIN_ROLE, type_permissions
+from ....api.deps import get_db
+from ....api.loaders import load_user_tree
 from .... import models, schemas
 
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = db.query(models.User).filter(
-        models.User.phone_number == form_data.username
-    ).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    # The lookup runs in the threadpool and bcrypt on the hashing pool, so a
+    # burst of logins never blocks the event loop.
+    user = await run_in_threadpool(
+        db.query(models.User).filter(models.User.phone_number == form_data.username).first
+    )
+    if not user or not await security.verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect phone number or password",
@@ -48,8 +47,17 @@ def login(
 
 # Only protect the /me endpoint, leave login/logout unprotected
 @router.get("/me", response_model=schemas.User, dependencies=[Depends(get_current_user)])
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
-    return current_user
+def read_users_me(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return load_user_tree(db, current_user.id)
+
+@router.get("/me/permissions", response_model=schemas.Permissions)
+def read_my_permissions(current_user: models.User = Depends(get_current_user)):
+    """Roles granted to the current user's type, for showing or hiding actions"""
+    granted = type_permissions(current_user.type_id)
+    return {"admin": ADMIN_ROLE in granted, "permissions": sorted(granted)}
 
 @router.post("/logout")
 def logout():
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import Iterator, Optional, Tuple
+import os
+import re
+from ....core.config import settings
+from ....core.blobstore import CHUNK_SIZE, NotAnImage, blob_store, ensure_thumbnail, sniff_image_type
+
+# Blobs are addressed by the sha256 of their content, so they are served
+# without a token: <img> tags cannot send one and the digest is unguessable.
+router = APIRouter()
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single ``bytes=`` range; None means the whole blob"""
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        # Multiple or malformed ranges are ignored, as RFC 9110 allows
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+def read_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def serve_file(path: str, etag: str, if_none_match: Optional[str], range_header: Optional[str]):
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as source:
+        media_type = sniff_image_type(source.read(16))
+
+    byte_range = parse_range(range_header, size)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read_file(path, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        read_file(path, start, end - start + 1),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
+
+@router.get("/{digest}")
+def read_blob(
+    digest: str,
+    if_none_match: Optional[str] = Header(None),
+    range: Optional[str] = Header(None),
+):
+    if not blob_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return serve_file(blob_store.path(digest), f'"{digest}"', if_none_match, range)
+
+@router.get("/{digest}/thumbnail")
+def read_thumbnail(
+    digest: str,
+    if_none_match: Optional[str] = Header(None),
+    range: Optional[str] = Header(None),
+):
+    if not blob_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    try:
+        path = ensure_thumbnail(digest)
+    except NotAnImage:
+        raise HTTPException(status_code=415, detail="Blob is not a supported image")
+    return serve_file(path, f'"{digest}-{settings.THUMBNAIL_SIZE}"', if_none_match, range)
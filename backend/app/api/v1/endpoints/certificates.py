@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List, Literal, Tuple
+from urllib.parse import quote
+import zipfile
+from .... import models, schemas
+from ....api.deps import get_db_user
+from ....api.export import ChunkSink
+from ....core.certificates import certificate_filename, certificate_pool, render_certificate, render_certificates
+from ....db.persons import EVENT_DATES
+from ....db.search import RELIGIOUS_DOCUMENTS
+
+router = APIRouter()
+
+Register = Literal["membership", "baptism", "burial", "marriage"]
+
+# Documents read per round trip of the server-side cursor
+FETCH_SIZE = 200
+
+def certificate_statement(kind: str, criteria: schemas.CertificateFilter):
+    table = RELIGIOUS_DOCUMENTS[kind].__table__
+    columns = [column for column in table.c if column.key != "name_keys"]
+    statement = select(*columns).order_by(table.c.id)
+    if criteria.ids is not None:
+        statement = statement.where(table.c.id.in_(criteria.ids))
+    if criteria.priest_id is not None:
+        statement = statement.where(table.c.priest_id == criteria.priest_id)
+    event_date = table.c[EVENT_DATES[kind]]
+    if criteria.date_from is not None:
+        statement = statement.where(event_date >= criteria.date_from)
+    if criteria.date_to is not None:
+        statement = statement.where(event_date <= criteria.date_to)
+    return statement
+
+def read_documents(conn, statements: List[Tuple[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for kind, statement in statements:
+        result = conn.execute(statement.execution_options(stream_results=True, yield_per=FETCH_SIZE))
+        for row in result.mappings():
+            yield kind, dict(row)
+
+def certificate_zip(bind, statements: List[Tuple[str, Any]]) -> Iterator[bytes]:
+    """
+    Zip of the certificates, sent entry by entry as the pool renders them.
+
+    PDFs are already compressed, so entries are stored as they are.
+    """
+    sink = ChunkSink()
+    with bind.connect() as conn:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            for filename, pdf in render_certificates(read_documents(conn, statements)):
+                archive.writestr(filename, pdf)
+                yield sink.drain()
+    yield sink.drain()
+
+@router.post("/")
+def create_certificates(
+    criteria: schemas.CertificateFilter,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """
+    Certificates of every matching document, as a zip of PDFs.
+
+    ``ids`` are looked up in each of ``kinds``; the date range applies to the
+    date a document records (baptism, burial, marriage or membership
+    registration).
+    """
+    db, current_user = db_user
+    if criteria.ids is None and criteria.priest_id is None and criteria.date_from is None and criteria.date_to is None:
+        raise HTTPException(status_code=400, detail="Give ids, priest_id or a date range")
+    statements = [(kind, certificate_statement(kind, criteria)) for kind in dict.fromkeys(criteria.kinds)]
+
+    # Stream from a connection of our own; the request's is released now
+    bind = db.get_bind()
+    db.close()
+    return StreamingResponse(
+        certificate_zip(bind, statements),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="certificates.zip"'},
+    )
+
+@router.get("/{kind}/{document_id}")
+def read_certificate(
+    kind: Register,
+    document_id: int,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """Certificate of one document as a PDF"""
+    db, current_user = db_user
+    table = RELIGIOUS_DOCUMENTS[kind].__table__
+    row = db.execute(select(table).where(table.c.id == document_id)).mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    document = dict(row)
+    pdf = certificate_pool().submit(render_certificate, kind, document).result()
+    # Serial numbers are in Ge'ez script; plain ``filename`` must be latin-1
+    filename = quote(certificate_filename(kind, document))
+    disposition = f"inline; filename=\"{kind}-{document_id}.pdf\"; filename*=UTF-8''{filename}"
+    return Response(pdf, media_type="application/pdf", headers={"Content-Disposition": disposition})
@@ -1,44 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Tuple
-from ....db.session import SessionLocal
+from typing import List, Optional, Tuple
 from .... import models, schemas
 from datetime import datetime
 from ....core.security import get_current_user
-from ....api.deps import get_db_user
+from ....api.deps import get_db, get_db_user
+from ....api.projection import View, list_view
+from ....db.serials import allocate_serial, assign_serials
+from ....db.search import RELIGIOUS_DOCUMENTS, document_name_keys, search_religious_documents
+from ....api.bulk import BULK_OPENAPI, bulk_create, read_rows
+from ....db.persons import person_timeline
 from ....core.audit import audit_context
+from ....api.etag import not_modified
+from ....db.reference import reference_cache, reference_changed
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Document Type CRUD operations
 @router.post("/types/", response_model=schemas.DocumentType)
 def create_document_type(doc_type: schemas.DocumentTypeCreate, db: Session = Depends(get_db)):
     db_doc_type = models.DocumentType(**doc_type.dict())
     # add the joindate and updatedate as today
     db.add(db_doc_type)
+    reference_changed(db, "document_types")
     db.commit()
     db.refresh(db_doc_type)
     return db_doc_type
 
 @router.get("/types/", response_model=List[schemas.DocumentType])
-def read_document_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    doc_types = db.query(models.DocumentType).offset(skip).limit(limit).all()
-    return doc_types
+def read_document_types(request: Request, response: Response, skip: int = 0, limit: int = 100):
+    snapshot = reference_cache.snapshot("document_types")
+    return not_modified(request, response, snapshot.etag) or snapshot.rows[skip:skip + limit]
 
 @router.get("/types/{type_id}", response_model=schemas.DocumentType)
-def read_document_type(type_id: int, db: Session = Depends(get_db)):
-    db_doc_type = db.query(models.DocumentType).filter(models.DocumentType.id == type_id).first()
-    if db_doc_type is None:
+def read_document_type(type_id: int, request: Request, response: Response):
+    doc_type = reference_cache.get("document_types", type_id)
+    if doc_type is None:
         raise HTTPException(status_code=404, detail="Document type not found")
-    return db_doc_type
+    return not_modified(request, response, reference_cache.snapshot("document_types").etag) or doc_type
 
 @router.put("/types/{type_id}", response_model=schemas.DocumentType)
 def update_document_type(type_id: int, doc_type: schemas.DocumentTypeCreate, db: Session = Depends(get_db)):
@@ -49,6 +49,7 @@ def update_document_type(type_id: int, doc_type: schemas.DocumentTypeCreate, db:
     for var, value in vars(doc_type).items():
         setattr(db_doc_type, var, value)
     
+    reference_changed(db, "document_types")
     db.commit()
     db.refresh(db_doc_type)
     return db_doc_type
@@ -60,26 +61,42 @@ def delete_document_type(type_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Document type not found")
     
     db.delete(db_doc_type)
+    reference_changed(db, "document_types")
     db.commit()
     return {"message": "Document type deleted successfully"}
 
-def generate_document_serial(db: Session, type_id: int, prefix: str="Doc") -> str:
+def generate_document_serial(db: Session, type_id: int = None, prefix: str="Doc") -> str:
     """Generate a unique serial number for documents"""
-    # Get the document type prefix
-    # doc_type = db.query(models.DocumentType).filter(models.DocumentType.id == type_id).first()
-    # prefix = doc_type.name[:3].upper()
-    
-    # Get the current year
-    year = datetime.now().strftime("%Y")
-    
-    # Count existing documents of this type for this year
-    count = db.query(models.Document).filter(
-        models.Document.date_joined >= f"{year}-01-01"
-    ).count()
-    
-    # Generate serial number: PREFIX-YEAR-SEQUENCE
-    serial = f"{prefix}-{year}-{(count + 1):04d}"
-    return serial
+    # Every prefix (documents and each religious register) has its own
+    # PREFIX-YEAR-SEQUENCE counter
+    return allocate_serial(db, prefix)
+
+def prepare_documents(db: Session, rows: List[dict]) -> None:
+    """Server-side values of bulk-created documents, as create_document sets them"""
+    now = datetime.now()
+    for row in rows:
+        row["serial_number"] = None
+        row["date_joined"] = now
+        row["date_updated"] = now
+    assign_serials(db, rows, lambda row: "Doc")
+
+def religious_preparer(model, prefix: str):
+    """Fill in serials (unless given) and name keys of bulk-created religious documents"""
+    def prepare(db: Session, rows: List[dict]) -> None:
+        for row in rows:
+            row["name_keys"] = document_name_keys(model, row)
+        assign_serials(db, rows, lambda row: prefix)
+    return prepare
+
+@router.post("/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_documents(
+    request: Request,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """Create documents from a JSON array or NDJSON body; reports each row"""
+    db, current_user = db_user
+    rows = await read_rows(request)
+    return await run_in_threadpool(bulk_create, db, models.Document, schemas.DocumentCreate, rows, prepare_documents)
 
 @router.post("/", response_model=schemas.Document)
 def create_document(
@@ -100,15 +117,18 @@ def create_document(
 
 @router.get("/", response_model=List[schemas.Document])
 def read_documents(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     type_id: int = None,
+    cursor: Optional[str] = None,
+    view: View = "full",
     db: Session = Depends(get_db)
 ):  
     query = db.query(models.Document)
     if type_id:
         query = query.filter(models.Document.type_id == type_id)
-    documents = query.offset(skip).limit(limit).all()
+    documents = list_view(query, models.Document.id, schemas.DocumentSummary, view, skip, limit, cursor, response)
     return documents
 
 @router.get("/{document_id}", response_model=schemas.Document)
@@ -164,6 +184,28 @@ def search_documents(
     ).offset(skip).limit(limit).all()
     return documents
 
+@router.get("/religious/search", response_model=List[schemas.ReligiousSearchResult])
+def search_religious(
+    q: str = Query(..., min_length=1),
+    kind: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Ranked name search over the membership, baptism, burial and marriage registers"""
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query must not be blank")
+    if kind is not None and kind not in RELIGIOUS_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"Unknown document kind '{kind}'")
+    return search_religious_documents(db, q, kind, limit)
+
+@router.get("/persons/{person_id}", response_model=List[schemas.PersonTimelineEntry])
+def read_person_timeline(person_id: int, db: Session = Depends(get_db)):
+    """All religious documents linked to a person, oldest first"""
+    if db.get(models.Person, person_id) is None:
+        raise HTTPException(status_code=404, detail="Person not found")
+    return person_timeline(db, person_id)
+
 @router.put("/{document_id}/quantity", response_model=schemas.Document)
 def update_document_quantity(
     document_id: int,
@@ -184,8 +226,15 @@ def update_document_quantity(
 
 
 @router.get("/member/", response_model=List[schemas.MembershipDocument])
-def read_membership_documents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    documents = db.query(models.MembershipDocument).offset(skip).limit(limit).all()
+def read_membership_documents(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: Session = Depends(get_db)
+):
+    documents = list_view(db.query(models.MembershipDocument), models.MembershipDocument.id, schemas.MembershipDocumentSummary, view, skip, limit, cursor, response)
     return documents
 
 @router.put("/member/{document_id}", response_model=schemas.MembershipDocument)
@@ -201,6 +250,14 @@ def update_membership_document(document_id: int, document: schemas.MembershipDoc
     db.refresh(db_document)
     return db_document
 
+@router.post("/member/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_membership_documents(request: Request, db: Session = Depends(get_db)):
+    rows = await read_rows(request)
+    return await run_in_threadpool(
+        bulk_create, db, models.MembershipDocument, schemas.MembershipDocumentCreate, rows,
+        religious_preparer(models.MembershipDocument, "አባ")
+    )
+
 @router.post("/member/", response_model=schemas.MembershipDocument)
 def create_membership_document(document: schemas.MembershipDocumentCreate, db: Session = Depends(get_db)):
     db_document = models.MembershipDocument(**document.dict())
@@ -225,8 +282,15 @@ def delete_membership_document(document_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/baptism/", response_model=List[schemas.BaptismDocument])
-def read_baptism_documents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    documents = db.query(models.BaptismDocument).offset(skip).limit(limit).all()
+def read_baptism_documents(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: Session = Depends(get_db)
+):
+    documents = list_view(db.query(models.BaptismDocument), models.BaptismDocument.id, schemas.BaptismDocumentSummary, view, skip, limit, cursor, response)
     return documents
 
 @router.put("/baptism/{document_id}", response_model=schemas.BaptismDocument)
@@ -242,6 +306,14 @@ def update_baptism_document(document_id: int, document: schemas.BaptismDocumentC
     db.refresh(db_document)
     return db_document
 
+@router.post("/baptism/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_baptism_documents(request: Request, db: Session = Depends(get_db)):
+    rows = await read_rows(request)
+    return await run_in_threadpool(
+        bulk_create, db, models.BaptismDocument, schemas.BaptismDocumentCreate, rows,
+        religious_preparer(models.BaptismDocument, "ክር")
+    )
+
 @router.post("/baptism/", response_model=schemas.BaptismDocument)
 def create_baptism_document(document: schemas.BaptismDocumentCreate, db: Session = Depends(get_db)):
     db_document = models.BaptismDocument(**document.dict())
@@ -264,8 +336,15 @@ def delete_baptism_document(document_id: int, db: Session = Depends(get_db)):
     return {"message": "Baptism document deleted successfully"}
 
 @router.get("/burial/", response_model=List[schemas.BurialDocument])
-def read_burial_documents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    documents = db.query(models.BurialDocument).offset(skip).limit(limit).all()
+def read_burial_documents(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: Session = Depends(get_db)
+):
+    documents = list_view(db.query(models.BurialDocument), models.BurialDocument.id, schemas.BurialDocumentSummary, view, skip, limit, cursor, response)
     return documents
 
 @router.put("/burial/{document_id}", response_model=schemas.BurialDocument)
@@ -281,6 +360,14 @@ def update_burial_document(document_id: int, document: schemas.BurialDocumentCre
     db.refresh(db_document)
     return db_document
 
+@router.post("/burial/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_burial_documents(request: Request, db: Session = Depends(get_db)):
+    rows = await read_rows(request)
+    return await run_in_threadpool(
+        bulk_create, db, models.BurialDocument, schemas.BurialDocumentCreate, rows,
+        religious_preparer(models.BurialDocument, "ቀብ")
+    )
+
 @router.post("/burial/", response_model=schemas.BurialDocument)
 def create_burial_document(document: schemas.BurialDocumentCreate, db: Session = Depends(get_db)):
     db_document = models.BurialDocument(**document.dict())
@@ -303,8 +390,15 @@ def delete_burial_document(document_id: int, db: Session = Depends(get_db)):
     return {"message": "Burial document deleted successfully"}
 
 @router.get("/marriage/", response_model=List[schemas.MarriageDocument])
-def read_marriage_documents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    documents = db.query(models.MarriageDocument).offset(skip).limit(limit).all()
+def read_marriage_documents(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: Session = Depends(get_db)
+):
+    documents = list_view(db.query(models.MarriageDocument), models.MarriageDocument.id, schemas.MarriageDocumentSummary, view, skip, limit, cursor, response)
     return documents
 
 @router.put("/marriage/{document_id}", response_model=schemas.MarriageDocument)
@@ -320,6 +414,14 @@ def update_marriage_document(document_id: int, document: schemas.MarriageDocumen
     db.refresh(db_document)
     return db_document
 
+@router.post("/marriage/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_marriage_documents(request: Request, db: Session = Depends(get_db)):
+    rows = await read_rows(request)
+    return await run_in_threadpool(
+        bulk_create, db, models.MarriageDocument, schemas.MarriageDocumentCreate, rows,
+        religious_preparer(models.MarriageDocument, "ልዩ")
+    )
+
 @router.post("/marriage/", response_model=schemas.MarriageDocument)
 def create_marriage_document(document: schemas.MarriageDocumentCreate, db: Session = Depends(get_db)):
     db_document = models.MarriageDocument(**document.dict())
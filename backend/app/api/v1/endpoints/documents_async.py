@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from datetime import datetime
+from ....db.session import get_async_db
+from ....api.pagination import keyset, page_rows
+from ....api.projection import View, project, summary_response
+from .... import models, schemas
+from ....core.security import get_current_user_async
+from ....core.audit import async_audit_context
+from .documents import generate_document_serial
+
+# Async counterparts of the document CRUD routes in documents.py, mounted in
+# their place when ASYNC_DB is enabled. Type, search and religious document
+# routes stay on the sync router.
+router = APIRouter(dependencies=[Depends(get_current_user_async)])
+
+async def get_document(db: AsyncSession, document_id: int) -> models.Document:
+    result = await db.execute(
+        select(models.Document)
+        .options(selectinload(models.Document.doc_type))
+        .where(models.Document.id == document_id)
+    )
+    db_document = result.scalars().first()
+    if db_document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return db_document
+
+@router.post("/", response_model=schemas.Document)
+async def create_document_async(document: schemas.DocumentCreate, db: AsyncSession = Depends(get_async_db)):
+    async with async_audit_context(db, "CREATE"):
+        db_document = models.Document(**document.dict())
+        db_document.date_joined = datetime.now()
+        db_document.date_updated = datetime.now()
+        db_document.serial_number = await db.run_sync(generate_document_serial, document.type_id)
+
+        db.add(db_document)
+        await db.commit()
+        return await get_document(db, db_document.id)
+
+@router.get("/", response_model=List[schemas.Document])
+async def read_documents_async(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    type_id: int = None,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: AsyncSession = Depends(get_async_db)
+):
+    if view == "summary":
+        query = project(select(models.Document), schemas.DocumentSummary)
+    else:
+        query = select(models.Document).options(selectinload(models.Document.doc_type))
+    if type_id:
+        query = query.where(models.Document.type_id == type_id)
+    if cursor is None:
+        result = await db.execute(query.offset(skip).limit(limit))
+        documents = result.scalars().all()
+    else:
+        result = await db.execute(keyset(query, models.Document.id, limit, cursor))
+        documents = page_rows(result.scalars(), limit, response)
+    if view == "summary":
+        return summary_response(schemas.DocumentSummary, documents, response)
+    return documents
+
+@router.get("/{document_id}", response_model=schemas.Document)
+async def read_document_async(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await get_document(db, document_id)
+
+@router.put("/{document_id}", response_model=schemas.Document)
+async def update_document_async(
+    document_id: int,
+    document: schemas.DocumentCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_document = await get_document(db, document_id)
+    async with async_audit_context(db, "UPDATE"):
+        for var, value in vars(document).items():
+            setattr(db_document, var, value)
+
+        await db.commit()
+        await db.refresh(db_document, attribute_names=["date_updated", "doc_type"])
+        return db_document
+
+@router.delete("/{document_id}")
+async def delete_document_async(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_document = await get_document(db, document_id)
+    async with async_audit_context(db, "DELETE"):
+        await db.delete(db_document)
+        await db.commit()
+        return {"message": "Document deleted successfully"}
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Iterator, List, Tuple
+import importlib.util
+from .... import models
+from ....api.deps import get_db_user
+from ....api.export import MEDIA_TYPES, ExportFormat, encode_csv, encode_ndjson, encode_parquet, gzipped
+from ....core.config import settings
+from ....core.permissions import ADMIN_ROLE, has_permissions, require
+
+router = APIRouter(dependencies=[Depends(require("export-data"))])
+
+EXPORTS = {
+    "items": models.Item,
+    "transactions": models.Transaction,
+    "documents": models.Document,
+    "users": models.User,
+    "schedules": models.Schedule,
+    "audit_logs": models.AuditLog,
+    "membership_documents": models.MembershipDocument,
+    "baptism_documents": models.BaptismDocument,
+    "burial_documents": models.BurialDocument,
+    "marriage_documents": models.MarriageDocument,
+}
+# Columns that never leave the database
+EXCLUDED_COLUMNS = {"users": {"hashed_password"}}
+# Permissions needed on top of export-data
+RESTRICTED_EXPORTS = {"users": ("read-user",), "audit_logs": (ADMIN_ROLE,)}
+
+def stream_rows(bind, statement, batch_size: int) -> Iterator[List]:
+    """
+    Rows of ``statement`` in batches, read through a server-side cursor.
+
+    The connection is held only while the response is being sent.
+    """
+    with bind.connect() as conn:
+        result = conn.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+        for rows in result.partitions():
+            yield rows
+
+@router.get("/{resource}")
+def export_resource(
+    resource: str,
+    format: ExportFormat = "csv",
+    gzip: bool = False,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """
+    Stream a whole table as CSV, NDJSON or Parquet, in primary key order.
+
+    Rows are encoded ``EXPORT_BATCH_SIZE`` at a time, so memory use doesn't
+    grow with the table. ``gzip`` compresses CSV and NDJSON as a .gz
+    download and selects gzip as the Parquet column codec.
+    """
+    db, current_user = db_user
+    model = EXPORTS.get(resource)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export {resource!r}")
+    restricted = RESTRICTED_EXPORTS.get(resource, ())
+    if not has_permissions(current_user, *restricted):
+        raise HTTPException(status_code=403, detail=f"Requires permission: {', '.join(restricted)}")
+    if format == "parquet":
+        if importlib.util.find_spec("pyarrow") is None:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    table = model.__table__
+    excluded = EXCLUDED_COLUMNS.get(resource, set())
+    columns = [column for column in table.c if column.key not in excluded]
+    statement = select(*columns).order_by(*table.primary_key.columns)
+
+    # Stream from a connection of our own; the request's is released now
+    # rather than when the last byte has been sent
+    bind = db.get_bind()
+    db.close()
+    batches = stream_rows(bind, statement, settings.EXPORT_BATCH_SIZE)
+
+    filename = f"{resource}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if format == "parquet":
+        body = encode_parquet(columns, batches, compression="gzip" if gzip else "snappy")
+    else:
+        encode = encode_csv if format == "csv" else encode_ndjson
+        body = encode(columns, batches)
+        if gzip:
+            body = gzipped(body)
+            filename += ".gz"
+            media_type = "application/gzip"
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
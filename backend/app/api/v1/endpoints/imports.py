@@ -0,0 +1,94 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Response, UploadFile, status
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional, Tuple
+import json
+import os
+from .... import models, schemas
+from ....api.deps import get_db, get_db_user
+from ....api.pagination import paginate
+from ....core.security import get_current_user
+from ....db.importer import ImportFailed, create_job, run_import, store_upload
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+Register = Literal["membership", "baptism", "burial", "marriage"]
+
+def get_job(db: Session, job_id: int) -> models.ImportJob:
+    job = db.get(models.ImportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.post("/", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
+def create_import(
+    background_tasks: BackgroundTasks,
+    kind: Register,
+    file: UploadFile = File(...),
+    column_map: Optional[str] = Form(None),
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """
+    Import a CSV or XLSX register transcription in the background.
+
+    ``column_map`` is a JSON object of field -> header for headers that
+    aren't named after the fields. Follow progress and row errors with
+    ``GET /imports/{job_id}`` and ``GET /imports/{job_id}/errors``.
+    """
+    db, current_user = db_user
+    try:
+        mapping = json.loads(column_map) if column_map else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="column_map must be a JSON object")
+    if mapping is not None and not isinstance(mapping, dict):
+        raise HTTPException(status_code=400, detail="column_map must be a JSON object")
+
+    filename = file.filename or ""
+    if not filename.lower().endswith((".csv", ".xlsx")):
+        raise HTTPException(status_code=400, detail="Only .csv and .xlsx files can be imported")
+    path = store_upload(file.file, filename)
+    try:
+        job = create_job(db, kind, filename, path, mapping, current_user.id)
+    except ImportFailed as e:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail=str(e))
+    background_tasks.add_task(run_import, job.id)
+    return job
+
+@router.get("/{job_id}", response_model=schemas.ImportJob)
+def read_import(job_id: int, db: Session = Depends(get_db)):
+    return get_job(db, job_id)
+
+@router.get("/{job_id}/errors", response_model=List[schemas.ImportRowError])
+def read_import_errors(
+    job_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Row errors in the order they were found; use ``cursor=`` to follow new ones"""
+    get_job(db, job_id)
+    query = db.query(models.ImportRowError).filter(models.ImportRowError.job_id == job_id)
+    return paginate(query, models.ImportRowError.id, skip, limit, cursor, response)
+
+@router.post("/{job_id}/resume", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
+def resume_import(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """
+    Continue a failed or interrupted import after its last committed row.
+
+    A job still running elsewhere is not duplicated: the run that commits
+    second stops.
+    """
+    db, current_user = db_user
+    job = get_job(db, job_id)
+    if job.status == "done":
+        raise HTTPException(status_code=409, detail="Import job already finished")
+    if not os.path.exists(job.path):
+        raise HTTPException(status_code=409, detail="Import file is no longer available")
+    background_tasks.add_task(run_import, job.id)
+    return job
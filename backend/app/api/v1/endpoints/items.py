@@ -1,41 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
-from ....api.deps import get_db_user
-from ....db.session import SessionLocal
+from ....api.deps import get_db, get_db_user
+from ....api.pagination import paginate
+from ....api.projection import View, list_view
+from ....db.serials import allocate_serial, assign_serials
+from ....api.bulk import BULK_OPENAPI, bulk_create, read_rows
 from .... import models, schemas
 from ....core.security import get_current_user
 from ....core.audit import audit_context
+from ....api.etag import not_modified
+from ....db.reference import reference_cache, reference_changed
+from ....db.stock import adjust_stock, record_openings
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def generate_item_serial(db: Session, type_id: int) -> str:
     """Generate a unique serial number for items"""
     # Get the item type prefix
-    item_type = db.query(models.ItemType).filter(models.ItemType.id == type_id).first()
-    prefix = item_type.name[:3].upper()
-    
-    # Get the current year
-    year = datetime.now().strftime("%Y")
+    item_type = reference_cache.get("item_types", type_id)
+    prefix = item_type["name"][:3].upper()
     
-    # Count existing items of this type for this year
-    count = db.query(models.Item).filter(
-        models.Item.type_id == type_id,
-        models.Item.date_joined >= f"{year}-01-01"
-    ).count()
-    
-    # Generate serial number: PREFIX-YEAR-SEQUENCE
-    serial = f"{prefix}-{year}-{(count + 1):04d}"
-    return serial
+    # Serial number: PREFIX-YEAR-SEQUENCE from the per-prefix counter
+    return allocate_serial(db, prefix)
 
 @router.post("/", response_model=schemas.Item)
 def create_item(
@@ -49,16 +38,73 @@ def create_item(
         db_item.serial_number = generate_item_serial(db, item.type_id)
         
         db.add(db_item)
+        db.flush()
+        record_openings(db, [{"id": db_item.id, "quantity": db_item.quantity}])
         db.commit()
         db.refresh(db_item)
         
         return db_item
 
+def prepare_items(db: Session, rows: List[dict]) -> None:
+    """Server-side values of bulk-created items, as create_item sets them"""
+    names = {row["type_id"]: reference_cache.get("item_types", row["type_id"])["name"] for row in rows}
+    now = datetime.now()
+    for row in rows:
+        row["serial_number"] = None
+        row["date_joined"] = now
+    assign_serials(db, rows, lambda row: names[row["type_id"]][:3].upper())
+
+@router.post("/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_items(
+    request: Request,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """Create items from a JSON array or NDJSON body; reports each row"""
+    db, current_user = db_user
+    rows = await read_rows(request)
+    return await run_in_threadpool(bulk_create, db, models.Item, schemas.ItemCreate, rows, prepare_items,
+                                  record_openings)
+
 @router.get("/", response_model=List[schemas.Item])
-def read_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = db.query(models.Item).offset(skip).limit(limit).all()
+def read_items(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: Session = Depends(get_db)
+):
+    items = list_view(db.query(models.Item), models.Item.id, schemas.ItemSummary, view, skip, limit, cursor, response)
     return items
 
+@router.get("/stock/", response_model=List[schemas.ItemStock])
+def read_item_stock(
+    response: Response,
+    type_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Stock on hand, checked out and overdue per item"""
+    query = db.query(models.Item)
+    if type_id is not None:
+        query = query.filter(models.Item.type_id == type_id)
+    return paginate(query, models.Item.id, skip, limit, cursor, response)
+
+@router.get("/{item_id}/movements", response_model=List[schemas.StockMovement])
+def read_item_movements(
+    item_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """The stock ledger of an item, oldest first"""
+    query = db.query(models.StockMovement).filter(models.StockMovement.item_id == item_id)
+    return paginate(query.order_by(models.StockMovement.id), models.StockMovement.id, skip, limit, cursor, response)
+
 @router.get("/{item_id}", response_model=schemas.Item)
 def read_item(item_id: int, db: Session = Depends(get_db)):
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
@@ -73,13 +119,17 @@ def update_item(
     db_user: Tuple[Session, models.User] = Depends(get_db_user)
 ):
     db, current_user = db_user
-    db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    # Locked so no checkout lands between reading and adjusting the stock
+    db_item = db.query(models.Item).filter(models.Item.id == item_id).with_for_update().first()
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     
     with audit_context(db, "UPDATE"):
-        for var, value in vars(item).items():
+        values = vars(item).copy()
+        quantity = values.pop("quantity")
+        for var, value in values.items():
             setattr(db_item, var, value)
+        adjust_stock(db, db_item, quantity)
         
         db.commit()
         db.refresh(db_item)
@@ -102,21 +152,22 @@ def delete_item(
     return {"message": "Item deleted successfully"}
 
 @router.get("/types/", response_model=List[schemas.ItemType])
-def read_item_types(db: Session = Depends(get_db)):
-    item_types = db.query(models.ItemType).all()
-    return item_types
+def read_item_types(request: Request, response: Response):
+    snapshot = reference_cache.snapshot("item_types")
+    return not_modified(request, response, snapshot.etag) or snapshot.rows
 
 @router.get("/types/{item_type_id}", response_model=schemas.ItemType)
-def read_item_type(item_type_id: int, db: Session = Depends(get_db)):
-    item_type = db.query(models.ItemType).filter(models.ItemType.id == item_type_id).first()
+def read_item_type(item_type_id: int, request: Request, response: Response):
+    item_type = reference_cache.get("item_types", item_type_id)
     if item_type is None:
         raise HTTPException(status_code=404, detail="Item type not found")
-    return item_type
+    return not_modified(request, response, reference_cache.snapshot("item_types").etag) or item_type
 
 @router.post("/types/", response_model=schemas.ItemType)
 def create_item_type(item_type: schemas.ItemTypeCreate, db: Session = Depends(get_db)):
     db_item_type = models.ItemType(**item_type.dict())
     db.add(db_item_type)
+    reference_changed(db, "item_types")
     db.commit()
     db.refresh(db_item_type)
     return db_item_type
@@ -130,6 +181,7 @@ def update_item_type(item_type_id: int, item_type: schemas.ItemTypeCreate, db: S
     for var, value in vars(item_type).items():
         setattr(db_item_type, var, value)
     
+    reference_changed(db, "item_types")
     db.commit()
     db.refresh(db_item_type)
     return db_item_type
@@ -141,6 +193,7 @@ def delete_item_type(item_type_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Item type not found")
     
     db.delete(db_item_type)
+    reference_changed(db, "item_types")
     db.commit()
     return {"message": "Item type deleted successfully"}
 
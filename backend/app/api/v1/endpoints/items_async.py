@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from datetime import datetime
+from ....db.session import get_async_db
+from ....api.pagination import keyset, page_rows
+from ....api.projection import View, project, summary_response
+from .... import models, schemas
+from ....core.security import get_current_user_async
+from ....core.audit import async_audit_context
+from ....db.stock import adjust_stock, record_openings
+from .items import generate_item_serial
+
+# Async counterparts of the item CRUD routes in items.py, mounted in their
+# place when ASYNC_DB is enabled. Type routes stay on the sync router.
+router = APIRouter(dependencies=[Depends(get_current_user_async)])
+
+async def get_item(db: AsyncSession, item_id: int) -> models.Item:
+    result = await db.execute(
+        select(models.Item)
+        .options(selectinload(models.Item.item_type))
+        .where(models.Item.id == item_id)
+    )
+    db_item = result.scalars().first()
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return db_item
+
+@router.post("/", response_model=schemas.Item)
+async def create_item_async(item: schemas.ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    async with async_audit_context(db, "CREATE"):
+        db_item = models.Item(**item.dict())
+        db_item.date_joined = datetime.now()
+        db_item.serial_number = await db.run_sync(generate_item_serial, item.type_id)
+
+        db.add(db_item)
+        await db.flush()
+        await db.run_sync(record_openings, [{"id": db_item.id, "quantity": db_item.quantity}])
+        await db.commit()
+        return await get_item(db, db_item.id)
+
+@router.get("/", response_model=List[schemas.Item])
+async def read_items_async(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: AsyncSession = Depends(get_async_db)
+):
+    if view == "summary":
+        query = project(select(models.Item), schemas.ItemSummary)
+    else:
+        query = select(models.Item).options(selectinload(models.Item.item_type))
+    if cursor is None:
+        result = await db.execute(query.offset(skip).limit(limit))
+        items = result.scalars().all()
+    else:
+        result = await db.execute(keyset(query, models.Item.id, limit, cursor))
+        items = page_rows(result.scalars(), limit, response)
+    if view == "summary":
+        return summary_response(schemas.ItemSummary, items, response)
+    return items
+
+@router.get("/{item_id}", response_model=schemas.Item)
+async def read_item_async(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await get_item(db, item_id)
+
+@router.put("/{item_id}", response_model=schemas.Item)
+async def update_item_async(item_id: int, item: schemas.ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    # Locked so no checkout lands between reading and adjusting the stock
+    result = await db.execute(select(models.Item).where(models.Item.id == item_id).with_for_update())
+    db_item = result.scalars().first()
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    async with async_audit_context(db, "UPDATE"):
+        values = vars(item).copy()
+        quantity = values.pop("quantity")
+        for var, value in values.items():
+            setattr(db_item, var, value)
+        await db.run_sync(adjust_stock, db_item, quantity)
+
+        await db.commit()
+        await db.refresh(db_item, attribute_names=["quantity", "checked_out", "overdue", "date_updated", "item_type"])
+        return db_item
+
+@router.delete("/{item_id}")
+async def delete_item_async(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_item = await get_item(db, item_id)
+    async with async_audit_context(db, "DELETE"):
+        await db.delete(db_item)
+        await db.commit()
+        return {"message": "Item deleted successfully"}
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from ....core.security import get_current_user, password_hash_stats, principal_cache
+from ....core.audit import audit_writer
+from ....db import session
+from ....db.reference import reference_cache
+from ....db.overdue import overdue_job
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+@router.get("/")
+def read_metrics():
+    metrics = {
+        "principal_cache": principal_cache.stats(),
+        "db_pool": session.pool_status(),
+        "password_hash": password_hash_stats(),
+        "audit_writer": audit_writer.stats(),
+        "reference_cache": reference_cache.stats(),
+        "overdue_digest": overdue_job.stats(),
+    }
+    if session.async_engine is not None:
+        metrics["async_db_pool"] = session.pool_status(session.async_engine.sync_engine)
+    return metrics
@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime
+from ....api.deps import get_db, get_db_user
+from ....api.pagination import paginate
+from .... import models, schemas
+from ....core.security import get_current_user
+from ....core.audit import audit_context
+from ....db.reservations import MAX_AVAILABILITY_DAYS, Unavailable, availability, check_available
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+def reservation_values(reservation: schemas.ReservationCreate, requested_by_id: Optional[int]) -> Dict[str, Any]:
+    """Column values of ``reservation``; ``requested_by_id`` stands in when it names no requester"""
+    if reservation.end <= reservation.start:
+        raise HTTPException(status_code=400, detail="A reservation must end after it starts")
+    values = reservation.dict()
+    values["period"] = Range(values.pop("start"), values.pop("end"), bounds="[)")
+    if values["requested_by_id"] is None:
+        values["requested_by_id"] = requested_by_id
+    return values
+
+def check_reservation(db: Session, db_reservation: models.Reservation) -> None:
+    try:
+        # Checked before the changes are flushed, e.g. to a missing item
+        with db.no_autoflush:
+            check_available(db, db_reservation)
+    except Unavailable as e:
+        if e.available is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/", response_model=schemas.Reservation)
+def create_reservation(
+    reservation: schemas.ReservationCreate,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    db, current_user = db_user
+    db_reservation = models.Reservation(**reservation_values(reservation, current_user.id))
+    with audit_context(db, "CREATE"):
+        if db_reservation.status != models.TransactionStatus.rejected:
+            check_reservation(db, db_reservation)
+        db.add(db_reservation)
+        db.commit()
+        db.refresh(db_reservation)
+        return db_reservation
+
+@router.get("/", response_model=List[schemas.Reservation])
+def read_reservations(
+    response: Response,
+    item_id: Optional[int] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Reservations, optionally of one item and overlapping ``[from, to)``"""
+    query = db.query(models.Reservation)
+    if item_id is not None:
+        query = query.filter(models.Reservation.item_id == item_id)
+    if start is not None or end is not None:
+        query = query.filter(models.Reservation.period.overlaps(Range(start, end, bounds="[)")))
+    return paginate(query, models.Reservation.id, skip, limit, cursor, response)
+
+@router.get("/availability", response_model=schemas.Availability)
+def read_availability(
+    start: date = Query(alias="from"),
+    days: int = Query(31, ge=1, le=MAX_AVAILABILITY_DAYS),
+    item_id: Optional[List[int]] = Query(None),
+    type_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Free quantity of each item per day, for a calendar of ``days`` days from ``from``"""
+    return {"start": start, "days": days, "items": availability(db, start, days, item_id, type_id)}
+
+@router.get("/{reservation_id}", response_model=schemas.Reservation)
+def read_reservation(reservation_id: int, db: Session = Depends(get_db)):
+    db_reservation = db.query(models.Reservation).filter(models.Reservation.id == reservation_id).first()
+    if db_reservation is None:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    return db_reservation
+
+@router.put("/{reservation_id}", response_model=schemas.Reservation)
+def update_reservation(
+    reservation_id: int,
+    reservation: schemas.ReservationCreate,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    db, current_user = db_user
+    db_reservation = db.query(models.Reservation).filter(models.Reservation.id == reservation_id).first()
+    if db_reservation is None:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    with audit_context(db, "UPDATE"):
+        # An update that names no requester keeps the one it has
+        for var, value in reservation_values(reservation, db_reservation.requested_by_id).items():
+            setattr(db_reservation, var, value)
+        if db_reservation.status != models.TransactionStatus.rejected:
+            check_reservation(db, db_reservation)
+        db.commit()
+        db.refresh(db_reservation)
+        return db_reservation
+
+@router.delete("/{reservation_id}")
+def delete_reservation(
+    reservation_id: int,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    db, current_user = db_user
+    db_reservation = db.query(models.Reservation).filter(models.Reservation.id == reservation_id).first()
+    if db_reservation is None:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    with audit_context(db, "DELETE"):
+        db.delete(db_reservation)
+        db.commit()
+        return {"message": "Reservation deleted successfully"}
@@ -1,22 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Tuple
-from ....api.deps import get_db_user
-from ....db.session import SessionLocal
+from typing import List, Optional, Tuple
+from datetime import date
+from ....api.deps import get_db, get_db_user
+from ....api.pagination import paginate
 from .... import models, schemas
 from ....core.security import get_current_user
 from ....core.audit import audit_context
+from ....api.etag import not_modified
+from ....db.reference import reference_cache, reference_changed
+from ....db.calendar import MAX_CALENDAR_DAYS, CalendarView, calendar, calendar_range
 
 
-router = APIRouter()
-
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(dependencies=[Depends(get_current_user)])
 
 ######### Root level CRUD operations #########
 @router.post("/", response_model=schemas.Schedule)
@@ -33,10 +29,37 @@ def create_schedule(
         return db_schedule
 
 @router.get("/", response_model=List[schemas.Schedule])
-def read_schedules(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    schedules = db.query(models.Schedule).offset(skip).limit(limit).all()
+def read_schedules(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    schedules = paginate(db.query(models.Schedule), models.Schedule.id, skip, limit, cursor, response)
     return schedules
 
+@router.get("/calendar", response_model=schemas.Calendar)
+def read_calendar(
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    view: CalendarView = "week",
+    user_id: Optional[int] = None,
+    type_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Schedules from ``from`` until ``to`` (exclusive) by day, grouped into
+    days, weeks or months. Without ``to`` it covers the period containing
+    ``from``, by default the current one.
+    """
+    start, end = calendar_range(start, end, view)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="to must be after from")
+    if (end - start).days > MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"A calendar covers at most {MAX_CALENDAR_DAYS} days")
+    return calendar(db, start, end, view, user_id=user_id, type_id=type_id)
+
 @router.get("/{schedule_id}", response_model=schemas.Schedule)
 def read_schedule(schedule_id: int, db: Session = Depends(get_db)):
     db_schedule = db.query(models.Schedule).filter(models.Schedule.id == schedule_id).first()
@@ -80,22 +103,23 @@ def delete_schedule(
 
 ######### Shifts CRUD operations #########
 @router.get("/shifts/", response_model=List[schemas.Shift])
-def read_shifts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    shifts = db.query(models.Shift).offset(skip).limit(limit).all()
-    return shifts
+def read_shifts(request: Request, response: Response, skip: int = 0, limit: int = 100):
+    snapshot = reference_cache.snapshot("shifts")
+    return not_modified(request, response, snapshot.etag) or snapshot.rows[skip:skip + limit]
 
 @router.get("/shifts/{shift_id}", response_model=schemas.Shift)
-def read_shift(shift_id: int, db: Session = Depends(get_db)):
-    db_shift = db.query(models.Shift).filter(models.Shift.id == shift_id).first()
-    if db_shift is None:
+def read_shift(shift_id: int, request: Request, response: Response):
+    shift = reference_cache.get("shifts", shift_id)
+    if shift is None:
         raise HTTPException(status_code=404, detail="Shift not found")
-    return db_shift
+    return not_modified(request, response, reference_cache.snapshot("shifts").etag) or shift
 
 @router.post("/shifts/", response_model=schemas.Shift)
 def create_shift(shift: schemas.ShiftCreate, db: Session = Depends(get_db)):
     db_shift = models.Shift(**shift.dict())
 
     db.add(db_shift)
+    reference_changed(db, "shifts")
     db.commit()
     db.refresh(db_shift)
     return db_shift
@@ -109,6 +133,7 @@ def update_shift(shift_id: int, shift: schemas.ShiftCreate, db: Session = Depend
     for var, value in vars(shift).items():
         setattr(db_shift, var, value)
     
+    reference_changed(db, "shifts")
     db.commit()
     db.refresh(db_shift)
     return db_shift
@@ -120,28 +145,30 @@ def delete_shift(shift_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Shift not found")
     
     db.delete(db_shift)
+    reference_changed(db, "shifts")
     db.commit()
     return {"message": "Shift deleted successfully"}
 
 
 ######### Schedule Types CRUD operations #########
 @router.get("/types/", response_model=List[schemas.ScheduleType])
-def read_schedule_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    schedule_types = db.query(models.ScheduleType).offset(skip).limit(limit).all()
-    return schedule_types
+def read_schedule_types(request: Request, response: Response, skip: int = 0, limit: int = 100):
+    snapshot = reference_cache.snapshot("schedule_types")
+    return not_modified(request, response, snapshot.etag) or snapshot.rows[skip:skip + limit]
 
 @router.get("/types/{type_id}", response_model=schemas.ScheduleType)
-def read_schedule_type(type_id: int, db: Session = Depends(get_db)):
-    db_schedule_type = db.query(models.ScheduleType).filter(models.ScheduleType.id == type_id).first()
-    if db_schedule_type is None:
+def read_schedule_type(type_id: int, request: Request, response: Response):
+    schedule_type = reference_cache.get("schedule_types", type_id)
+    if schedule_type is None:
         raise HTTPException(status_code=404, detail="Schedule type not found")
-    return db_schedule_type
+    return not_modified(request, response, reference_cache.snapshot("schedule_types").etag) or schedule_type
 
 @router.post("/types/", response_model=schemas.ScheduleType)
 def create_schedule_type(schedule_type: schemas.ScheduleTypeCreate, db: Session = Depends(get_db)):
     db_schedule_type = models.ScheduleType(**schedule_type.dict())
 
     db.add(db_schedule_type)
+    reference_changed(db, "schedule_types")
     db.commit()
     db.refresh(db_schedule_type)
     return db_schedule_type
@@ -155,6 +182,7 @@ def update_schedule_type(type_id: int, schedule_type: schemas.ScheduleTypeCreate
     for var, value in vars(schedule_type).items():
         setattr(db_schedule_type, var, value)
     
+    reference_changed(db, "schedule_types")
     db.commit()
     db.refresh(db_schedule_type)
     return db_schedule_type
@@ -166,14 +194,25 @@ def delete_schedule_type(type_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Schedule type not found")
     
     db.delete(db_schedule_type)
+    reference_changed(db, "schedule_types")
     db.commit()
     return {"message": "Schedule type deleted successfully"}
 
 
 ######### User's Schedules CRUD operations #########
 @router.get("/user/{user_id}", response_model=List[schemas.Schedule])
-def read_my_schedules(user_id: int, db: Session = Depends(get_db)):
+def read_my_schedules(
+    user_id: int,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
+):
     # get the current user using security dependency
-    schedules = db.query(models.Schedule).filter(models.Schedule.user_id == user_id).all()
+    query = db.query(models.Schedule).filter(models.Schedule.user_id == user_id)
+    if start is not None:
+        query = query.filter(models.Schedule.date >= start)
+    if end is not None:
+        query = query.filter(models.Schedule.date < end)
+    schedules = query.order_by(models.Schedule.date).all()
     return schedules
 
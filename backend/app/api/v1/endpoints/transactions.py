@@ -1,21 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Tuple
-from ....api.deps import get_db_user
-from ....db.session import SessionLocal
+from typing import List, Optional, Tuple
+from datetime import datetime
+from ....api.deps import get_db, get_db_user
+from ....api.pagination import paginate
+from ....api.projection import View, list_view
 from .... import models, schemas
 from ....core.security import get_current_user
 from ....core.audit import audit_context
+from ....api.etag import not_modified
+from ....db.reference import reference_cache, reference_changed
+from ....db.overdue import overdue_loans
+from ....db.stock import Hold, OutOfStock, hold_changed, stock_hold
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-# Dependency
-def get_db():
-    db = SessionLocal()
+def check_loan(transaction: schemas.TransactionCreate) -> None:
+    if transaction.item_id is not None and transaction.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantity of a loan must be positive")
+
+def move_held_stock(db: Session, db_transaction: models.Transaction, before: Optional[Hold]) -> None:
+    """Bring the stock ledger in line with the transaction's new hold"""
     try:
-        yield db
-    finally:
-        db.close()
+        hold_changed(db, db_transaction, before, stock_hold(db_transaction))
+    except OutOfStock as e:
+        if e.available is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        raise HTTPException(status_code=409, detail=str(e))
+
+def get_locked_transaction(db: Session, transaction_id: int) -> models.Transaction:
+    # Locked so concurrent updates of the same loan move its stock once
+    db_transaction = (
+        db.query(models.Transaction)
+        .filter(models.Transaction.id == transaction_id)
+        .with_for_update()
+        .first()
+    )
+    if db_transaction is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return db_transaction
 
 @router.post("/", response_model=schemas.Transaction)
 def create_transaction(
@@ -23,18 +46,68 @@ def create_transaction(
     db_user: Tuple[Session, models.User] = Depends(get_db_user)
 ):
     db, current_user = db_user
+    check_loan(transaction)
     with audit_context(db, "CREATE"):
         db_transaction = models.Transaction(**transaction.dict())
         db.add(db_transaction)
+        db.flush()
+        move_held_stock(db, db_transaction, None)
         db.commit()
         db.refresh(db_transaction)
         return db_transaction
 
 @router.get("/", response_model=List[schemas.Transaction])
-def read_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    transactions = db.query(models.Transaction).offset(skip).limit(limit).all()
+def read_transactions(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    view: View = "full",
+    db: Session = Depends(get_db)
+):
+    transactions = list_view(db.query(models.Transaction), models.Transaction.id, schemas.TransactionSummary, view, skip, limit, cursor, response)
     return transactions
 
+@router.get("/open/", response_model=List[schemas.TransactionSummary])
+def read_open_transactions(
+    response: Response,
+    requested_by_id: Optional[int] = None,
+    status: Optional[schemas.TransactionStatus] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Transactions not returned yet"""
+    query = db.query(models.Transaction).filter(models.Transaction.date_returned.is_(None))
+    if requested_by_id is not None:
+        query = query.filter(models.Transaction.requested_by_id == requested_by_id)
+    if status is not None:
+        query = query.filter(models.Transaction.status == status)
+    return paginate(query, models.Transaction.id, skip, limit, cursor, response)
+
+@router.get("/overdue/", response_model=List[schemas.OverdueRequester])
+def read_overdue_transactions(requested_by_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Open loans past their due date, grouped by requester"""
+    return overdue_loans(db, requested_by_id=requested_by_id)
+
+@router.get("/overdue/digest", response_model=List[schemas.OverdueDigest])
+def read_overdue_digest(db: Session = Depends(get_db)):
+    """Overdue totals per requester as of the last digest refresh"""
+    return (
+        db.query(
+            models.OverdueDigest.requested_by_id,
+            models.User.name,
+            models.OverdueDigest.loans,
+            models.OverdueDigest.quantity,
+            models.OverdueDigest.oldest_due_date,
+            models.OverdueDigest.refreshed_at,
+        )
+        .join(models.User, models.User.id == models.OverdueDigest.requested_by_id)
+        .order_by(models.OverdueDigest.oldest_due_date)
+        .all()
+    )
+
 @router.get("/{transaction_id}", response_model=schemas.Transaction)
 def read_transaction(transaction_id: int, db: Session = Depends(get_db)):
     db_transaction = db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
@@ -49,13 +122,33 @@ def update_transaction(
     db_user: Tuple[Session, models.User] = Depends(get_db_user)
 ):
     db, current_user = db_user
-    db_transaction = db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
-    if db_transaction is None:
-        raise HTTPException(status_code=404, detail="Transaction not found")
+    check_loan(transaction)
+    db_transaction = get_locked_transaction(db, transaction_id)
     
     with audit_context(db, "UPDATE"):
+        before = stock_hold(db_transaction)
         for var, value in vars(transaction).items():
             setattr(db_transaction, var, value)
+        move_held_stock(db, db_transaction, before)
+        db.commit()
+        db.refresh(db_transaction)
+        return db_transaction
+
+@router.post("/{transaction_id}/return", response_model=schemas.Transaction)
+def return_transaction(
+    transaction_id: int,
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    """Mark a loan returned now and put its items back in stock"""
+    db, current_user = db_user
+    db_transaction = get_locked_transaction(db, transaction_id)
+    if db_transaction.date_returned is not None:
+        raise HTTPException(status_code=409, detail="Transaction already returned")
+    
+    with audit_context(db, "UPDATE"):
+        before = stock_hold(db_transaction)
+        db_transaction.date_returned = datetime.now()
+        move_held_stock(db, db_transaction, before)
         db.commit()
         db.refresh(db_transaction)
         return db_transaction
@@ -66,31 +159,31 @@ def delete_transaction(
     db_user: Tuple[Session, models.User] = Depends(get_db_user)
 ):
     db, current_user = db_user
-    db_transaction = db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
-    if db_transaction is None:
-        raise HTTPException(status_code=404, detail="Transaction not found")
+    db_transaction = get_locked_transaction(db, transaction_id)
     
     with audit_context(db, "DELETE"):
+        hold_changed(db, db_transaction, stock_hold(db_transaction), None)
         db.delete(db_transaction)
         db.commit()
         return {"message": "Transaction deleted successfully"}
 
 @router.get("/types/", response_model=List[schemas.TransactionType])
-def read_transaction_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    transaction_types = db.query(models.TransactionType).offset(skip).limit(limit).all()
-    return transaction_types
+def read_transaction_types(request: Request, response: Response, skip: int = 0, limit: int = 100):
+    snapshot = reference_cache.snapshot("transaction_types")
+    return not_modified(request, response, snapshot.etag) or snapshot.rows[skip:skip + limit]
 
 @router.get("/types/{transaction_type_id}", response_model=schemas.TransactionType)
-def read_transaction_type(transaction_type_id: int, db: Session = Depends(get_db)):
-    db_transaction_type = db.query(models.TransactionType).filter(models.TransactionType.id == transaction_type_id).first()
-    if db_transaction_type is None:
+def read_transaction_type(transaction_type_id: int, request: Request, response: Response):
+    transaction_type = reference_cache.get("transaction_types", transaction_type_id)
+    if transaction_type is None:
         raise HTTPException(status_code=404, detail="Transaction type not found")
-    return db_transaction_type
+    return not_modified(request, response, reference_cache.snapshot("transaction_types").etag) or transaction_type
 
 @router.post("/types/", response_model=schemas.TransactionType)
 def create_transaction_type(transaction_type: schemas.TransactionTypeCreate, db: Session = Depends(get_db)):
     db_transaction_type = models.TransactionType(**transaction_type.dict())
     db.add(db_transaction_type)
+    reference_changed(db, "transaction_types")
     db.commit()
     db.refresh(db_transaction_type)
     return db_transaction_type
@@ -104,6 +197,7 @@ def update_transaction_type(transaction_type_id: int, transaction_type: schemas.
     for var, value in vars(transaction_type).items():
         setattr(db_transaction_type, var, value)
     
+    reference_changed(db, "transaction_types")
     db.commit()
     db.refresh(db_transaction_type)
     return db_transaction_type
@@ -115,6 +209,7 @@ def delete_transaction_type(transaction_type_id: int, db: Session = Depends(get_
         raise HTTPException(status_code=404, detail="Transaction type not found")
     
     db.delete(db_transaction_type)
+    reference_changed(db, "transaction_types")
     db.commit()
     return {"message": "Transaction type deleted successfully"}
 
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from sqlalchemy.orm import Session
-from typing import List, Tuple
-from ....db.session import SessionLocal, engine
+from typing import List, Optional, Tuple
+from ....db.session import engine
 from .... import models, schemas
-from ....core.security import get_password_hash, get_current_user
+from starlette.concurrency import run_in_threadpool
+from ....core.security import get_password_hash_async, get_current_user, principal_cache
 from ....core.audit import audit_context
-from ....api.deps import get_db_user
+from ....core.permissions import has_permissions, require
+from ....core.blobstore import BlobTooLarge, NotAnImage, blob_store, ensure_thumbnail, store_picture
+from ....core.config import settings
+from ....api.deps import get_db, get_db_user
+from ....api.pagination import paginate
+from ....api.loaders import load_user_tree, user_load_options, user_tree
+from ....api.etag import not_modified
+from ....db.reference import reference_cache, reference_changed
 import pprint
 
 # Create tables
@@ -13,23 +21,31 @@ models.Base.metadata.create_all(bind=engine)
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-# Dependency
-def get_db():
-    db = SessionLocal()
+def picture_reference(value: Optional[str]) -> Optional[str]:
     try:
-        yield db
-    finally:
-        db.close()
+        return store_picture(value)
+    except BlobTooLarge:
+        raise HTTPException(status_code=413, detail="Profile picture is too large")
+    except NotAnImage:
+        raise HTTPException(status_code=400, detail="Profile picture is not a supported image")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db_user: Tuple[Session, models.User] = Depends(get_db_user)):
+# Create and update hash on the hashing pool while awaiting, then do the
+# database work in the threadpool, so no thread sits blocked on bcrypt.
+@router.post("/", response_model=schemas.User, dependencies=[Depends(require("add-user"))])
+async def create_user(user: schemas.UserCreate, db_user: Tuple[Session, models.User] = Depends(get_db_user)):
     db, current_user = db_user
-    db_user = db.query(models.User).filter(models.User.phone_number == user.phone_number).first()
-    if db_user:
+    taken = await run_in_threadpool(
+        db.query(models.User.id).filter(models.User.phone_number == user.phone_number).first
+    )
+    if taken:
         raise HTTPException(status_code=400, detail="Phone number already registered")
-    
+    hashed_password = await get_password_hash_async(user.password)
+    return await run_in_threadpool(insert_user, db, user, hashed_password)
+
+def insert_user(db: Session, user: schemas.UserCreate, hashed_password: str) -> dict:
     with audit_context(db, "CREATE"):
-        hashed_password = get_password_hash(user.password)
         db_user = models.User(
             phone_number=user.phone_number,
             name=user.name,
@@ -38,47 +54,70 @@ def create_user(user: schemas.UserCreate, db_user: Tuple[Session, models.User] =
         )
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
-        return db_user
+        return load_user_tree(db, db_user.id)
 
 @router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, type: str = None, db: Session = Depends(get_db)):
-    query = db.query(models.User)
+def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    type: str = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    query = db.query(models.User).options(*user_load_options())
     
     if type:
         # Get the type_id from the type name
-        user_type = db.query(models.UserType).filter(models.UserType.name == type).first()
+        user_type = reference_cache.find("user_types", type)
         if not user_type:
             raise HTTPException(status_code=404, detail=f"User type '{type}' not found")
-        query = query.filter(models.User.type_id == user_type.id)
+        query = query.filter(models.User.type_id == user_type["id"])
     
-    users = query.offset(skip).limit(limit).all()
-    return users
+    users = paginate(query, models.User.id, skip, limit, cursor, response)
+    return [user_tree(user) for user in users]
 
 @router.get("/{user_id}", response_model=schemas.User)
 def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    db_user = load_user_tree(db, user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.put("/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user: schemas.UserCreate, db_user: Tuple[Session, models.User] = Depends(get_db_user)):
+async def update_user(user_id: int, user: schemas.UserCreate, db_user: Tuple[Session, models.User] = Depends(get_db_user)):
     db, current_user = db_user
+    # An empty password leaves it unchanged
+    hashed_password = await get_password_hash_async(user.password) if user.password else None
+    return await run_in_threadpool(save_user, db, current_user, user_id, user, hashed_password)
+
+def check_user_update(current_user: models.User, db_user: models.User, user: schemas.UserCreate) -> None:
+    """Anyone may edit their own profile; other users and types need roles"""
+    if db_user.id != current_user.id and not has_permissions(current_user, "update-user"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Requires permission: update-user")
+    if user.type_id != db_user.type_id and not has_permissions(current_user, "update-user-type"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Requires permission: update-user-type")
+
+def save_user(
+    db: Session, current_user: models.User, user_id: int, user: schemas.UserCreate, hashed_password: Optional[str]
+) -> dict:
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    check_user_update(current_user, db_user, user)
     
     with audit_context(db, "UPDATE"):
         for var, value in vars(user).items():
-            if var != "password":
+            if var == "profile_picture":
+                db_user.profile_picture = picture_reference(value)
+            elif var != "password":
                 setattr(db_user, var, value)
-            else:
-                db_user.hashed_password = get_password_hash(value)
+            elif hashed_password is not None:
+                db_user.hashed_password = hashed_password
         
         db.commit()
-        db.refresh(db_user)
-        return db_user
+        principal_cache.invalidate_user(user_id)
+        return load_user_tree(db, user_id)
 
 @router.delete("/{user_id}")
 def delete_user(user_id: int, db_user: Tuple[Session, models.User] = Depends(get_db_user)):
@@ -90,12 +129,40 @@ def delete_user(user_id: int, db_user: Tuple[Session, models.User] = Depends(get
     with audit_context(db, "DELETE"):
         db.delete(db_user)
         db.commit()
+        principal_cache.invalidate_user(user_id)
         return {"message": "User deleted successfully"} 
 
-@router.put("/{user_id}/profile-picture")
-async def update_profile_picture(
+@router.post("/{user_id}/profile-picture", response_model=schemas.User)
+def upload_profile_picture(
+    user_id: int,
+    profile_picture: UploadFile = File(...),
+    db_user: Tuple[Session, models.User] = Depends(get_db_user)
+):
+    db, current_user = db_user
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        digest = blob_store.put_file(profile_picture.file, settings.PROFILE_PICTURE_MAX_BYTES)
+    except BlobTooLarge:
+        raise HTTPException(status_code=413, detail="Profile picture is too large")
+    try:
+        # Renders the thumbnail up front, which also rejects non-images
+        ensure_thumbnail(digest)
+    except NotAnImage:
+        raise HTTPException(status_code=400, detail="Profile picture is not a supported image")
+
+    with audit_context(db, "UPDATE"):
+        db_user.profile_picture = digest
+        db.commit()
+        principal_cache.invalidate_user(user_id)
+        return load_user_tree(db, user_id)
+
+@router.put("/{user_id}/profile-picture", response_model=schemas.User)
+def update_profile_picture(
     user_id: int,
-    image: str,  # Base64 encoded image
+    image: str,  # Base64 encoded image or blob reference
     db_user: Tuple[Session, models.User] = Depends(get_db_user)
 ):
     db, current_user = db_user
@@ -104,12 +171,12 @@ async def update_profile_picture(
         raise HTTPException(status_code=404, detail="User not found")
     
     with audit_context(db, "UPDATE"):
-        db_user.profile_picture = image
+        db_user.profile_picture = picture_reference(image)
         db.commit()
-        db.refresh(db_user)
-        return db_user
+        principal_cache.invalidate_user(user_id)
+        return load_user_tree(db, user_id)
     
-@router.put("/{user_id}/kristna-abat/{kristna_abat_id}")
+@router.put("/{user_id}/kristna-abat/{kristna_abat_id}", response_model=schemas.User)
 def assign_kristna_abat(
     user_id: int,
     kristna_abat_id: int,
@@ -123,8 +190,8 @@ def assign_kristna_abat(
         raise HTTPException(status_code=404, detail="User not found")
         
     # Check if kristna_abat is a priest
-    priest_type = db.query(models.UserType).filter(models.UserType.name == "Priest").first()
-    if kristna_abat.type_id != priest_type.id:
+    priest_type = reference_cache.find("user_types", "Priest")
+    if priest_type is None or kristna_abat.type_id != priest_type["id"]:
         raise HTTPException(
             status_code=400,
             detail="Only priests can be assigned as Kristna Abat"
@@ -133,10 +200,10 @@ def assign_kristna_abat(
     with audit_context(db, "UPDATE"):
         user.kristna_abat_id = kristna_abat_id
         db.commit()
-        db.refresh(user)
-        return user
+        principal_cache.invalidate_user(user_id)
+        return load_user_tree(db, user_id)
 
-@router.delete("/{user_id}/kristna-abat")
+@router.delete("/{user_id}/kristna-abat", response_model=schemas.User)
 def remove_kristna_abat(
     user_id: int,
     db_user: Tuple[Session, models.User] = Depends(get_db_user)
@@ -149,44 +216,46 @@ def remove_kristna_abat(
     with audit_context(db, "UPDATE"):
         user.kristna_abat_id = None
         db.commit()
-        db.refresh(user)
-        return user
+        principal_cache.invalidate_user(user_id)
+        return load_user_tree(db, user_id)
 
 @router.get("/roles/", response_model=List[schemas.Role])
-def read_roles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    roles = db.query(models.Role).offset(skip).limit(limit).all()
-    return roles
+def read_roles(request: Request, response: Response, skip: int = 0, limit: int = 100):
+    snapshot = reference_cache.snapshot("roles")
+    return not_modified(request, response, snapshot.etag) or snapshot.rows[skip:skip + limit]
 
 @router.get("/roles/{role_id}", response_model=schemas.Role)
-def read_role(role_id: int, db: Session = Depends(get_db)):
-    db_role = db.query(models.Role).filter(models.Role.id == role_id).first()
-    if db_role is None:
+def read_role(role_id: int, request: Request, response: Response):
+    role = reference_cache.get("roles", role_id)
+    if role is None:
         raise HTTPException(status_code=404, detail="Role not found")
-    return db_role
+    return not_modified(request, response, reference_cache.snapshot("roles").etag) or role
 
 
-@router.put("/roles/{role_id}", response_model=schemas.Role)
+@router.put("/roles/{role_id}", response_model=schemas.Role, dependencies=[Depends(require("update-role"))])
 def update_role(role_id: int, role: schemas.Role, db: Session = Depends(get_db)):
     db_role = db.query(models.Role).filter(models.Role.id == role_id).first()
     if db_role is None:
         raise HTTPException(status_code=404, detail="Role not found")
     
     db_role.name = role.name
+    reference_changed(db, "roles", "user_types")
     db.commit()
     db.refresh(db_role)
     return db_role
 
-@router.delete("/roles/{role_id}")
+@router.delete("/roles/{role_id}", dependencies=[Depends(require("delete-role"))])
 def delete_role(role_id: int, db: Session = Depends(get_db)):
     db_role = db.query(models.Role).filter(models.Role.id == role_id).first()
     if db_role is None:
         raise HTTPException(status_code=404, detail="Role not found")
     
     db.delete(db_role)
+    reference_changed(db, "roles", "user_types")
     db.commit()
     return {"message": "Role deleted successfully"}
 
-@router.post("/roles", response_model=schemas.Role)
+@router.post("/roles", response_model=schemas.Role, dependencies=[Depends(require("add-role"))])
 def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
     db_role = db.query(models.Role).filter(models.Role.name == role.name).first()
     if db_role:
@@ -194,53 +263,62 @@ def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
     
     db_role = models.Role(name=role.name)
     db.add(db_role)
+    reference_changed(db, "roles")
     db.commit()
     db.refresh(db_role)
     return db_role
 
 @router.get("/types/", response_model=List[schemas.UserType])
-def read_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    types = db.query(models.UserType).offset(skip).limit(limit).all()
-    return types
+def read_types(request: Request, response: Response, skip: int = 0, limit: int = 100):
+    snapshot = reference_cache.snapshot("user_types")
+    return not_modified(request, response, snapshot.etag) or snapshot.rows[skip:skip + limit]
 
 @router.get("/types/{type_id}", response_model=schemas.UserType)
-def read_type(type_id: int, db: Session = Depends(get_db)):
-    db_type = db.query(models.UserType).filter(models.UserType.id == type_id).first()
-    if db_type is None:
+def read_type(type_id: int, request: Request, response: Response):
+    user_type = reference_cache.get("user_types", type_id)
+    if user_type is None:
         raise HTTPException(status_code=404, detail="Type not found")
-    return db_type
+    return not_modified(request, response, reference_cache.snapshot("user_types").etag) or user_type
 
 @router.get("/types/{type_id}/users", response_model=List[schemas.User])
 def read_type_users(type_id: int, db: Session = Depends(get_db)):
-    db_type = db.query(models.UserType).filter(models.UserType.id == type_id).first()
-    if db_type is None:
+    if reference_cache.get("user_types", type_id) is None:
         raise HTTPException(status_code=404, detail="Type not found")
     
-    users = db.query(models.User).filter(models.User.type_id == type_id).all()
-    return users
+    users = (
+        db.query(models.User)
+        .options(*user_load_options())
+        .filter(models.User.type_id == type_id)
+        .all()
+    )
+    return [user_tree(user) for user in users]
 
-@router.put("/types/{type_id}", response_model=schemas.UserType)
+@router.put("/types/{type_id}", response_model=schemas.UserType, dependencies=[Depends(require("update-user-type"))])
 def update_type(type_id: int, type: schemas.UserType, db: Session = Depends(get_db)):
     db_type = db.query(models.UserType).filter(models.UserType.id == type_id).first()
     if db_type is None:
         raise HTTPException(status_code=404, detail="Type not found")
     
     db_type.name = type.name
+    reference_changed(db, "user_types")
     db.commit()
     db.refresh(db_type)
+    principal_cache.invalidate_type(type_id)
     return db_type
 
-@router.delete("/types/{type_id}")
+@router.delete("/types/{type_id}", dependencies=[Depends(require("delete-user-type"))])
 def delete_type(type_id: int, db: Session = Depends(get_db)):
     db_type = db.query(models.UserType).filter(models.UserType.id == type_id).first()
     if db_type is None:
         raise HTTPException(status_code=404, detail="Type not found")
     
     db.delete(db_type)
+    reference_changed(db, "user_types")
     db.commit()
+    principal_cache.invalidate_type(type_id)
     return {"message": "Type deleted successfully"}
 
-@router.post("/types", response_model=schemas.UserType)
+@router.post("/types", response_model=schemas.UserType, dependencies=[Depends(require("add-user-type"))])
 def create_type(type: schemas.UserTypeCreate, db: Session = Depends(get_db)):
     db_type = db.query(models.UserType).filter(models.UserType.name == type.name).first()
     if db_type:
@@ -248,11 +326,12 @@ def create_type(type: schemas.UserTypeCreate, db: Session = Depends(get_db)):
     
     db_type = models.UserType(name=type.name)
     db.add(db_type)
+    reference_changed(db, "user_types")
     db.commit()
     db.refresh(db_type)
     return db_type
 
-@router.put("/types/{type_id}/roles/{role_id}/")
+@router.put("/types/{type_id}/roles/{role_id}/", dependencies=[Depends(require("update-user-type"))])
 def assign_role_to_type(type_id: int, role_id: int, db: Session = Depends(get_db)):
     db_type = db.query(models.UserType).filter(models.UserType.id == type_id).first()
     db_role = db.query(models.Role).filter(models.Role.id == role_id).first()
@@ -261,10 +340,12 @@ def assign_role_to_type(type_id: int, role_id: int, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Type or Role not found")
     
     db_type.roles.append(db_role)
+    reference_changed(db, "user_types")
     db.commit()
+    principal_cache.invalidate_type(type_id)
     return {"message": "Role assigned to type successfully"}
 
-@router.delete("/types/{type_id}/roles/{role_id}/")
+@router.delete("/types/{type_id}/roles/{role_id}/", dependencies=[Depends(require("update-user-type"))])
 def remove_role_from_type(type_id: int, role_id: int, db: Session = Depends(get_db)):
     db_type = db.query(models.UserType).filter(models.UserType.id == type_id).first()
     db_role = db.query(models.Role).filter(models.Role.id == role_id).first()
@@ -273,5 +354,7 @@ def remove_role_from_type(type_id: int, role_id: int, db: Session = Depends(get_
         raise HTTPException(status_code=404, detail="Type or Role not found")
     
     db_type.roles.remove(db_role)
+    reference_changed(db, "user_types")
     db.commit()
+    principal_cache.invalidate_type(type_id)
     return {"message": "Role removed from type successfully"}
\ No newline at end of file
@@ -1,16 +1,34 @@
-from sqlalchemy import event
+from sqlalchemy import delete, event, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime
-import json
-from typing import Dict, Any
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum as PyEnum
+import atexit
+import hashlib
+import logging
+import queue
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from .. import models
-from contextlib import contextmanager
+from ..core.config import settings
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 import contextvars
 
+logger = logging.getLogger(__name__)
+
 current_user = contextvars.ContextVar('current_user', default=None)
 
+audit_logs = models.AuditLog.__table__
+audit_outbox = models.AuditOutbox.__table__
+
+# Tables whose rows are never audited themselves
+UNAUDITED_TABLES = {'audit_logs', 'audit_outbox', 'serial_counters', 'persons', 'person_documents',
+                    'import_jobs', 'import_errors', 'reference_versions',
+                    'stock_movements', 'overdue_digest'}
+
 class AuditMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         user = request.state.user if hasattr(request.state, 'user') else None
@@ -21,31 +39,69 @@ class AuditMiddleware(BaseHTTPMiddleware):
         finally:
             current_user.reset(token)
 
-def serialize_dict(obj_dict: Dict) -> Dict:
-    """Serialize dictionary values to JSON-compatible format"""
-    result = {}
-    for key, value in obj_dict.items():
-        if key.startswith('_'):
-            continue
-        try:
-            # Test JSON serialization
-            json.dumps({key: value})
-            result[key] = value
-        except TypeError:
-            # Convert non-serializable values to strings
-            result[key] = str(value)
-    return result
-
-def get_changes(old_obj: Dict, new_obj: Dict) -> Dict[str, Any]:
+def encode_text(value: str) -> Any:
+    if len(value) > settings.AUDIT_BLOB_THRESHOLD:
+        return encode_blob(value.encode())
+    return value
+
+def encode_blob(value: bytes) -> Dict[str, Any]:
+    """Large values are recorded by digest and size instead of copied"""
+    return {'sha256': hashlib.sha256(value).hexdigest(), 'length': len(value)}
+
+# Exact-type dispatch for column values; anything else falls back to str()
+ENCODERS = {
+    type(None): lambda value: value,
+    bool: lambda value: value,
+    int: lambda value: value,
+    float: lambda value: value,
+    str: encode_text,
+    bytes: lambda value: encode_blob(value),
+    datetime: lambda value: value.isoformat(),
+    date: lambda value: value.isoformat(),
+    time: lambda value: value.isoformat(),
+    Decimal: str,
+    dict: lambda value: value,
+    list: lambda value: value,
+}
+
+def encode_value(value: Any) -> Any:
+    encoder = ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    if isinstance(value, PyEnum):
+        return encode_value(value.value)
+    return str(value)
+
+_column_keys: Dict[type, Tuple[str, ...]] = {}
+
+def column_keys(cls: type) -> Tuple[str, ...]:
+    """Mapped column attribute names of a model, cached per class"""
+    keys = _column_keys.get(cls)
+    if keys is None:
+        keys = _column_keys[cls] = tuple(attr.key for attr in inspect(cls).column_attrs)
+    return keys
+
+def column_values(instance) -> Dict[str, Any]:
+    """Loaded column values of an instance; unloaded columns are skipped"""
+    loaded = inspect(instance).dict
+    return {
+        key: encode_value(loaded[key])
+        for key in column_keys(type(instance))
+        if key in loaded
+    }
+
+def get_changes(instance) -> Dict[str, Any]:
+    """Old and new values of the columns modified since the last flush"""
+    state = inspect(instance)
     changes = {}
-    old_obj = serialize_dict(old_obj)
-    new_obj = serialize_dict(new_obj)
-    for key in new_obj:
-        if key in old_obj and old_obj[key] != new_obj[key]:
-            changes[key] = {
-                'old': old_obj[key],
-                'new': new_obj[key]
-            }
+    for key in column_keys(type(instance)):
+        history = state.attrs[key].history
+        if not history.added and not history.deleted:
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old != new:
+            changes[key] = {'old': encode_value(old), 'new': encode_value(new)}
     return changes
 
 @contextmanager
@@ -53,65 +109,237 @@ def audit_context(session: Session, action: str):
     """Context manager for audit operations"""
     try:
         yield
-        if session.info.get('audit_data'):
-            for audit_entry in session.info['audit_data']:
-                session.add(audit_entry)
     except Exception as e:
         session.rollback()
         raise e
 
-def create_audit_log(session: Session, table_name: str, record_id: int, 
-                    action: str, changes: Dict = None) -> models.AuditLog:
-    user_id = current_user.get().id if current_user.get() else None
-    
-    audit_log = models.AuditLog(
-        table_name=table_name,
-        record_id=record_id,
-        action=action,
-        changes=json.dumps(changes) if changes else None,
-        user_id=user_id,
-        timestamp=datetime.utcnow()
-    )
-    
-    if 'audit_data' not in session.info:
-        session.info['audit_data'] = []
-    session.info['audit_data'].append(audit_log)
-    
-    return audit_log
-
-@event.listens_for(Session, 'before_flush')
-def before_flush(session, context, instances):
+@asynccontextmanager
+async def async_audit_context(session: AsyncSession, action: str):
+    """``audit_context`` for the async routers"""
+    try:
+        yield
+    except Exception as e:
+        await session.rollback()
+        raise e
+
+def build_audit_record(session: Session, table_name: str, record_id: int,
+                       action: str, changes: Dict = None) -> Dict[str, Any]:
+    """Plain audit_logs row; cheap to build and to hand to another thread"""
+    # Prefer the user authenticated on this request's session; fall back to
+    # the middleware context for sessions opened outside a request.
+    user = session.info.get('current_user') or current_user.get()
+    user_id = user.id if user else None
+
+    return {
+        'table_name': table_name,
+        'record_id': record_id,
+        'action': action,
+        'changes': changes or None,
+        'user_id': user_id,
+        'timestamp': datetime.utcnow(),
+    }
+
+def is_audited(instance) -> bool:
+    table_name = getattr(instance, '__tablename__', None)
+    return table_name is not None and table_name not in UNAUDITED_TABLES
+
+def collect_changes(session: Session) -> List[Dict[str, Any]]:
+    records = []
     for instance in session.new:
-        if hasattr(instance, '__tablename__'):
-            create_audit_log(
+        if is_audited(instance):
+            records.append(build_audit_record(
                 session=session,
                 table_name=instance.__tablename__,
                 record_id=instance.id if hasattr(instance, 'id') else None,
                 action='CREATE',
-                changes=serialize_dict(instance.__dict__)
-            )
+                changes=column_values(instance)
+            ))
 
     for instance in session.dirty:
-        if hasattr(instance, '__tablename__'):
-            changes = get_changes(
-                instance._sa_instance_state.committed_state,
-                instance.__dict__
-            )
+        if is_audited(instance):
+            changes = get_changes(instance)
             if changes:
-                create_audit_log(
+                records.append(build_audit_record(
                     session=session,
                     table_name=instance.__tablename__,
                     record_id=instance.id,
                     action='UPDATE',
                     changes=changes
-                )
+                ))
 
     for instance in session.deleted:
-        if hasattr(instance, '__tablename__'):
-            create_audit_log(
+        if is_audited(instance):
+            records.append(build_audit_record(
                 session=session,
                 table_name=instance.__tablename__,
                 record_id=instance.id,
                 action='DELETE',
-                changes=serialize_dict(instance.__dict__)
-            )
+                changes=column_values(instance)
+            ))
+    return records
+
+def to_outbox_payload(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {**record, 'timestamp': record['timestamp'].isoformat()}
+
+def from_outbox_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {**payload, 'timestamp': datetime.fromisoformat(payload['timestamp'])}
+
+class AuditWriter:
+    """
+    Background thread that batch-inserts audit records.
+
+    In ``async`` mode committed records are queued in memory and written as
+    multi-row INSERTs, off the request path. In ``outbox`` mode the records
+    are already durable in ``audit_outbox`` and the thread relays them into
+    ``audit_logs`` in batches.
+    """
+
+    def __init__(self):
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.bind = None
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def start(self, bind=None) -> None:
+        if self.thread is not None:
+            return
+        if bind is None:
+            from ..db.session import engine as bind
+        self.bind = bind
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="audit-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Drain what is queued, then stop the thread"""
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def submit(self, records: List[Dict[str, Any]]) -> None:
+        if self.thread is None:
+            self.start()
+        for record in records:
+            self.queue.put(record)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": settings.AUDIT_MODE,
+            "running": self.thread is not None,
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+    def run(self) -> None:
+        interval = settings.AUDIT_FLUSH_INTERVAL_MS / 1000
+        while not self.stopping.is_set() or not self.queue.empty():
+            batch = self.next_batch(interval)
+            if batch:
+                self.write(batch)
+            if settings.AUDIT_MODE == 'outbox':
+                self.relay_outbox()
+        if settings.AUDIT_MODE == 'outbox':
+            self.relay_outbox()
+
+    def next_batch(self, interval: float) -> List[Dict[str, Any]]:
+        """Wait up to ``interval`` for a record, then take whatever else is queued"""
+        try:
+            batch = [self.queue.get(timeout=interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < settings.AUDIT_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            with self.bind.begin() as conn:
+                conn.execute(insert(audit_logs), batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to write %d audit records", len(batch))
+
+    def relay_outbox(self) -> None:
+        """Move outbox rows into audit_logs until the outbox is drained"""
+        while True:
+            try:
+                with self.bind.begin() as conn:
+                    picked = (
+                        select(audit_outbox.c.id)
+                        .order_by(audit_outbox.c.id)
+                        .limit(settings.AUDIT_BATCH_SIZE)
+                        .with_for_update(skip_locked=True)
+                    )
+                    payloads = conn.execute(
+                        delete(audit_outbox)
+                        .where(audit_outbox.c.id.in_(picked))
+                        .returning(audit_outbox.c.payload)
+                    ).scalars().all()
+                    if payloads:
+                        conn.execute(insert(audit_logs), [from_outbox_payload(p) for p in payloads])
+            except Exception:
+                logger.exception("Failed to relay audit outbox")
+                return
+            if payloads:
+                self.written += len(payloads)
+                self.batches += 1
+            if len(payloads) < settings.AUDIT_BATCH_SIZE:
+                return
+
+audit_writer = AuditWriter()
+
+def record_bulk_create(session: Session, table_name: str, rows: List[Dict[str, Any]]) -> None:
+    """Audit rows inserted with a Core INSERT, which the ORM hooks don't see"""
+    dispatch_records(session, [
+        build_audit_record(
+            session=session,
+            table_name=table_name,
+            record_id=row.get('id'),
+            action='CREATE',
+            changes={key: encode_value(value) for key, value in row.items()}
+        )
+        for row in rows
+    ])
+
+def dispatch_records(session: Session, records: List[Dict[str, Any]]) -> None:
+    """Write or queue audit records according to AUDIT_MODE"""
+    if not records:
+        return
+
+    if settings.AUDIT_MODE == 'async':
+        session.info.setdefault('audit_records', []).extend(records)
+    elif settings.AUDIT_MODE == 'outbox':
+        session.connection().execute(
+            insert(audit_outbox), [{'payload': to_outbox_payload(r)} for r in records]
+        )
+    else:
+        session.connection().execute(insert(audit_logs), records)
+
+@event.listens_for(Session, 'after_flush')
+def after_flush(session, flush_context):
+    # new/dirty/deleted and attribute history still reflect the flush here,
+    # and primary keys of new rows are already assigned.
+    dispatch_records(session, collect_changes(session))
+
+@event.listens_for(Session, 'after_commit')
+def after_commit(session):
+    records = session.info.pop('audit_records', None)
+    if records:
+        audit_writer.submit(records)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def after_soft_rollback(session, previous_transaction):
+    session.info.pop('audit_records', None)
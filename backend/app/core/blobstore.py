@@ -0,0 +1,164 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Optional
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from .config import settings
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+CHUNK_SIZE = 64 * 1024
+
+class BlobTooLarge(Exception):
+    pass
+
+class NotAnImage(ValueError):
+    pass
+
+class BlobStore:
+    """
+    Content-addressed blobs on the local filesystem.
+
+    A blob lives at ``<root>/<aa>/<digest>`` where ``digest`` is the sha256
+    of its bytes, so identical uploads share one file and a stored blob never
+    changes. Thumbnails are derived files under ``<root>/thumbnails``.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def thumbnail_path(self, digest: str, size: int) -> str:
+        return os.path.join(self.root, "thumbnails", str(size), digest[:2], f"{digest}.jpg")
+
+    def exists(self, digest: str) -> bool:
+        return is_digest(digest) and os.path.exists(self.path(digest))
+
+    def put_file(self, source: BinaryIO, max_bytes: Optional[int] = None) -> str:
+        """Stream ``source`` into the store, hashing as it goes, and return the digest"""
+        os.makedirs(self.root, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise BlobTooLarge()
+                    sha.update(chunk)
+                    tmp.write(chunk)
+            digest = sha.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp_path, target)
+            return digest
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, data: bytes) -> str:
+        from io import BytesIO
+        return self.put_file(BytesIO(data))
+
+blob_store = BlobStore(settings.BLOB_STORE_DIR)
+
+def is_digest(value: Optional[str]) -> bool:
+    return bool(value) and DIGEST_RE.match(value) is not None
+
+def decode_data_url(value: str) -> Optional[bytes]:
+    """Bytes of a base64 string or ``data:...;base64,`` URL, None if it is neither"""
+    if value.startswith("data:"):
+        value = value.split(",", 1)[-1]
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+def sniff_image_type(head: bytes) -> str:
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+def make_thumbnail(source: str, target: str, size: int) -> bool:
+    """
+    Render a ``size`` x ``size`` JPEG thumbnail; runs in the thumbnail pool.
+    Returns False if Pillow can't decode ``source``.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            thumbnail = ImageOps.fit(image.convert("RGB"), (size, size))
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        # UnidentifiedImageError and truncated files are OSErrors
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    thumbnail.save(tmp_path, "JPEG", quality=85)
+    os.replace(tmp_path, target)
+    return True
+
+_thumbnail_pool: Optional[ProcessPoolExecutor] = None
+
+def thumbnail_pool() -> ProcessPoolExecutor:
+    """Process pool for image decoding, created on first use"""
+    global _thumbnail_pool
+    if _thumbnail_pool is None:
+        _thumbnail_pool = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS)
+    return _thumbnail_pool
+
+def ensure_thumbnail(digest: str, size: Optional[int] = None) -> str:
+    """
+    Path of the thumbnail for ``digest``, rendering it in the pool if missing.
+
+    Raises NotAnImage for blobs Pillow can't decode. Blobs never change, so
+    that outcome is recorded next to the thumbnail and the blob isn't
+    decoded again.
+    """
+    size = size or settings.THUMBNAIL_SIZE
+    target = blob_store.thumbnail_path(digest, size)
+    if os.path.exists(target):
+        return target
+    failed = f"{target}.failed"
+    if os.path.exists(failed):
+        raise NotAnImage("Not a supported image")
+    if not thumbnail_pool().submit(make_thumbnail, blob_store.path(digest), target, size).result():
+        os.makedirs(os.path.dirname(failed), exist_ok=True)
+        open(failed, "wb").close()
+        raise NotAnImage("Not a supported image")
+    return target
+
+def store_picture(value: Optional[str]) -> Optional[str]:
+    """
+    Normalise a ``profile_picture`` value to a blob reference.
+
+    References are kept as they are; base64 images from older clients are
+    moved into the store once Pillow decodes them, as uploads are. Raises
+    ValueError (NotAnImage for undecodable bytes) for anything else.
+    """
+    if not value or is_digest(value):
+        return value
+    data = decode_data_url(value)
+    if data is None:
+        raise ValueError("profile_picture must be a blob reference or a base64 image")
+    if len(data) > settings.PROFILE_PICTURE_MAX_BYTES:
+        raise BlobTooLarge()
+    digest = blob_store.put(data)
+    ensure_thumbnail(digest)
+    return digest
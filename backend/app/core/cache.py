@@ -0,0 +1,90 @@
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+import time
+
+
+class PrincipalCache:
+    """
+    In-process cache of verified JWT principals.
+
+    Entries are keyed by the raw token and hold a snapshot of the user's
+    column values, so a repeated request with the same token can be
+    authenticated without querying the users table. An entry never outlives
+    the token's own ``exp`` claim.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, max_size: int = 4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, snapshot: Dict[str, Any], expires_at: Optional[float] = None) -> None:
+        now = time.time()
+        deadline = now + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if deadline <= now:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._evict(now)
+            self._entries[token] = (deadline, snapshot)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._invalidate(lambda snapshot: snapshot.get("id") == user_id)
+
+    def invalidate_type(self, type_id: int) -> None:
+        self._invalidate(lambda snapshot: snapshot.get("type_id") == type_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _invalidate(self, predicate) -> None:
+        with self._lock:
+            stale = [token for token, (_, snapshot) in self._entries.items() if predicate(snapshot)]
+            for token in stale:
+                del self._entries[token]
+            self.invalidations += len(stale)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the oldest ones if the cache is still full"""
+        for token in [t for t, (deadline, _) in self._entries.items() if deadline <= now]:
+            del self._entries[token]
+        while len(self._entries) >= self.max_size:
+            del self._entries[next(iter(self._entries))]
+
+
+def token_expiry(payload: Dict[str, Any]) -> Optional[float]:
+    """Return the ``exp`` claim of a decoded token as a unix timestamp"""
+    exp = payload.get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
@@ -0,0 +1,273 @@
+"""
+Bilingual (Amharic/English) PDF certificates of the religious registers.
+
+Certificates are drawn with reportlab in a process pool. Each worker
+registers the Ethiopic font once, when it starts, and keeps the page layout
+of every register in memory, so a certificate costs only its own drawing.
+``benchmarks/certificates.py`` measures the throughput of the pool.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import io
+import logging
+import os
+import re
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATIN_FONT = "Helvetica"
+LATIN_BOLD_FONT = "Helvetica-Bold"
+ETHIOPIC_FONT = "Ethiopic"
+
+# Looked up when CERTIFICATE_FONT is not set
+ETHIOPIC_FONT_PATHS = [
+    "/usr/share/fonts/truetype/noto/NotoSansEthiopic-Regular.ttf",
+    "/usr/share/fonts/truetype/abyssinica/AbyssinicaSIL-Regular.ttf",
+    "/usr/share/fonts/truetype/ttf-abyssinica/AbyssinicaSIL-R.ttf",
+]
+
+TITLES = {
+    "membership": ("Certificate of Membership", "የአባልነት ምስክር ወረቀት"),
+    "baptism": ("Certificate of Baptism", "የክርስትና ምስክር ወረቀት"),
+    "burial": ("Certificate of Burial", "የቀብር ምስክር ወረቀት"),
+    "marriage": ("Certificate of Marriage", "የጋብቻ ምስክር ወረቀት"),
+}
+
+class Row(NamedTuple):
+    english_label: str
+    amharic_label: str
+    amharic_field: Optional[str]
+    english_field: Optional[str]
+
+PERSON_ROWS = [
+    Row("Name", "ስም", "amharic_name", "english_name"),
+    Row("Christian Name", "የክርስትና ስም", "amharic_christian_name", "english_christian_name"),
+    Row("Father's Name", "የአባት ስም", "amharic_father_name", "english_father_name"),
+    Row("Mother's Name", "የእናት ስም", "amharic_mother_name", "english_mother_name"),
+    Row("Date of Birth", "የትውልድ ቀን", None, "date_of_birth"),
+    Row("Place of Birth", "የትውልድ ቦታ", None, "place_of_birth"),
+]
+WITNESS_ROWS = [
+    Row("Witness 1", "ምስክር 1", "amharic_witness_name_1", "english_witness_name_1"),
+    Row("Witness 2", "ምስክር 2", "amharic_witness_name_2", "english_witness_name_2"),
+]
+PRIEST_ROW = Row("Priest", "ካህን", None, "priest_name")
+
+ROWS = {
+    "membership": PERSON_ROWS + [
+        Row("Address", "መኖሪያ", None, "address"),
+        Row("Phone Number", "ስልክ ቁጥር", None, "phone_number"),
+        PRIEST_ROW,
+    ] + WITNESS_ROWS,
+    "baptism": PERSON_ROWS + [
+        Row("Baptism Date", "የተጠመቀበት ቀን", None, "baptism_date"),
+        Row("Baptism Place", "የተጠመቀበት ቦታ", None, "baptism_place"),
+        Row("Godparent", "የክርስትና ወላጅ", "amharic_god_parent_name", "english_god_parent_name"),
+        PRIEST_ROW,
+    ] + WITNESS_ROWS,
+    "burial": PERSON_ROWS + [
+        Row("Date of Death", "የሞተበት ቀን", None, "date_of_death"),
+        Row("Place of Death", "የሞተበት ቦታ", None, "place_of_death"),
+        Row("Burial Date", "የቀብር ቀን", None, "burial_date"),
+        PRIEST_ROW,
+    ] + WITNESS_ROWS,
+    "marriage": [
+        Row("Groom", "ሙሽራ", "amharic_name", "english_name"),
+        Row("Groom's Christian Name", "የሙሽራ ክርስትና ስም", "amharic_christian_name", "english_christian_name"),
+        Row("Groom's Father", "የሙሽራ አባት ስም", "amharic_father_name", "english_father_name"),
+        Row("Bride", "ሙሽሪት", "amharic_bride_name", "english_bride_name"),
+        Row("Bride's Christian Name", "የሙሽሪት ክርስትና ስም", "amharic_bride_christian_name", "english_bride_christian_name"),
+        Row("Bride's Father", "የሙሽሪት አባት ስም", "amharic_bride_father_name", "english_bride_father_name"),
+        Row("Date of Marriage", "የጋብቻ ቀን", None, "date_of_marriage"),
+        Row("Place of Marriage", "የጋብቻ ቦታ", None, "place_of_marriage"),
+        PRIEST_ROW,
+    ] + WITNESS_ROWS,
+}
+
+_ethiopic_font: Optional[str] = None
+
+def load_fonts() -> str:
+    """
+    Register the Ethiopic font; once per process, as the pool initializer.
+
+    Returns the font name to draw Amharic with. Without an Ethiopic font
+    Amharic text falls back to Helvetica, which has no Ge'ez glyphs.
+    """
+    global _ethiopic_font
+    if _ethiopic_font is None:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        paths = [settings.CERTIFICATE_FONT] if settings.CERTIFICATE_FONT else ETHIOPIC_FONT_PATHS
+        path = next((path for path in paths if os.path.exists(path)), None)
+        if path:
+            pdfmetrics.registerFont(TTFont(ETHIOPIC_FONT, path))
+            _ethiopic_font = ETHIOPIC_FONT
+        else:
+            logger.warning("No Ethiopic font found; set CERTIFICATE_FONT to render Amharic text")
+            _ethiopic_font = LATIN_FONT
+    return _ethiopic_font
+
+class Layout(NamedTuple):
+    width: float
+    height: float
+    margin: float
+    label_x: float
+    value_x: float
+    value_width: float
+    first_row_y: float
+    row_height: float
+
+@lru_cache(maxsize=None)
+def page_layout(kind: str) -> Layout:
+    """Geometry of a register's certificate, computed once per worker"""
+    from reportlab.lib.pagesizes import A4
+
+    width, height = A4
+    margin = 36
+    rows = len(ROWS[kind])
+    # Rows share the space between the titles and the signatures
+    row_height = min(40, (height - 2 * margin - 260) / rows)
+    return Layout(width, height, margin, margin + 30, margin + 190,
+                  width - 2 * margin - 220, height - margin - 140, row_height)
+
+def display_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+def fitted_font_size(text: str, font: str, size: float, width: float) -> float:
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    while size > 7 and stringWidth(text, font, size) > width:
+        size -= 0.5
+    return size
+
+def render_certificate(kind: str, document: Dict[str, Any]) -> bytes:
+    """PDF certificate of one religious document, given as a dict of its columns"""
+    from reportlab.pdfgen import canvas
+
+    ethiopic = load_fonts()
+    layout = page_layout(kind)
+    english_title, amharic_title = TITLES[kind]
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(layout.width, layout.height), pageCompression=1)
+    pdf.setTitle(f"{english_title} {document.get('serial_number') or ''}".strip())
+
+    margin = layout.margin
+    pdf.setLineWidth(3)
+    pdf.rect(margin, margin, layout.width - 2 * margin, layout.height - 2 * margin)
+    pdf.setLineWidth(0.8)
+    pdf.rect(margin + 6, margin + 6, layout.width - 2 * margin - 12, layout.height - 2 * margin - 12)
+
+    center = layout.width / 2
+    pdf.setFont(ethiopic, 22)
+    pdf.drawCentredString(center, layout.height - margin - 60, amharic_title)
+    pdf.setFont(LATIN_BOLD_FONT, 18)
+    pdf.drawCentredString(center, layout.height - margin - 88, english_title)
+
+    y = layout.first_row_y
+    for row in ROWS[kind]:
+        pdf.setFillGray(0.35)
+        pdf.setFont(LATIN_FONT, 9)
+        pdf.drawString(layout.label_x, y + 6, row.english_label)
+        pdf.setFont(ethiopic, 9)
+        pdf.drawString(layout.label_x, y - 6, row.amharic_label)
+        pdf.setFillGray(0)
+
+        amharic = display_value(document.get(row.amharic_field)) if row.amharic_field else ""
+        english = display_value(document.get(row.english_field)) if row.english_field else ""
+        if amharic:
+            size = fitted_font_size(amharic, ethiopic, 12, layout.value_width)
+            pdf.setFont(ethiopic, size)
+            pdf.drawString(layout.value_x, y + (6 if english else 0), amharic)
+        if english:
+            # Places and addresses are often written in Amharic too
+            font = LATIN_FONT if english.isascii() else ethiopic
+            size = fitted_font_size(english, font, 12 if not amharic else 10, layout.value_width)
+            pdf.setFont(font, size)
+            pdf.drawString(layout.value_x, y - (7 if amharic else 0), english)
+        pdf.setLineWidth(0.3)
+        pdf.line(layout.value_x, y - 11, layout.value_x + layout.value_width, y - 11)
+        y -= layout.row_height
+
+    # Signatures and serial number
+    bottom = margin + 70
+    for x, english_label, amharic_label in (
+        (layout.label_x, "Priest", "ካህን"),
+        (center + 40, "Approved by", "ያጸደቀው"),
+    ):
+        pdf.setLineWidth(0.6)
+        pdf.line(x, bottom, x + 180, bottom)
+        pdf.setFont(ethiopic, 9)
+        pdf.drawString(x, bottom - 13, amharic_label)
+        pdf.setFont(LATIN_FONT, 9)
+        pdf.drawString(x, bottom - 25, english_label)
+    # Serial numbers start with a Ge'ez register prefix
+    pdf.setFont(ethiopic, 9)
+    pdf.drawString(layout.label_x, margin + 20, f"No. {document.get('serial_number') or ''}")
+    pdf.setFont(LATIN_FONT, 9)
+    pdf.drawRightString(layout.width - margin - 30, margin + 20, f"Issued {date.today():%Y-%m-%d}")
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+def render_batch(jobs: List[Tuple[str, Dict[str, Any]]]) -> List[bytes]:
+    """Render several certificates in one pool task"""
+    return [render_certificate(kind, document) for kind, document in jobs]
+
+_certificate_pool: Optional[ProcessPoolExecutor] = None
+
+def certificate_pool() -> ProcessPoolExecutor:
+    """Process pool for PDF rendering, created on first use"""
+    global _certificate_pool
+    if _certificate_pool is None:
+        _certificate_pool = ProcessPoolExecutor(max_workers=settings.CERTIFICATE_WORKERS, initializer=load_fonts)
+    return _certificate_pool
+
+UNSAFE_FILENAME = re.compile(r"[\\/:*?\"<>|\s]+")
+
+def certificate_filename(kind: str, document: Dict[str, Any]) -> str:
+    name = document.get("serial_number") or str(document.get("id"))
+    return f"{kind}-{UNSAFE_FILENAME.sub('_', name)}.pdf"
+
+def render_certificates(documents: Iterable[Tuple[str, Dict[str, Any]]], pool: Optional[ProcessPoolExecutor] = None,
+                        batch_size: int = 8, depth: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    ``(filename, pdf)`` of every ``(kind, document)``, in input order.
+
+    Documents are sent to the pool ``batch_size`` at a time with up to
+    ``depth`` batches in flight (by default two per ``CERTIFICATE_WORKERS``),
+    so workers stay busy while results are consumed and only those batches
+    are held in memory.
+    """
+    pool = pool or certificate_pool()
+    if depth is None:
+        depth = settings.CERTIFICATE_WORKERS * 2
+    queue: deque = deque()
+    batch: List[Tuple[str, Dict[str, Any]]] = []
+
+    def submit():
+        names = [certificate_filename(kind, document) for kind, document in batch]
+        queue.append((names, pool.submit(render_batch, list(batch))))
+        batch.clear()
+
+    for job in documents:
+        batch.append(job)
+        if len(batch) >= batch_size:
+            submit()
+            while len(queue) > depth:
+                names, future = queue.popleft()
+                yield from zip(names, future.result())
+    if batch:
+        submit()
+    while queue:
+        names, future = queue.popleft()
+        yield from zip(names, future.result())
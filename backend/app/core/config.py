@@ -16,11 +16,83 @@ class Settings(BaseSettings):
     POSTGRES_SERVER: str = os.getenv('POSTGRES_SERVER')
     POSTGRES_DB: str = os.getenv('POSTGRES_DB')
     POSTGRES_PORT: int = int(os.getenv('POSTGRES_PORT'))
+
+    # Connection pool
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT: int = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE: int = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING: bool = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+
+    # Serve the async routers from an asyncpg engine
+    ASYNC_DB: bool = os.getenv('ASYNC_DB', 'false').lower() == 'true'
+
+    # Audit pipeline: "sync" writes in the business transaction, "async"
+    # batches committed records on a background thread, "outbox" commits them
+    # to audit_outbox and relays them to audit_logs in the background
+    AUDIT_MODE: str = os.getenv('AUDIT_MODE', 'sync')
+    AUDIT_BATCH_SIZE: int = int(os.getenv('AUDIT_BATCH_SIZE', 500))
+    AUDIT_FLUSH_INTERVAL_MS: int = int(os.getenv('AUDIT_FLUSH_INTERVAL_MS', 200))
+    # Text values longer than this are audited as sha256 + length
+    AUDIT_BLOB_THRESHOLD: int = int(os.getenv('AUDIT_BLOB_THRESHOLD', 1024))
+
+    # Serial numbers reserved per counter round-trip; 1 keeps them gapless
+    SERIAL_BLOCK_SIZE: int = int(os.getenv('SERIAL_BLOCK_SIZE', 1))
+
+    # Bulk create endpoints: rows per request and rows per transaction
+    BULK_MAX_ROWS: int = int(os.getenv('BULK_MAX_ROWS', 10000))
+    BULK_CHUNK_SIZE: int = int(os.getenv('BULK_CHUNK_SIZE', 500))
+
+    # Register imports (python app/db/import_script.py): stored uploads,
+    # rows per COPY transaction and validation processes
+    IMPORT_DIR: str = os.getenv('IMPORT_DIR', 'imports')
+    IMPORT_BATCH_SIZE: int = int(os.getenv('IMPORT_BATCH_SIZE', 5000))
+    IMPORT_WORKERS: int = int(os.getenv('IMPORT_WORKERS', os.cpu_count() or 1))
+
+    # Rows fetched and encoded per chunk of GET /export/{resource}; also
+    # the Parquet row group size
+    EXPORT_BATCH_SIZE: int = int(os.getenv('EXPORT_BATCH_SIZE', 5000))
+
+    # Levels of kristna_abat/kristna_children nested in user responses
+    USER_TREE_DEPTH: int = int(os.getenv('USER_TREE_DEPTH', 1))
+
+    # Password hashing worker pool
+    PASSWORD_HASH_WORKERS: int = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 64))
+
+    # Verified-token principal cache
+    PRINCIPAL_CACHE_TTL: int = int(os.getenv('PRINCIPAL_CACHE_TTL', 300))
+    PRINCIPAL_CACHE_MAX_SIZE: int = int(os.getenv('PRINCIPAL_CACHE_MAX_SIZE', 4096))
+
+    # Lookup table cache, see app.db.reference
+    REFERENCE_CACHE_CHECK_MS: int = int(os.getenv('REFERENCE_CACHE_CHECK_MS', 1000))
+
+    # Overdue loan digest, see app.db.overdue; 0 disables the job
+    OVERDUE_DIGEST_INTERVAL_S: int = int(os.getenv('OVERDUE_DIGEST_INTERVAL_S', 300))
+
+    # Content-addressed blob store for profile pictures
+    BLOB_STORE_DIR: str = os.getenv('BLOB_STORE_DIR', 'blobs')
+    PROFILE_PICTURE_MAX_BYTES: int = int(os.getenv('PROFILE_PICTURE_MAX_BYTES', 5 * 1024 * 1024))
+    THUMBNAIL_SIZE: int = int(os.getenv('THUMBNAIL_SIZE', 128))
+    THUMBNAIL_WORKERS: int = int(os.getenv('THUMBNAIL_WORKERS', 2))
+
+    # Certificate PDFs
+    CERTIFICATE_FONT: str = os.getenv('CERTIFICATE_FONT', '')
+    CERTIFICATE_WORKERS: int = int(os.getenv('CERTIFICATE_WORKERS', 2))
+
+    # Person resolution job (python -m app.db.persons)
+    PERSON_MATCH_WORKERS: int = int(os.getenv('PERSON_MATCH_WORKERS', os.cpu_count() or 1))
+    PERSON_MATCH_THRESHOLD: float = float(os.getenv('PERSON_MATCH_THRESHOLD', 0.6))
     
     
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}?sslmode=require"
+
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}?ssl=require"
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,69 @@
+"""
+Role-based permission checks without database access.
+
+The roles of every user type are compiled into a frozenset from the
+``user_types`` snapshot of the reference cache, and recompiled whenever that
+snapshot is replaced, e.g. after ``assign_role_to_type`` or
+``remove_role_from_type``. A token resolves to its user's ``type_id`` through
+the principal cache, so ``Depends(require("add-item"))`` costs two dict
+lookups and a set test on an authenticated request.
+``benchmarks/permissions.py`` counts the queries and times the checks.
+"""
+from threading import Lock
+from typing import Dict, FrozenSet, Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from .. import models
+from ..db.reference import Snapshot, reference_cache
+from .security import get_current_user
+
+# Seeded as "Access for everything"
+ADMIN_ROLE = "admin"
+
+# The snapshot and the permissions compiled from it, replaced together as
+# one tuple, so a reader always sees a matching pair without taking the lock
+_compiled: Tuple[Optional[Snapshot], Dict[int, FrozenSet[str]]] = (None, {})
+_compile_lock = Lock()
+
+def compile_permissions(snapshot: Snapshot) -> Dict[int, FrozenSet[str]]:
+    return {row["id"]: frozenset(role["name"] for role in row["roles"]) for row in snapshot.rows}
+
+def type_permissions(type_id: Optional[int]) -> FrozenSet[str]:
+    """Role names granted to a user type"""
+    global _compiled
+    if type_id is None:
+        return frozenset()
+    snapshot = reference_cache.snapshot("user_types")
+    compiled_for, compiled = _compiled
+    if compiled_for is snapshot and type_id in compiled:
+        return compiled[type_id]
+    if type_id not in snapshot.by_id:
+        # A type created by another worker since the last check
+        reference_cache.get("user_types", type_id)
+        snapshot = reference_cache.snapshot("user_types")
+    with _compile_lock:
+        compiled_for, compiled = _compiled
+        if compiled_for is not snapshot:
+            compiled = compile_permissions(snapshot)
+        if type_id not in compiled:
+            # Unknown type: no permissions until user_types is reloaded
+            compiled = {**compiled, type_id: frozenset()}
+        _compiled = (snapshot, compiled)
+    return compiled[type_id]
+
+def has_permissions(user: models.User, *permissions: str) -> bool:
+    granted = type_permissions(user.type_id)
+    return ADMIN_ROLE in granted or granted.issuperset(permissions)
+
+def require(*permissions: str):
+    """
+    Dependency that returns the current user if their type grants every one
+    of ``permissions`` (or ``admin``), and answers 403 otherwise.
+    """
+    def check_permissions(user: models.User = Depends(get_current_user)) -> models.User:
+        if not has_permissions(user, *permissions):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Requires permission: {', '.join(permissions)}",
+            )
+        return user
+    return check_permissions
@@ -1,14 +1,21 @@
 from passlib.context import CryptContext
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from threading import Lock
+import asyncio
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 import sys
 sys.path.append("..")
-from app.db.session import SessionLocal
+from app.db.session import get_db, get_async_db
 from app import models
-from sqlalchemy.orm import Session
+from app.core.cache import PrincipalCache, token_expiry
+from app.core.config import settings
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 
 # Security constants
@@ -19,12 +26,20 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL,
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+)
+
+# bcrypt releases the GIL, so a small thread pool hashes in parallel while
+# capping how many cores a login burst can take from the rest of the app.
+hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+# pending: submitted and waiting for a worker; running: on a worker
+hash_stats = {"pending": 0, "running": 0, "completed": 0, "rejected": 0}
+hash_stats_lock = Lock()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -32,6 +47,58 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def _run_hash_job(fn, *args):
+    with hash_stats_lock:
+        hash_stats["pending"] -= 1
+        hash_stats["running"] += 1
+    try:
+        return fn(*args)
+    finally:
+        with hash_stats_lock:
+            hash_stats["running"] -= 1
+            hash_stats["completed"] += 1
+
+def _hash_cancelled(future: Future) -> None:
+    # A job cancelled before a worker took it never ran _run_hash_job
+    if future.cancelled():
+        with hash_stats_lock:
+            hash_stats["pending"] -= 1
+
+def submit_hash_job(fn, *args) -> Future:
+    """
+    Run a bcrypt call on the hashing pool, shedding load once
+    ``PASSWORD_HASH_MAX_QUEUE`` jobs are waiting for a worker
+    """
+    with hash_stats_lock:
+        if hash_stats["pending"] >= settings.PASSWORD_HASH_MAX_QUEUE:
+            hash_stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password operations in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+        hash_stats["pending"] += 1
+    future = hash_executor.submit(_run_hash_job, fn, *args)
+    future.add_done_callback(_hash_cancelled)
+    return future
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(submit_hash_job(verify_password, plain_password, hashed_password))
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(submit_hash_job(get_password_hash, password))
+
+def password_hash_stats() -> dict:
+    with hash_stats_lock:
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "max_queue": settings.PASSWORD_HASH_MAX_QUEUE,
+            "queue_depth": hash_stats["pending"],
+            "running": hash_stats["running"],
+            "completed": hash_stats["completed"],
+            "rejected": hash_stats["rejected"],
+        }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -42,24 +109,71 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.User:
-    credentials_exception = HTTPException(
+def snapshot_user(user: models.User) -> dict:
+    """Copy the column values of a user so they can outlive the session"""
+    return {attr.key: getattr(user, attr.key) for attr in inspect(models.User).column_attrs}
+
+def attach_user(db: Session, snapshot: dict) -> models.User:
+    """Rebuild a cached user as a persistent instance of ``db`` without a SELECT"""
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> dict:
+    """Verify a bearer token and return its payload"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        phone_number: str = payload.get("sub")
-        if phone_number is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.phone_number == phone_number).first()
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    return payload
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> models.User:
+    # Plain ``def`` so FastAPI runs the blocking lookup in its threadpool
+    # instead of on the event loop.
+    snapshot = principal_cache.get(token)
+    if snapshot is not None:
+        user = attach_user(db, snapshot)
+        db.info["current_user"] = user
+        return user
+
+    payload = decode_token(token)
+    user = db.query(models.User).filter(models.User.phone_number == payload["sub"]).first()
+    if user is None:
+        raise credentials_exception()
+    principal_cache.set(token, snapshot_user(user), expires_at=token_expiry(payload))
+    db.info["current_user"] = user
+    return user
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> models.User:
+    """Async counterpart of ``get_current_user`` for routers on the async engine"""
+    snapshot = principal_cache.get(token)
+    if snapshot is not None:
+        user = await db.run_sync(attach_user, snapshot)
+        db.info["current_user"] = user
+        return user
+
+    payload = decode_token(token)
+    result = await db.execute(
+        select(models.User).where(models.User.phone_number == payload["sub"])
+    )
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise credentials_exception()
+    principal_cache.set(token, snapshot_user(user), expires_at=token_expiry(payload))
+    db.info["current_user"] = user
+    return user
@@ -0,0 +1,93 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import re
+
+# Consonant of each Ethiopic syllable row; a row is eight code points, one per
+# vowel order. Rows with a laryngeal or glottal consonant read "a" in the
+# first order (ሀ ha, አ a) instead of "e" (ለ le).
+FIDEL_ROWS = {
+    0x1200: "h", 0x1208: "l", 0x1210: "h", 0x1218: "m", 0x1220: "s",
+    0x1228: "r", 0x1230: "s", 0x1238: "sh", 0x1240: "q", 0x1260: "b",
+    0x1268: "v", 0x1270: "t", 0x1278: "ch", 0x1280: "h", 0x1290: "n",
+    0x1298: "ny", 0x12A0: "", 0x12A8: "k", 0x12B8: "kh", 0x12C8: "w",
+    0x12D0: "", 0x12D8: "z", 0x12E0: "zh", 0x12E8: "y", 0x12F0: "d",
+    0x1300: "j", 0x1308: "g", 0x1320: "t", 0x1328: "ch", 0x1330: "p",
+    0x1338: "ts", 0x1340: "ts", 0x1348: "f", 0x1350: "p",
+}
+FIRST_ORDER_A = {0x1200, 0x1210, 0x1280, 0x12A0, 0x12D0}
+VOWEL_ORDERS = ("e", "u", "i", "a", "e", "", "o", "wa")
+PUNCTUATION = {"፡": " ", "።": " ", "፣": " ", "፤": " ", "፥": " ", "፦": " ", "፧": " ", "፨": " "}
+
+def _fidel_table() -> Dict[int, str]:
+    table = {ord(mark): latin for mark, latin in PUNCTUATION.items()}
+    for base, consonant in FIDEL_ROWS.items():
+        for order, vowel in enumerate(VOWEL_ORDERS):
+            if order == 0 and base in FIRST_ORDER_A:
+                vowel = "a"
+            if not consonant and order in (5, 7):
+                # Vowel-only rows: እ reads "e", ኧ reads "a"
+                vowel = "e" if order == 5 else "a"
+            table[base + order] = consonant + vowel
+    return table
+
+FIDEL_TO_LATIN = _fidel_table()
+
+# Spelling variants folded together before vowels are dropped. "ts" takes
+# the letter "q" freed by folding q into k; keys are opaque, not readable.
+LETTER_FOLDS = str.maketrans({"q": "k", "v": "b"})
+DIGRAPH_FOLDS = [
+    ("ts", "q"), ("sh", "x"), ("ch", "c"), ("zh", "j"),
+    ("ny", "n"), ("gn", "n"), ("ph", "f"), ("th", "t"), ("kh", "h"),
+]
+NON_LETTERS = re.compile(r"[^a-z]")
+WEAK_LETTERS = re.compile(r"[aeiouyw]")
+REPEATS = re.compile(r"(.)\1+")
+
+def transliterate(text: str) -> str:
+    """Latin transliteration of Ge'ez script; other characters are kept"""
+    return text.translate(FIDEL_TO_LATIN)
+
+@lru_cache(maxsize=65536)
+def phonetic_key(word: str) -> str:
+    """
+    Script-independent key of a single name, e.g. "Tesfaye", "Tesfay" and
+    "ተስፋዬ" all give "tsf".
+
+    The word is transliterated and spelling variants are folded, then the
+    first letter (any vowel counts as "a") is kept with the following
+    consonants, dropping vowels, y and w and collapsing doubled letters.
+    """
+    latin = NON_LETTERS.sub("", transliterate(word).lower()).translate(LETTER_FOLDS)
+    if not latin:
+        return ""
+    for variant, folded in DIGRAPH_FOLDS:
+        latin = latin.replace(variant, folded)
+    head = "a" if latin[0] in "aeiou" else latin[0]
+    return REPEATS.sub(r"\1", head + WEAK_LETTERS.sub("", latin[1:]))
+
+def name_phonetic_keys(value: Optional[str]) -> List[str]:
+    """Keys of every word of a name"""
+    if not value:
+        return []
+    keys = (phonetic_key(word) for word in transliterate(value).split())
+    return [key for key in keys if key]
+
+@lru_cache(maxsize=65536)
+def column_keys(column: str, value: Optional[str]) -> Tuple[str, ...]:
+    """``field:key`` entries of one name column; registers repeat names a lot"""
+    field = column.split("_", 1)[1]
+    return tuple(f"{field}:{key}" for key in name_phonetic_keys(value))
+
+def field_keys(values: Dict[str, Optional[str]], columns: Iterable[str]) -> List[str]:
+    """
+    ``field:key`` entries for the given name columns.
+
+    The script prefix is dropped from the field, so ``english_name`` and
+    ``amharic_name`` both contribute ``name:...`` keys and match each other.
+    """
+    keys = set()
+    for column in columns:
+        value = values.get(column)
+        if value:
+            keys.update(column_keys(column, value))
+    return sorted(keys)
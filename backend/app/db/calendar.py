@@ -0,0 +1,136 @@
+"""
+Schedule calendar.
+
+``calendar`` answers a date range in one query: schedules joined to their
+user, shift and schedule type, read through the ``(date)`` index or, for
+one user, the ``(user_id, date)`` index. Rows are bucketed by day in
+Python and the days grouped into day, week (from Monday) or month periods.
+``benchmarks/calendar.py`` times the month, week and single-user year views.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .. import models
+
+schedules = models.Schedule.__table__
+users = models.User.__table__
+shifts = models.Shift.__table__
+schedule_types = models.ScheduleType.__table__
+
+CalendarView = Literal["day", "week", "month"]
+
+# Longest range one calendar request covers
+MAX_CALENDAR_DAYS = 366
+
+def period_start(day: date, view: CalendarView) -> date:
+    if view == "week":
+        return day - timedelta(days=day.weekday())
+    if view == "month":
+        return day.replace(day=1)
+    return day
+
+def next_period(start: date, view: CalendarView) -> date:
+    if view == "week":
+        return start + timedelta(days=7)
+    if view == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+def calendar_range(start: Optional[date], end: Optional[date], view: CalendarView) -> Tuple[date, date]:
+    """
+    ``[start, end)`` of a request; without ``end`` the period containing
+    ``start`` (by default today)
+    """
+    if start is None:
+        start = period_start(end - timedelta(days=1) if end else date.today(), view)
+    if end is None:
+        end = next_period(period_start(start, view), view)
+    return start, end
+
+def calendar(db: Session, start: date, end: date, view: CalendarView = "week",
+             user_id: Optional[int] = None, type_id: Optional[int] = None) -> Dict[str, Any]:
+    """Schedules dated in ``[start, end)``, bucketed by day within each period"""
+    stmt = (
+        select(
+            schedules.c.id, schedules.c.date, schedules.c.description, schedules.c.type_id,
+            schedules.c.shift_id, schedules.c.user_id, schedules.c.assigned_by_id, schedules.c.approved_by_id,
+            users.c.name.label("user_name"),
+            shifts.c.name.label("shift_name"), shifts.c.description.label("shift_description"),
+            shifts.c.start_time, shifts.c.end_time,
+            schedule_types.c.name.label("type_name"), schedule_types.c.description.label("type_description"),
+        )
+        .select_from(
+            schedules
+            .outerjoin(users, users.c.id == schedules.c.user_id)
+            .outerjoin(shifts, shifts.c.id == schedules.c.shift_id)
+            .outerjoin(schedule_types, schedule_types.c.id == schedules.c.type_id)
+        )
+        .where(
+            schedules.c.date >= datetime.combine(start, time.min),
+            schedules.c.date < datetime.combine(end, time.min),
+        )
+        .order_by(schedules.c.date, schedules.c.id)
+    )
+    if user_id is not None:
+        stmt = stmt.where(schedules.c.user_id == user_id)
+    if type_id is not None:
+        stmt = stmt.where(schedules.c.type_id == type_id)
+
+    # Users, shifts and types repeat across rows; each is built once
+    people: Dict[int, Dict[str, Any]] = {}
+    shift_rows: Dict[int, Dict[str, Any]] = {}
+    type_rows: Dict[int, Dict[str, Any]] = {}
+    days: Dict[date, List[Dict[str, Any]]] = {}
+    for row in db.execute(stmt):
+        (schedule_id, when, description, schedule_type_id, shift_id, schedule_user_id, assigned_by_id,
+         approved_by_id, user_name, shift_name, shift_description, start_time, end_time,
+         type_name, type_description) = row
+        user = shift = schedule_type = None
+        if user_name is not None:
+            user = people.get(schedule_user_id)
+            if user is None:
+                user = people[schedule_user_id] = {"id": schedule_user_id, "name": user_name}
+        if shift_name is not None:
+            shift = shift_rows.get(shift_id)
+            if shift is None:
+                shift = shift_rows[shift_id] = {"id": shift_id, "name": shift_name, "description": shift_description,
+                                                "start_time": start_time, "end_time": end_time}
+        if type_name is not None:
+            schedule_type = type_rows.get(schedule_type_id)
+            if schedule_type is None:
+                schedule_type = type_rows[schedule_type_id] = {"id": schedule_type_id, "name": type_name,
+                                                               "description": type_description}
+        day = when.date()
+        bucket = days.get(day)
+        if bucket is None:
+            bucket = days[day] = []
+        bucket.append({
+            "id": schedule_id,
+            "date": when,
+            "description": description,
+            "type_id": schedule_type_id,
+            "shift_id": shift_id,
+            "user_id": schedule_user_id,
+            "assigned_by_id": assigned_by_id,
+            "approved_by_id": approved_by_id,
+            "user": user,
+            "shift": shift,
+            "schedule_type": schedule_type,
+        })
+
+    # Rows come in date order, so the days are already sorted
+    ordered = list(days.items())
+    periods = []
+    i = 0
+    period = period_start(start, view)
+    while period < end:
+        following = next_period(period, view)
+        period_days = []
+        while i < len(ordered) and ordered[i][0] < following:
+            day, day_schedules = ordered[i]
+            period_days.append({"date": day, "schedules": day_schedules})
+            i += 1
+        periods.append({"start": max(period, start), "end": min(following, end), "days": period_days})
+        period = following
+    return {"view": view, "start": start, "end": end, "periods": periods}
@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+sys.path = ['', '..'] + sys.path[1:]
+from app.db.session import SessionLocal
+from app.db.importer import ImportFailed, create_job, run_import
+
+def show_progress(job):
+    print(f"row {job.last_line}: {job.imported_rows} imported, {job.failed_rows} failed", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a CSV or XLSX register transcription")
+    parser.add_argument("kind", nargs="?", choices=["membership", "baptism", "burial", "marriage"])
+    parser.add_argument("path", nargs="?", help="CSV or XLSX file")
+    parser.add_argument("--map", action="append", default=[], metavar="FIELD=HEADER",
+                        help="read FIELD from the column titled HEADER")
+    parser.add_argument("--user", type=int, metavar="USER_ID",
+                        help="recorder and approver of rows that don't name one")
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="continue an interrupted import")
+    parser.add_argument("--workers", type=int, default=None, help="validation processes")
+    args = parser.parse_args()
+
+    if args.resume:
+        job_id = args.resume
+    else:
+        if not args.kind or not args.path:
+            parser.error("kind and path are required unless --resume is given")
+        if any("=" not in item for item in args.map):
+            parser.error("--map takes FIELD=HEADER")
+        column_map = dict(item.split("=", 1) for item in args.map)
+        db = SessionLocal()
+        try:
+            job = create_job(db, args.kind, os.path.basename(args.path), os.path.abspath(args.path),
+                             column_map, args.user)
+        except ImportFailed as e:
+            parser.error(str(e))
+        finally:
+            db.close()
+        job_id = job.id
+        print(f"Import job {job_id}")
+
+    job = run_import(job_id, workers=args.workers, progress=show_progress)
+    if job is None:
+        print(f"Import job {job_id} is being run elsewhere")
+    else:
+        print(f"Import job {job_id} {job.status}" + (f": {job.message}" if job.message else ""))
+
+if __name__ == "__main__":
+    main()
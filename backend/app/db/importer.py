@@ -0,0 +1,428 @@
+"""
+Streaming import of transcribed register spreadsheets.
+
+A job reads a CSV or XLSX file row by row (never the whole file) and loads
+it into one religious register:
+
+* the header row is matched to the fields of the register's create schema,
+  by name or through the job's ``column_map`` (field -> header);
+* rows are validated in batches of ``IMPORT_BATCH_SIZE`` in a pool of
+  ``IMPORT_WORKERS`` processes, which also compute the phonetic name keys;
+* each validated batch is COPYed into a temporary staging table and merged
+  into the register with one INSERT ... SELECT, in a single transaction
+  that also writes the audit rows, the row errors and the job's progress.
+
+Rows of the spreadsheet are numbered as in a spreadsheet program, the header
+being row 1. ``last_line`` of a job is the last row whose batch committed,
+so a job interrupted by a crash resumes after it without duplicating rows.
+Serial numbers given in the file are kept; a row repeating an existing
+serial number is reported instead of merged.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import io
+import os
+import re
+import shutil
+import uuid
+from pydantic import ValidationError
+from sqlalchemy import insert, text, update
+from sqlalchemy.orm import Session
+from ..api.bulk import missing_references
+from ..core.audit import build_audit_record, dispatch_records
+from ..core.config import settings
+from .search import RELIGIOUS_DOCUMENTS, document_name_keys
+from .serials import assign_serials
+from .session import SessionLocal
+from .. import models, schemas
+
+import_jobs = models.ImportJob.__table__
+import_errors = models.ImportRowError.__table__
+
+CREATE_SCHEMAS = {
+    "membership": schemas.MembershipDocumentCreate,
+    "baptism": schemas.BaptismDocumentCreate,
+    "burial": schemas.BurialDocumentCreate,
+    "marriage": schemas.MarriageDocumentCreate,
+}
+SERIAL_PREFIXES = {"membership": "አባ", "baptism": "ክር", "burial": "ቀብ", "marriage": "ልዩ"}
+SHEET_TYPES = (".csv", ".xlsx")
+
+DATE_ONLY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+HEADER_SEPARATORS = re.compile(r"[\s\-]+")
+
+class ImportFailed(Exception):
+    """The file can't be imported at all, e.g. a required column is missing"""
+
+class ImportConflict(Exception):
+    """Another run of the same job committed a batch first"""
+
+def normalize_header(value: Any) -> str:
+    return HEADER_SEPARATORS.sub("_", str(value or "").strip().lower())
+
+def read_csv(path: str) -> Iterator[Tuple[int, List[Any]]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line, values in enumerate(csv.reader(f), start=1):
+            yield line, values
+
+def read_xlsx(path: str) -> Iterator[Tuple[int, List[Any]]]:
+    """Rows of the first worksheet, read in openpyxl's streaming mode"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        for line, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+            yield line, list(values)
+    finally:
+        workbook.close()
+
+def read_sheet(path: str) -> Iterator[Tuple[int, List[Any]]]:
+    if path.lower().endswith(".xlsx"):
+        return read_xlsx(path)
+    return read_csv(path)
+
+def is_nullable(annotation) -> bool:
+    return type(None) in getattr(annotation, "__args__", ())
+
+def is_datetime(annotation) -> bool:
+    return annotation is datetime or datetime in getattr(annotation, "__args__", ())
+
+# Fields taken from the importing user when the file has no such column
+USER_FIELDS = ("recorded_by_id", "approved_by_id")
+
+def field_columns(kind: str, header: List[Any], column_map: Optional[Dict[str, str]] = None,
+                  defaults: Iterable[str] = ()) -> Dict[str, int]:
+    """
+    Position in the header of each schema field present in the file.
+
+    Headers are compared case-insensitively with spaces and dashes read as
+    underscores, so "Date of birth" fills ``date_of_birth``. Fields the file
+    lacks are imported as empty, or from ``defaults``; a missing required
+    field fails the job.
+    """
+    positions = {normalize_header(name): index for index, name in enumerate(header)}
+    aliases = {field: normalize_header(name) for field, name in (column_map or {}).items()}
+    fields = CREATE_SCHEMAS[kind].model_fields
+    unknown = sorted(set(aliases) - set(fields))
+    if unknown:
+        raise ImportFailed(f"Unknown fields in column map: {', '.join(unknown)}")
+
+    columns = {}
+    for field in fields:
+        name = aliases.get(field, field)
+        if name in positions:
+            columns[field] = positions[name]
+        elif field in aliases:
+            raise ImportFailed(f"Column {column_map[field]!r} mapped to {field} is not in the header")
+
+    missing = [
+        field for field, info in fields.items()
+        if field not in columns and field not in defaults
+        and info.is_required() and not is_nullable(info.annotation)
+    ]
+    if missing:
+        raise ImportFailed(f"Missing columns: {', '.join(missing)}")
+    return columns
+
+def staging_columns(kind: str) -> List[str]:
+    """Register columns filled from the file, in COPY order"""
+    table = RELIGIOUS_DOCUMENTS[kind].__table__
+    fields = CREATE_SCHEMAS[kind].model_fields
+    return [name for name in table.c.keys() if name in fields] + ["name_keys"]
+
+def cell_value(value: Any, as_datetime: bool) -> Any:
+    """Spreadsheet cell as the schema expects it; blank cells are None"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        if as_datetime and DATE_ONLY.match(value):
+            return value + "T00:00:00"
+        return value
+    if isinstance(value, (datetime, date)):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    # Numbers typed into text columns (phone numbers, serials) stay text
+    return str(value)
+
+def array_literal(items: List[str]) -> str:
+    # name keys only hold [a-z_:], so quoting each element is enough
+    return "{" + ",".join(f'"{item}"' for item in items) + "}"
+
+def validate_rows(kind: str, columns: Dict[str, int], defaults: Dict[str, Any],
+                  rows: List[Tuple[int, List[Any]]]) -> Tuple[List[List[Any]], List[Tuple[int, List[Any]]]]:
+    """
+    Validate a batch of spreadsheet rows; runs in the worker pool.
+
+    Returns the valid rows as ``[line, *staging_columns]`` lists, ready for
+    COPY, and ``(line, errors)`` of the others.
+    """
+    schema = CREATE_SCHEMAS[kind]
+    model = RELIGIOUS_DOCUMENTS[kind]
+    targets = staging_columns(kind)[:-1]
+    dates = {field for field, info in schema.model_fields.items() if is_datetime(info.annotation)}
+    absent = {field: defaults.get(field) for field in schema.model_fields if field not in columns}
+    texts = [(field, index) for field, index in columns.items() if field not in dates]
+    dated = [(field, index) for field, index in columns.items() if field in dates]
+    width = max(columns.values(), default=-1) + 1
+
+    valid, invalid = [], []
+    for line, values in rows:
+        if len(values) < width:
+            values = list(values) + [None] * (width - len(values))
+        data = dict(absent)
+        for field, index in texts:
+            value = values[index]
+            # Every CSV cell is a str; other cells take the slow path
+            data[field] = (value.strip() or None) if value.__class__ is str else cell_value(value, False)
+        for field, index in dated:
+            data[field] = cell_value(values[index], True)
+        try:
+            document = schema.model_validate(data).model_dump()
+        except ValidationError as e:
+            invalid.append((line, e.errors(include_url=False, include_context=False, include_input=False)))
+            continue
+        # Datetimes are written with str(), which COPY reads as timestamps
+        row = [line]
+        row += [document[name] for name in targets]
+        row.append(array_literal(document_name_keys(model, document)))
+        valid.append(row)
+    return valid, invalid
+
+def batches(rows: Iterator[Tuple[int, List[Any]]], after_line: int,
+            size: int) -> Iterator[Tuple[int, List[Tuple[int, List[Any]]]]]:
+    """``(last line, rows)`` batches of the non-blank rows after ``after_line``"""
+    batch, last = [], after_line
+    for line, values in rows:
+        if line <= after_line:
+            continue
+        last = line
+        if any(value is not None and str(value).strip() for value in values):
+            batch.append((line, values))
+        if len(batch) >= size:
+            yield last, batch
+            batch = []
+    if batch or last > after_line:
+        yield last, batch
+
+def validated(kind: str, columns: Dict[str, int], defaults: Dict[str, Any], pending_batches, workers: int):
+    """
+    ``(last line, valid, invalid)`` per batch, in file order.
+
+    With several workers a few batches are validated ahead while the current
+    one is being merged.
+    """
+    if workers <= 1:
+        for last, rows in pending_batches:
+            yield (last, *validate_rows(kind, columns, defaults, rows))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        queue = deque()
+        for last, rows in pending_batches:
+            queue.append((last, pool.submit(validate_rows, kind, columns, defaults, rows)))
+            if len(queue) > workers * 2:
+                last, future = queue.popleft()
+                yield (last, *future.result())
+        while queue:
+            last, future = queue.popleft()
+            yield (last, *future.result())
+
+def copy_rows(db: Session, kind: str, rows: List[List[Any]]) -> None:
+    """COPY ``rows`` into a staging table dropped when the transaction ends"""
+    table = RELIGIOUS_DOCUMENTS[kind].__table__.name
+    targets = staging_columns(kind)
+    buffer = io.StringIO()
+    # Unquoted empty fields are NULL to COPY; blank cells never reach here
+    # as empty strings, see cell_value
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE import_staging ON COMMIT DROP AS "
+            f"SELECT 0 AS line, {', '.join(targets)} FROM {table} WITH NO DATA"
+        )
+        cursor.copy_expert(
+            f"COPY import_staging (line, {', '.join(targets)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+def merge_staging(db: Session, kind: str, job_id: int, user_id: Optional[int]) -> Tuple[int, int]:
+    """
+    Insert the staged rows into the register, auditing each new document
+    and recording rows whose serial number already exists as errors.
+
+    Returns the number of imported and rejected rows.
+    """
+    table = RELIGIOUS_DOCUMENTS[kind].__table__.name
+    targets = ", ".join(staging_columns(kind))
+    rows = db.execute(text(f"""
+        WITH inserted AS (
+            INSERT INTO {table} ({targets})
+            SELECT {targets} FROM import_staging ORDER BY line
+            ON CONFLICT (serial_number) DO NOTHING
+            RETURNING id, serial_number
+        ), rejected AS (
+            INSERT INTO import_errors (job_id, line, errors)
+            SELECT :job_id, line, json_build_array('serial_number ' || serial_number || ' already exists')
+            FROM import_staging
+            WHERE serial_number NOT IN (SELECT serial_number FROM inserted)
+            RETURNING 1
+        )
+        SELECT inserted.id, inserted.serial_number, counted.rejected
+        FROM (SELECT count(*) AS rejected FROM rejected) AS counted
+        LEFT JOIN inserted ON true
+        ORDER BY inserted.id
+    """), {"job_id": job_id}).all()
+    inserted = [(row.id, row.serial_number) for row in rows if row.id is not None]
+    # The job runs outside a request, so the audit user is the job's creator
+    dispatch_records(db, [
+        dict(
+            build_audit_record(db, table, document_id, "CREATE",
+                               {"import_job": job_id, "serial_number": serial_number}),
+            user_id=user_id,
+        )
+        for document_id, serial_number in inserted
+    ])
+    return len(inserted), rows[0].rejected
+
+def merge_batch(db: Session, job: models.ImportJob, last_line: int, valid: List[List[Any]],
+                invalid: List[Tuple[int, List[Any]]]) -> None:
+    """
+    Commit one batch: its documents, its errors and the job's progress.
+
+    The job row is moved from its current ``last_line`` first, which also
+    locks it, so a second run of the same job can't merge the batch again.
+    """
+    moved = db.execute(
+        update(import_jobs)
+        .where(import_jobs.c.id == job.id, import_jobs.c.last_line == job.last_line)
+        .values(last_line=last_line)
+    ).rowcount
+    if not moved:
+        db.rollback()
+        raise ImportConflict(f"Import job {job.id} is being run elsewhere")
+
+    kind = job.kind
+    targets = staging_columns(kind)
+    serial = targets.index("serial_number") + 1
+    errors = [(line, list(messages)) for line, messages in invalid]
+
+    # Serial numbers repeated within the file
+    seen, unique = set(), []
+    for row in valid:
+        if row[serial] is not None and row[serial] in seen:
+            errors.append((row[0], [f"serial_number {row[serial]} appears earlier in the file"]))
+            continue
+        if row[serial] is not None:
+            seen.add(row[serial])
+        unique.append(row)
+
+    keys = [{name: row[i + 1] for i, name in enumerate(targets) if name.endswith("_id")} for row in unique]
+    problems = missing_references(db, RELIGIOUS_DOCUMENTS[kind].__table__, keys)
+    errors += [(unique[position][0], messages) for position, messages in problems.items()]
+    unique = [row for position, row in enumerate(unique) if position not in problems]
+
+    imported = rejected = 0
+    if unique:
+        records = [{"serial_number": row[serial]} for row in unique]
+        assign_serials(db, records, lambda record: SERIAL_PREFIXES[kind])
+        for row, record in zip(unique, records):
+            row[serial] = record["serial_number"]
+        copy_rows(db, kind, unique)
+        imported, rejected = merge_staging(db, kind, job.id, job.created_by_id)
+    if errors:
+        db.execute(insert(import_errors), [
+            {"job_id": job.id, "line": line, "errors": messages} for line, messages in errors
+        ])
+    db.execute(
+        update(import_jobs)
+        .where(import_jobs.c.id == job.id)
+        .values(
+            imported_rows=import_jobs.c.imported_rows + imported,
+            failed_rows=import_jobs.c.failed_rows + rejected + len(errors),
+        )
+    )
+    db.commit()
+    db.refresh(job)
+
+def is_upload(path: str) -> bool:
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(settings.IMPORT_DIR)
+
+def store_upload(source, filename: str) -> str:
+    """Copy an uploaded file object into ``IMPORT_DIR``; returns its path"""
+    extension = os.path.splitext(filename)[1].lower()
+    os.makedirs(settings.IMPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.IMPORT_DIR, f"{uuid.uuid4().hex}{extension}")
+    with open(path, "wb") as f:
+        shutil.copyfileobj(source, f, 1024 * 1024)
+    return path
+
+def create_job(db: Session, kind: str, filename: str, path: str,
+               column_map: Optional[Dict[str, str]] = None, user_id: Optional[int] = None) -> models.ImportJob:
+    if kind not in CREATE_SCHEMAS:
+        raise ImportFailed(f"Unknown register {kind!r}")
+    if not filename.lower().endswith(SHEET_TYPES):
+        raise ImportFailed("Only .csv and .xlsx files can be imported")
+    job = models.ImportJob(
+        kind=kind, filename=filename, path=path, column_map=column_map or None,
+        status="pending", last_line=1, imported_rows=0, failed_rows=0, created_by_id=user_id,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def run_import(job_id: int, workers: Optional[int] = None,
+               progress: Optional[Callable[[models.ImportJob], None]] = None) -> Optional[models.ImportJob]:
+    """
+    Run (or resume) an import job until the end of its file.
+
+    ``progress`` is called with the job after every committed batch. Returns
+    the job, or None when another run of it took over.
+    """
+    workers = workers or settings.IMPORT_WORKERS
+    db = SessionLocal()
+    try:
+        job = db.get(models.ImportJob, job_id)
+        if job is None or job.status == "done":
+            return job
+        job.status, job.message = "running", None
+        db.commit()
+        try:
+            rows = read_sheet(job.path)
+            header = next(rows, (1, []))[1]
+            defaults = {field: job.created_by_id for field in USER_FIELDS if job.created_by_id}
+            columns = field_columns(job.kind, header, job.column_map, defaults)
+            pending = batches(rows, job.last_line, settings.IMPORT_BATCH_SIZE)
+            for last_line, valid, invalid in validated(job.kind, columns, defaults, pending, workers):
+                merge_batch(db, job, last_line, valid, invalid)
+                if progress:
+                    progress(job)
+        except ImportConflict:
+            return None
+        except Exception as e:
+            db.rollback()
+            job.status, job.message = "failed", str(e).splitlines()[0] if str(e) else type(e).__name__
+            db.commit()
+            db.refresh(job)
+            if isinstance(e, ImportFailed):
+                return job
+            raise
+        job.status = "done"
+        db.commit()
+        db.refresh(job)
+        if is_upload(job.path) and os.path.exists(job.path):
+            os.remove(job.path)
+        return job
+    finally:
+        db.close()
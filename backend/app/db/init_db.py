@@ -36,7 +36,8 @@ def init_db(db: Session) -> None:
         {"name": "add-document-type", "description": "Add new document type"},
         {"name": "delete-document-type", "description": "Delete document type"},
         {"name": "update-document-type", "description": "Update document type"},
-        {"name": "read-document-type", "description": "Read document type"}
+        {"name": "read-document-type", "description": "Read document type"},
+        {"name": "export-data", "description": "Export tables"}
     ]
 
     try:
@@ -245,7 +246,7 @@ def init_db(db: Session) -> None:
             "quantity": 1,
             "date_taken": datetime.now() - timedelta(days=5),
             "date_returned": datetime.now(),
-            "status": "returned",
+            "status": "approved",
             "approved_by_id": 1,
             "requested_by_id": 3
         },
@@ -0,0 +1,180 @@
+"""
+Overdue loans.
+
+``overdue_loans`` answers from the live tables: open transactions past their
+due date, grouped by requester in one statement that reads the partial index
+on open transactions. ``refresh_digest`` materializes the per-requester
+totals into ``overdue_digest`` for the dashboard, and ``overdue_job`` runs it
+every ``OVERDUE_DIGEST_INTERVAL_S`` on a background thread of each worker;
+an advisory lock lets only one worker rebuild the digest at a time.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+import threading
+import time
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+from .. import models
+from ..core.config import settings
+from .stock import mark_overdue
+
+logger = logging.getLogger(__name__)
+
+transactions = models.Transaction.__table__
+users = models.User.__table__
+digest = models.OverdueDigest.__table__
+
+# Key of the advisory lock held while the digest is rebuilt
+DIGEST_LOCK = 0x0D16E57
+
+def overdue_filter(now: datetime):
+    return (
+        transactions.c.date_returned.is_(None),
+        transactions.c.due_date < now,
+        transactions.c.status != models.TransactionStatus.rejected,
+    )
+
+def overdue_loans(db: Session, now: Optional[datetime] = None,
+                  requested_by_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Overdue loans grouped by requester, the longest overdue first"""
+    now = now or datetime.now()
+    loan = func.json_build_object(
+        "id", transactions.c.id,
+        "item_id", transactions.c.item_id,
+        "quantity", transactions.c.quantity,
+        "date_taken", transactions.c.date_taken,
+        "due_date", transactions.c.due_date,
+    )
+    oldest = func.min(transactions.c.due_date)
+    stmt = (
+        select(
+            users.c.id.label("requested_by_id"),
+            users.c.name,
+            users.c.phone_number,
+            func.count().label("loans"),
+            func.coalesce(func.sum(transactions.c.quantity), 0).label("quantity"),
+            oldest.label("oldest_due_date"),
+            func.json_agg(aggregate_order_by(loan, transactions.c.due_date)).label("transactions"),
+        )
+        .select_from(transactions.join(users, users.c.id == transactions.c.requested_by_id))
+        .where(*overdue_filter(now))
+        .group_by(users.c.id)
+        .order_by(oldest, users.c.id)
+    )
+    if requested_by_id is not None:
+        stmt = stmt.where(transactions.c.requested_by_id == requested_by_id)
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+def refresh_digest(db: Session, now: Optional[datetime] = None) -> Optional[int]:
+    """
+    Count newly overdue loans in the stock ledger and rebuild
+    ``overdue_digest``, in one transaction; readers see the previous digest
+    until it commits. Returns the number of requesters, or None when another
+    worker is already refreshing.
+    """
+    now = now or datetime.now()
+    if not db.execute(select(func.pg_try_advisory_xact_lock(DIGEST_LOCK))).scalar_one():
+        db.rollback()
+        return None
+    mark_overdue(db, now)
+    db.execute(delete(digest))
+    totals = (
+        select(
+            transactions.c.requested_by_id,
+            func.count(),
+            func.coalesce(func.sum(transactions.c.quantity), 0),
+            func.min(transactions.c.due_date),
+            literal(now),
+        )
+        .where(*overdue_filter(now), transactions.c.requested_by_id.is_not(None))
+        .group_by(transactions.c.requested_by_id)
+    )
+    result = db.execute(insert(digest).from_select(
+        ["requested_by_id", "loans", "quantity", "oldest_due_date", "refreshed_at"], totals
+    ))
+    db.commit()
+    return result.rowcount
+
+class OverdueJob:
+    """Background thread refreshing the overdue digest periodically"""
+
+    def __init__(self):
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.runs = 0
+        self.skipped = 0
+        self.failed = 0
+        self.requesters: Optional[int] = None
+        self.last_run: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+
+    def start(self) -> None:
+        if self.thread is not None or settings.OVERDUE_DIGEST_INTERVAL_S <= 0:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="overdue-digest", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.thread is not None,
+            "interval_s": settings.OVERDUE_DIGEST_INTERVAL_S,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "requesters": self.requesters,
+            "last_run": self.last_run,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+    def run_once(self) -> None:
+        from .session import SessionLocal
+
+        started = time.perf_counter()
+        try:
+            with SessionLocal() as db:
+                requesters = refresh_digest(db)
+        except Exception:
+            self.failed += 1
+            logger.exception("Failed to refresh the overdue digest")
+            return
+        if requesters is None:
+            self.skipped += 1
+            return
+        self.runs += 1
+        self.requesters = requesters
+        self.last_run = datetime.now()
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def run(self) -> None:
+        # The first refresh happens at startup
+        while True:
+            self.run_once()
+            if self.stopping.wait(settings.OVERDUE_DIGEST_INTERVAL_S):
+                break
+
+overdue_job = OverdueJob()
+
+def main() -> None:
+    from .session import SessionLocal
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        requesters = refresh_digest(db)
+    elapsed = (time.perf_counter() - started) * 1000
+    if requesters is None:
+        print("Another worker is refreshing the digest")
+    else:
+        print(f"{requesters} requesters with overdue loans, refreshed in {elapsed:.1f}ms")
+
+if __name__ == "__main__":
+    main()
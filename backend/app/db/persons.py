@@ -0,0 +1,323 @@
+"""
+Person resolution across the religious registers.
+
+Every membership, baptism and burial document names one person and every
+marriage names two (groom and bride). This job links those mentions into
+persons:
+
+* each mention gets a blocking key of its phonetic given-name key, father's
+  name key and birth year, and only mentions sharing name and father keys
+  are compared (mentions without a birth date, i.e. brides, are compared
+  with every year of their block);
+* candidate pairs are scored on Christian name, mother's name and birth
+  date, in a process pool over blocks;
+* matches are merged with union-find, strongest first, and stored in
+  ``person_documents``; a merge that would give a person two baptisms or
+  two burials is refused.
+
+Run ``python -m app.db.persons`` for an incremental pass, which only
+compares blocks containing mentions not linked yet, or with ``--full`` to
+rebuild every cluster.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import argparse
+from sqlalchemy import and_, delete, exists, insert, literal, select, tuple_, union_all, update
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.transliteration import name_phonetic_keys
+from .. import models
+
+persons = models.Person.__table__
+person_documents = models.PersonDocument.__table__
+
+class Mention(NamedTuple):
+    kind: str
+    document_id: int
+    role: str
+    name: str
+    father: str
+    christian: str
+    mother: str
+    birth_date: Optional[datetime]
+
+    @property
+    def ref(self) -> Tuple[str, int, str]:
+        return (self.kind, self.document_id, self.role)
+
+    @property
+    def block_key(self) -> str:
+        year = self.birth_date.year if self.birth_date else ""
+        return f"{self.name}|{self.father}|{year}"
+
+# (kind, model, role, column prefix, has a birth date)
+MENTION_SOURCES = [
+    ("membership", models.MembershipDocument, "subject", "", True),
+    ("baptism", models.BaptismDocument, "subject", "", True),
+    ("burial", models.BurialDocument, "subject", "", True),
+    ("marriage", models.MarriageDocument, "groom", "", True),
+    ("marriage", models.MarriageDocument, "bride", "bride_", False),
+]
+
+# A person is baptized and buried at most once
+SINGLE_KINDS = {"baptism", "burial"}
+
+def first_key(*names: Optional[str]) -> str:
+    """Phonetic key of the first word of the first non-empty name"""
+    for name in names:
+        keys = name_phonetic_keys(name)
+        if keys:
+            return keys[0]
+    return ""
+
+def read_mentions(conn, batch_size: int = 10000) -> Iterator[Mention]:
+    """Stream every person mention with its comparison keys"""
+    for kind, model, role, prefix, has_birth in MENTION_SOURCES:
+        table = model.__table__
+        fields = ["name", "father_name", "christian_name", "mother_name"]
+        columns = [table.c.id]
+        for field in fields:
+            columns += [table.c[f"amharic_{prefix}{field}"], table.c[f"english_{prefix}{field}"]]
+        if has_birth:
+            columns.append(table.c.date_of_birth)
+        result = conn.execute(select(*columns).execution_options(stream_results=True, yield_per=batch_size))
+        for row in result:
+            name, father, christian, mother = (
+                first_key(row[1 + 2 * i], row[2 + 2 * i]) for i in range(len(fields))
+            )
+            if not name or not father:
+                continue
+            yield Mention(kind, row[0], role, name, father, christian, mother,
+                          row[-1] if has_birth else None)
+
+def score(a: Mention, b: Mention) -> float:
+    """Match score of two mentions that already share name and father keys"""
+    if a.kind == b.kind and a.kind in SINGLE_KINDS:
+        return 0.0
+    total = 0.2
+    for left, right in ((a.christian, b.christian), (a.mother, b.mother)):
+        if left and right:
+            total += 0.3 if left == right else -0.2
+    if a.birth_date and b.birth_date:
+        total += 0.5 if a.birth_date.date() == b.birth_date.date() else 0.1
+    return total
+
+def match_blocks(blocks: List[List[Mention]], threshold: float) -> List[Tuple[float, Tuple, Tuple]]:
+    """Scored matching pairs within each block; runs in the worker pool"""
+    pairs = []
+    for block in blocks:
+        for i, a in enumerate(block):
+            for b in block[i + 1:]:
+                if a.birth_date and b.birth_date and a.birth_date.year != b.birth_date.year:
+                    continue
+                pair_score = score(a, b)
+                if pair_score >= threshold:
+                    pairs.append((pair_score, a.ref, b.ref))
+    return pairs
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def find_pairs(blocks: List[List[Mention]], workers: int, threshold: float,
+               chunk_size: int = 2000) -> Iterable[Tuple[float, Tuple, Tuple]]:
+    if workers <= 1:
+        return match_blocks(blocks, threshold)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(partial(match_blocks, threshold=threshold), chunked(blocks, chunk_size))
+        return [pair for chunk in chunks for pair in chunk]
+
+class UnionFind:
+    """Union-find over mention refs that tracks the SINGLE_KINDS of each cluster"""
+
+    def __init__(self):
+        self.parent: Dict = {}
+        self.single: Dict = {}  # root -> SINGLE_KINDS present in its cluster
+
+    def find(self, item):
+        parent = self.parent.get(item)
+        if parent is None:
+            self.parent[item] = item
+            if item[0] in SINGLE_KINDS:
+                self.single[item] = frozenset([item[0]])
+            return item
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b) -> bool:
+        """Merge the clusters of a and b, unless both already hold a baptism or a burial"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return True
+        kinds_a = self.single.pop(root_a, frozenset())
+        kinds_b = self.single.get(root_b, frozenset())
+        if kinds_a & kinds_b:
+            if kinds_a:
+                self.single[root_a] = kinds_a
+            return False
+        self.parent[root_a] = root_b
+        if kinds_a:
+            self.single[root_b] = kinds_a | kinds_b
+        return True
+
+def resolve_persons(conn, full: bool = False, workers: Optional[int] = None) -> Dict[str, int]:
+    """Link unlinked mentions (or all of them with ``full``) into persons"""
+    workers = workers or settings.PERSON_MATCH_WORKERS
+    if full:
+        conn.execute(delete(person_documents))
+        conn.execute(delete(persons))
+    linked = {
+        (row.kind, row.document_id, row.role): row.person_id
+        for row in conn.execute(select(person_documents))
+    }
+
+    # Group by name and father keys; the year is checked pairwise so that
+    # mentions without a birth date still meet their candidates
+    blocks: Dict[Tuple[str, str], List[Mention]] = {}
+    seen = set()
+    for mention in read_mentions(conn):
+        seen.add(mention.ref)
+        blocks.setdefault((mention.name, mention.father), []).append(mention)
+    stale = [ref for ref in linked if ref not in seen]
+    new = {ref for ref in seen if ref not in linked}
+
+    # Only blocks with something new need comparing
+    dirty = [block for block in blocks.values() if any(m.ref in new for m in block)]
+    mentions = {m.ref: m for block in dirty for m in block}
+    uf = UnionFind()
+    # Existing persons first, so new mentions can't give them a second
+    # baptism or burial through a differently ordered merge
+    members: Dict[int, Tuple] = {}
+    for ref in mentions:
+        if ref in linked:
+            uf.union(members.setdefault(linked[ref], ref), ref)
+    conflicts = 0
+    pairs = find_pairs(dirty, workers, settings.PERSON_MATCH_THRESHOLD)
+    for _, a, b in sorted(pairs, key=lambda pair: -pair[0]):
+        if not uf.union(a, b):
+            conflicts += 1
+
+    clusters: Dict = {}
+    for ref in mentions:
+        clusters.setdefault(uf.find(ref), []).append(ref)
+
+    links, merges, fresh = [], [], []
+    for refs in clusters.values():
+        existing = sorted({linked[ref] for ref in refs if ref in linked})
+        if existing:
+            person_id = existing[0]
+            merges += [(person_id, other) for other in existing[1:]]
+        else:
+            person_id = None
+            fresh.append(refs)
+        links += [(person_id, ref) for ref in refs if ref not in linked]
+
+    # New persons for clusters made only of new mentions
+    new_ids = []
+    if fresh:
+        now = datetime.utcnow()
+        new_ids = conn.execute(
+            insert(persons).returning(persons.c.id, sort_by_parameter_order=True),
+            [{"created_at": now} for _ in fresh],
+        ).scalars().all()
+    fresh_person = {ref: person_id for refs, person_id in zip(fresh, new_ids) for ref in refs}
+
+    for keep, absorbed in merges:
+        conn.execute(
+            update(person_documents)
+            .where(person_documents.c.person_id == absorbed)
+            .values(person_id=keep)
+        )
+    if merges:
+        conn.execute(delete(persons).where(persons.c.id.in_([absorbed for _, absorbed in merges])))
+
+    if stale:
+        # Documents deleted since the last run; drop persons left without any
+        conn.execute(delete(person_documents).where(
+            tuple_(person_documents.c.kind, person_documents.c.document_id, person_documents.c.role).in_(stale)
+        ))
+        conn.execute(delete(persons).where(
+            ~exists().where(person_documents.c.person_id == persons.c.id)
+        ))
+    rows = [
+        {
+            "kind": ref[0],
+            "document_id": ref[1],
+            "role": ref[2],
+            "person_id": person_id or fresh_person[ref],
+            "block_key": mentions[ref].block_key,
+        }
+        for person_id, ref in links
+    ]
+    for batch in chunked(rows, 10000):
+        conn.execute(insert(person_documents), batch)
+
+    return {
+        "mentions": len(seen),
+        "compared_blocks": len(dirty),
+        "linked": len(rows),
+        "new_persons": len(new_ids),
+        "merged_persons": len(merges),
+        "conflicts": conflicts,
+        "removed": len(stale),
+    }
+
+# Column giving the date a document records, for ordering a timeline
+EVENT_DATES = {
+    "membership": "created_at",
+    "baptism": "baptism_date",
+    "burial": "burial_date",
+    "marriage": "date_of_marriage",
+}
+
+def person_timeline(db: Session, person_id: int) -> List[Dict]:
+    """
+    Every document of a person, oldest event first.
+
+    One UNION ALL statement; each branch reaches its register through the
+    person_id index of person_documents and the document primary key.
+    """
+    selects = []
+    for kind, model, role, prefix, _ in MENTION_SOURCES:
+        table = model.__table__
+        selects.append(
+            select(
+                person_documents.c.kind,
+                person_documents.c.role,
+                person_documents.c.document_id,
+                table.c.serial_number,
+                table.c[f"amharic_{prefix}name"].label("amharic_name"),
+                table.c[f"english_{prefix}name"].label("english_name"),
+                table.c[EVENT_DATES[kind]].label("event_date"),
+            )
+            .join(table, table.c.id == person_documents.c.document_id)
+            .where(and_(
+                person_documents.c.person_id == person_id,
+                person_documents.c.kind == literal(kind),
+                person_documents.c.role == literal(role),
+            ))
+        )
+    timeline = union_all(*selects).subquery()
+    rows = db.execute(
+        select(timeline).order_by(timeline.c.event_date.asc().nulls_last(), timeline.c.kind)
+    )
+    return [dict(row) for row in rows.mappings()]
+
+def main() -> None:
+    from .session import engine
+
+    parser = argparse.ArgumentParser(description="Link religious document mentions into persons")
+    parser.add_argument("--full", action="store_true", help="rebuild every cluster")
+    parser.add_argument("--workers", type=int, default=None, help="matching processes")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    with engine.begin() as conn:
+        stats = resolve_persons(conn, full=args.full, workers=args.workers)
+    print(stats, "in", datetime.now() - started)
+
+if __name__ == "__main__":
+    main()
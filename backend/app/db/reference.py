@@ -0,0 +1,243 @@
+"""
+In-process cache of the small lookup tables (roles, user types, item,
+document, transaction and schedule types, shifts).
+
+Every worker keeps a snapshot of each table. Writes go through
+``reference_changed``, which bumps the table's row in ``reference_versions``
+inside the writer's transaction. Workers compare their snapshots with those
+counters at most every ``REFERENCE_CACHE_CHECK_MS``, so a change made by one
+worker reaches the others within that interval, and immediately in the
+worker that made it.
+"""
+from hashlib import sha1
+from threading import Lock
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+import json
+import logging
+import time
+from pydantic import BaseModel
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
+from ..core.config import settings
+from .. import models, schemas
+from . import session
+
+logger = logging.getLogger(__name__)
+
+class Reference(NamedTuple):
+    model: Any
+    schema: type
+
+REFERENCE_TABLES = {
+    "roles": Reference(models.Role, schemas.Role),
+    "user_types": Reference(models.UserType, schemas.UserType),
+    "item_types": Reference(models.ItemType, schemas.ItemType),
+    "document_types": Reference(models.DocumentType, schemas.DocumentType),
+    "transaction_types": Reference(models.TransactionType, schemas.TransactionType),
+    "schedule_types": Reference(models.ScheduleType, schemas.ScheduleType),
+    "shifts": Reference(models.Shift, schemas.Shift),
+}
+
+versions = models.ReferenceVersion.__table__
+
+class Snapshot(NamedTuple):
+    version: int
+    rows: List[Dict[str, Any]]
+    by_id: Dict[int, Dict[str, Any]]
+    etag: str
+
+class ReferenceCache:
+    """
+    Rows of the reference tables as response dicts, in id order.
+
+    Rows are read-only: they are shared by every request of the worker.
+    ``_lock`` only guards the snapshot dicts; queries run outside it, one
+    reload at a time per table, so a slow reload never holds up readers of
+    the other tables.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+        self.misses = 0
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._stale: Set[str] = set()
+        self._missed_at: Dict[str, float] = {}
+        self._checked_at = 0.0
+        self._lock = Lock()
+        self._check_lock = Lock()
+        self._load_locks = {table: Lock() for table in REFERENCE_TABLES}
+
+    def load(self) -> None:
+        """Load every table; called at startup"""
+        self._checked_at = time.monotonic()
+        with session.SessionLocal() as db:
+            current = self._versions(db)
+            for table in REFERENCE_TABLES:
+                with self._load_locks[table]:
+                    with self._lock:
+                        self._stale.discard(table)
+                    self._install(table, self._read(db, table, current.get(table, 0)))
+
+    def snapshot(self, table: str) -> Snapshot:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._check()
+        with self._lock:
+            snapshot = self._snapshots.get(table)
+            if snapshot is not None and table not in self._stale:
+                self.hits += 1
+                return snapshot
+        with self._load_locks[table]:
+            with self._lock:
+                # Reloaded by another thread while this one waited
+                snapshot = self._snapshots.get(table)
+                if snapshot is not None and table not in self._stale:
+                    return snapshot
+                # Cleared first, so an invalidation during the read marks it again
+                self._stale.discard(table)
+            try:
+                with session.SessionLocal() as db:
+                    snapshot = self._read(db, table, self._versions(db).get(table, 0))
+            except Exception:
+                with self._lock:
+                    self._stale.add(table)
+                raise
+            self._install(table, snapshot)
+            return snapshot
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        return self.snapshot(table).rows
+
+    def get(self, table: str, row_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Row of ``table`` by id.
+
+        An unknown id reloads the table first, so rows added by another
+        worker (or outside the API) are found before the next check. Misses
+        reload a table at most once per check interval, so lookups of ids
+        that don't exist can't turn every request into a reload.
+        """
+        row = self.snapshot(table).by_id.get(row_id)
+        if row is None and self._reload_for_miss(table):
+            row = self.snapshot(table).by_id.get(row_id)
+        return row
+
+    def find(self, table: str, name: str) -> Optional[Dict[str, Any]]:
+        """Row of ``table`` by name, reloading the table on a miss like ``get``"""
+        for attempt in range(2):
+            for row in self.snapshot(table).rows:
+                if row["name"] == name:
+                    return row
+            if attempt == 0 and not self._reload_for_miss(table):
+                break
+        return None
+
+    def invalidate(self, *tables: str) -> None:
+        with self._lock:
+            self._stale.update(tables)
+            self.invalidations += len(tables)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self._stale.clear()
+            self._missed_at.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tables": {table: len(snapshot.rows) for table, snapshot in self._snapshots.items()},
+                "hits": self.hits,
+                "loads": self.loads,
+                "invalidations": self.invalidations,
+                "misses": self.misses,
+            }
+
+    def _reload_for_miss(self, table: str) -> bool:
+        """Mark ``table`` stale after a lookup miss, unless a miss did so within the check interval"""
+        now = time.monotonic()
+        with self._lock:
+            self.misses += 1
+            missed_at = self._missed_at.get(table)
+            if missed_at is not None and now - missed_at < self.check_interval:
+                return False
+            self._missed_at[table] = now
+            self._stale.add(table)
+            self.invalidations += 1
+            return True
+
+    def _versions(self, db: Session) -> Dict[str, int]:
+        return dict(db.execute(select(versions.c.table_name, versions.c.version)).all())
+
+    def _check(self) -> None:
+        """Mark the tables another worker has changed since they were loaded"""
+        # One thread checks; the others keep serving the current snapshots
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            with session.SessionLocal() as db:
+                current = self._versions(db)
+        except Exception:
+            logger.exception("Could not check reference table versions")
+            return
+        finally:
+            self._check_lock.release()
+        with self._lock:
+            for table, snapshot in self._snapshots.items():
+                if current.get(table, 0) != snapshot.version:
+                    self._stale.add(table)
+
+    def _read(self, db: Session, table: str, version: int) -> Snapshot:
+        # The version is read before the rows: a change committed in between
+        # leaves an older version with newer rows, which is reloaded again
+        # on the next check rather than kept
+        model, schema = REFERENCE_TABLES[table]
+        query = db.query(model).order_by(model.id)
+        if model is models.UserType:
+            query = query.options(selectinload(models.UserType.roles))
+        rows = [dump(schema, row) for row in query]
+        text = json.dumps(rows, sort_keys=True, ensure_ascii=False)
+        return Snapshot(version, rows, {row["id"]: row for row in rows},
+                        f'"{sha1(text.encode()).hexdigest()[:20]}"')
+
+    def _install(self, table: str, snapshot: Snapshot) -> None:
+        with self._lock:
+            self._snapshots[table] = snapshot
+            self.loads += 1
+
+def dump(schema: type, row: Any) -> Dict[str, Any]:
+    model: BaseModel = schema.model_validate(row)
+    return model.model_dump(mode="json")
+
+reference_cache = ReferenceCache(check_interval=settings.REFERENCE_CACHE_CHECK_MS / 1000)
+
+def reference_changed(db: Session, *tables: str) -> None:
+    """
+    Record a change of ``tables`` in the current transaction of ``db``.
+
+    Call it before committing. Other workers see the new versions once the
+    transaction commits; this worker drops its snapshots at the commit.
+    """
+    for table in tables:
+        stmt = insert(versions).values(table_name=table, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[versions.c.table_name],
+            set_={"version": versions.c.version + 1},
+        )
+        db.execute(stmt)
+    db.info.setdefault("reference_changes", set()).update(tables)
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_references(session: Session) -> None:
+    tables = session.info.pop("reference_changes", None)
+    if tables:
+        reference_cache.invalidate(*tables)
+
+@event.listens_for(Session, "after_soft_rollback")
+def drop_reference_changes(session: Session, previous_transaction) -> None:
+    # The version bumps were rolled back with the writes they announced
+    session.info.pop("reference_changes", None)
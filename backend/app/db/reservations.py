@@ -0,0 +1,142 @@
+"""
+Item reservations.
+
+A reservation books a quantity of an item for a half-open period
+``[start, end)``. Reservations of an item may overlap as long as, at every
+instant, their quantities add up to no more than the item's stock (on hand
+plus checked out). Rejected reservations don't count.
+
+Overlapping reservations are found through the GiST index on ``period``.
+The peak usage of a window is a sweep over their start and end points, so
+the availability of a month of days for hundreds of items is one index
+scan and a linear pass over the bookings. ``benchmarks/reservations.py``
+times availability lookups.
+"""
+from datetime import date, datetime, time, timedelta
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import DateTime, func, select
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.orm import Session
+from .. import models
+
+items = models.Item.__table__
+reservations = models.Reservation.__table__
+
+# Longest span of days one availability lookup covers
+MAX_AVAILABILITY_DAYS = 366
+
+class Unavailable(Exception):
+    def __init__(self, item_id: int, requested: int, available: Optional[int]):
+        self.item_id = item_id
+        self.requested = requested
+        self.available = available
+        if available is None:
+            message = f"Item {item_id} does not exist"
+        else:
+            message = f"Only {available} of item {item_id} free for that period, {requested} requested"
+        super().__init__(message)
+
+def window_peaks(events: List[Tuple[datetime, int]], edges: Sequence[datetime]) -> List[int]:
+    """
+    Highest booked quantity within each window ``[edges[i], edges[i + 1])``.
+
+    ``events`` are ``(start, quantity)`` and ``(end, -quantity)`` pairs of
+    bookings; they are sorted in place. Ends sort before starts at the same
+    instant, so back-to-back bookings don't add up.
+    """
+    if not events:
+        return [0] * (len(edges) - 1)
+    events.sort()
+    peaks = []
+    used = 0
+    i = 0
+    n = len(events)
+    for window_start, window_end in zip(edges, edges[1:]):
+        while i < n and events[i][0] <= window_start:
+            used += events[i][1]
+            i += 1
+        peak = used
+        while i < n and events[i][0] < window_end:
+            used += events[i][1]
+            i += 1
+            if used > peak:
+                peak = used
+        peaks.append(peak)
+    return peaks
+
+def booking_events(db: Session, item_ids, start: datetime, end: datetime,
+                   exclude_id: Optional[int] = None) -> Dict[int, List[Tuple[datetime, int]]]:
+    """
+    Start and end events of the active reservations overlapping
+    ``[start, end)``, per item of ``item_ids`` (a list of ids or a select)
+    """
+    # Bounds as plain timestamps; parsing range literals costs more than the query
+    stmt = select(
+        reservations.c.item_id,
+        func.lower(reservations.c.period, type_=DateTime),
+        func.upper(reservations.c.period, type_=DateTime),
+        reservations.c.quantity,
+    ).where(
+        reservations.c.item_id.in_(item_ids),
+        reservations.c.period.overlaps(Range(start, end, bounds="[)")),
+        reservations.c.status != models.TransactionStatus.rejected,
+    )
+    if exclude_id is not None:
+        stmt = stmt.where(reservations.c.id != exclude_id)
+    events: Dict[int, List[Tuple[datetime, int]]] = defaultdict(list)
+    for item_id, lower, upper, quantity in db.execute(stmt):
+        item_events = events[item_id]
+        item_events.append((lower, quantity))
+        item_events.append((upper, -quantity))
+    return events
+
+def check_available(db: Session, reservation: models.Reservation) -> None:
+    """
+    Raise ``Unavailable`` unless ``reservation`` fits next to the item's
+    other reservations.
+
+    Locks the item row until the caller's transaction ends, so concurrent
+    reservations of one item are checked one after the other.
+    """
+    capacity = db.execute(
+        select(items.c.quantity + items.c.checked_out)
+        .where(items.c.id == reservation.item_id)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if capacity is None:
+        raise Unavailable(reservation.item_id, reservation.quantity, None)
+    start, end = reservation.period.lower, reservation.period.upper
+    events = booking_events(db, [reservation.item_id], start, end, exclude_id=reservation.id)
+    available = capacity - window_peaks(events[reservation.item_id], [start, end])[0]
+    if reservation.quantity > available:
+        raise Unavailable(reservation.item_id, reservation.quantity, max(available, 0))
+
+def availability(db: Session, start: date, days: int, item_ids: Optional[List[int]] = None,
+                 type_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Free quantity of each item on each of ``days`` days from ``start``"""
+    selected = select(items.c.id)
+    if item_ids is not None:
+        selected = selected.where(items.c.id.in_(item_ids))
+    if type_id is not None:
+        selected = selected.where(items.c.type_id == type_id)
+    rows = db.execute(
+        selected.add_columns(items.c.name, items.c.type_id, (items.c.quantity + items.c.checked_out).label("capacity"))
+        .order_by(items.c.id)
+    ).all()
+    first = datetime.combine(start, time.min)
+    edges = [first + timedelta(days=day) for day in range(days + 1)]
+    # The item filter is repeated as a subquery rather than sent as a list of ids
+    events = booking_events(db, selected, edges[0], edges[-1])
+    result = []
+    for item_id, name, item_type_id, capacity in rows:
+        peaks = window_peaks(events[item_id], edges)
+        result.append({
+            "item_id": item_id,
+            "name": name,
+            "type_id": item_type_id,
+            "capacity": capacity,
+            # Stock taken out after booking can leave less than was reserved
+            "available": [capacity - peak if peak < capacity else 0 for peak in peaks],
+        })
+    return result
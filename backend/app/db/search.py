@@ -0,0 +1,175 @@
+from typing import Dict, List, Optional
+import argparse
+import time
+from sqlalchemy import Integer, String, case, column, event, func, literal, literal_column, or_, select, union_all, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from ..core.transliteration import field_keys, name_phonetic_keys
+from .. import models
+
+# Searchable person-name columns; their concatenation is indexed with a
+# pg_trgm GIN index per table (see migration 9e4b6c1d3f25), so the query
+# below must build exactly the same expression.
+NAME_FIELDS = [
+    "english_name",
+    "english_christian_name",
+    "english_father_name",
+    "english_mother_name",
+    "amharic_name",
+    "amharic_christian_name",
+    "amharic_father_name",
+    "amharic_mother_name",
+]
+BRIDE_FIELDS = [
+    "english_bride_name",
+    "english_bride_christian_name",
+    "english_bride_father_name",
+    "english_bride_mother_name",
+    "amharic_bride_name",
+    "amharic_bride_christian_name",
+    "amharic_bride_father_name",
+    "amharic_bride_mother_name",
+]
+
+RELIGIOUS_DOCUMENTS = {
+    "membership": models.MembershipDocument,
+    "baptism": models.BaptismDocument,
+    "burial": models.BurialDocument,
+    "marriage": models.MarriageDocument,
+}
+
+def search_fields(model) -> List[str]:
+    return NAME_FIELDS + BRIDE_FIELDS if model is models.MarriageDocument else NAME_FIELDS
+
+def search_expression(fields: List[str]) -> str:
+    """SQL of the lower-cased, space-joined name columns"""
+    joined = " || ' ' || ".join(f"coalesce({field}, '')" for field in fields)
+    return f"lower({joined})"
+
+def document_name_keys(model, document: Dict[str, Optional[str]]) -> List[str]:
+    return field_keys(document, search_fields(model))
+
+def refresh_name_keys(mapper, connection, target):
+    """Keep name_keys current with the name columns on every write"""
+    model = type(target)
+    target.name_keys = document_name_keys(model, {field: getattr(target, field) for field in search_fields(model)})
+
+for model in RELIGIOUS_DOCUMENTS.values():
+    event.listen(model, "before_insert", refresh_name_keys)
+    event.listen(model, "before_update", refresh_name_keys)
+
+def backfill_name_keys(conn, batch_size: int = 1000) -> int:
+    """
+    Recompute name_keys for every religious document, e.g. after the
+    transliteration rules change (``python -m app.db.search --backfill``).
+
+    Rows are read in id order, ``batch_size`` at a time, and each batch is
+    written back with a single UPDATE ... FROM (VALUES ...) that leaves
+    updated_at alone. Keys of repeated names come from the ``phonetic_key``
+    cache.
+    """
+    updated = 0
+    for model in RELIGIOUS_DOCUMENTS.values():
+        table = model.__table__
+        fields = search_fields(model)
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                select(table.c.id, *(table.c[field] for field in fields))
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            batch = values(
+                column("id", Integer), column("name_keys", ARRAY(String)), name="batch"
+            ).data([(row["id"], document_name_keys(model, row)) for row in rows])
+            conn.execute(
+                update(table)
+                .where(table.c.id == batch.c.id)
+                .values(name_keys=batch.c.name_keys, updated_at=table.c.updated_at)
+            )
+            updated += len(rows)
+            last_id = rows[-1]["id"]
+    return updated
+
+# Rank given to a phonetic-key match that has no closer spelling match
+PHONETIC_RANK = 0.5
+
+def like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def search_religious_documents(db: Session, query: str, kind: Optional[str] = None,
+                               limit: int = 20) -> List[Dict]:
+    """
+    Ranked name search across the religious document registers.
+
+    A row matches if the query is a substring of its names, is word-similar
+    to one of them (typos, partial names), or shares a phonetic key with
+    them, which matches "Tesfay" to "ተስፋዬ". The first two are served by the
+    trigram index and the last by the name_keys index. Rows are ranked by
+    ``word_similarity``, with phonetic matches ranked at least
+    ``PHONETIC_RANK``. Each register contributes at most ``limit`` rows
+    before the merged top ``limit``.
+    """
+    term = query.strip().lower()
+    pattern = literal(like_pattern(term), String)
+    query_keys = name_phonetic_keys(term)
+    term = literal(term, String)
+    selects = []
+    for name, model in RELIGIOUS_DOCUMENTS.items():
+        if kind is not None and kind != name:
+            continue
+        fields = search_fields(model)
+        document = literal_column(search_expression(fields), String)
+        matches = [document.like(pattern, escape="\\"), document.op("%>")(term)]
+        rank = func.word_similarity(term, document)
+        if query_keys:
+            keys = sorted({f"{field.split('_', 1)[1]}:{key}" for field in fields for key in query_keys})
+            phonetic = model.name_keys.overlap(literal(keys, ARRAY(String)))
+            matches.append(phonetic)
+            rank = func.greatest(rank, case((phonetic, PHONETIC_RANK), else_=0))
+        rank = rank.label("rank")
+        selects.append(
+            select(
+                literal(name).label("kind"),
+                model.id,
+                model.serial_number,
+                model.english_name,
+                model.english_christian_name,
+                model.amharic_name,
+                model.amharic_christian_name,
+                model.date_of_birth,
+                rank,
+            )
+            .where(or_(*matches))
+            .order_by(rank.desc())
+            .limit(limit)
+        )
+    if not selects:
+        return []
+    results = union_all(*selects).subquery()
+    rows = db.execute(
+        select(results).order_by(results.c.rank.desc(), results.c.kind, results.c.id).limit(limit)
+    )
+    return [dict(row) for row in rows.mappings()]
+
+def main() -> None:
+    from .session import engine
+
+    parser = argparse.ArgumentParser(description="Maintain the religious document name search")
+    parser.add_argument("--backfill", action="store_true", help="recompute name_keys of every document")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.error("nothing to do; pass --backfill")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        updated = backfill_name_keys(conn, args.batch_size)
+    print(f"recomputed name_keys of {updated} documents in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from .. import models
+
+counters = models.SerialCounter.__table__
+
+# Per-worker blocks of pre-allocated numbers: (prefix, year) -> [[next, last], ...]
+_blocks: Dict[Tuple[str, int], List[List[int]]] = {}
+_blocks_lock = Lock()
+
+def format_serial(prefix: str, year: int, number: int) -> str:
+    """PREFIX-YEAR-SEQUENCE, e.g. CHA-2025-0042"""
+    return f"{prefix}-{year}-{number:04d}"
+
+def reserve(conn, prefix: str, year: int, count: int) -> int:
+    """
+    Atomically advance the (prefix, year) counter by ``count``.
+
+    A single upsert takes the counter row lock, so concurrent callers always
+    receive disjoint ranges. Returns the last number of the reserved range.
+    """
+    stmt = insert(counters).values(prefix=prefix, year=year, value=count)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[counters.c.prefix, counters.c.year],
+        set_={"value": counters.c.value + count},
+    ).returning(counters.c.value)
+    return conn.execute(stmt).scalar_one()
+
+def take_numbers(key: Tuple[str, int], count: int) -> List[int]:
+    """Up to ``count`` numbers from the worker's blocks; call with ``_blocks_lock`` held"""
+    numbers: List[int] = []
+    blocks = _blocks.get(key, [])
+    while blocks and len(numbers) < count:
+        block = blocks[0]
+        take = min(count - len(numbers), block[1] - block[0] + 1)
+        numbers.extend(range(block[0], block[0] + take))
+        block[0] += take
+        if block[0] > block[1]:
+            blocks.pop(0)
+    return numbers
+
+def next_numbers(db: Session, prefix: str, count: int = 1, year: Optional[int] = None) -> List[int]:
+    """
+    Reserve ``count`` sequence numbers for ``prefix`` in ``year``.
+
+    With ``SERIAL_BLOCK_SIZE`` of 1 the counter is advanced inside the
+    caller's transaction, so a rolled-back insert gives its number back.
+    Larger blocks trade gapless numbering for one counter round-trip per
+    block: a block is reserved in the caller's transaction too, so no
+    second connection is taken from the pool, and the numbers the caller
+    doesn't use are handed out by this worker once that transaction
+    commits. A rollback returns the whole block to the counter.
+    """
+    year = year or datetime.now().year
+    block_size = settings.SERIAL_BLOCK_SIZE
+    if block_size <= 1:
+        last = reserve(db, prefix, year, count)
+        return list(range(last - count + 1, last + 1))
+
+    key = (prefix, year)
+    with _blocks_lock:
+        numbers = take_numbers(key, count)
+    needed = count - len(numbers)
+    if needed:
+        size = max(block_size, needed)
+        last = reserve(db, prefix, year, size)
+        first = last - size + 1
+        numbers.extend(range(first, first + needed))
+        if first + needed <= last:
+            db.info.setdefault("serial_blocks", []).append((key, [first + needed, last]))
+    return numbers
+
+@event.listens_for(Session, "after_commit")
+def release_serial_blocks(session: Session) -> None:
+    spare = session.info.pop("serial_blocks", None)
+    if spare:
+        with _blocks_lock:
+            for key, block in spare:
+                _blocks.setdefault(key, []).append(block)
+
+@event.listens_for(Session, "after_soft_rollback")
+def drop_serial_blocks(session: Session, previous_transaction) -> None:
+    # The counter update was rolled back, so these numbers may be reserved again
+    session.info.pop("serial_blocks", None)
+
+def allocate_serials(db: Session, prefix: str, count: int) -> List[str]:
+    year = datetime.now().year
+    return [format_serial(prefix, year, number) for number in next_numbers(db, prefix, count, year)]
+
+def allocate_serial(db: Session, prefix: str) -> str:
+    return allocate_serials(db, prefix, 1)[0]
+
+def assign_serials(db: Session, rows: List[Dict[str, Any]], prefix_of: Callable[[Dict[str, Any]], str]) -> None:
+    """Fill in serial_number of rows lacking one, one reservation per prefix"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        if not row.get("serial_number"):
+            groups.setdefault(prefix_of(row), []).append(row)
+    for prefix, group in groups.items():
+        for row, serial in zip(group, allocate_serials(db, prefix, len(group))):
+            row["serial_number"] = serial
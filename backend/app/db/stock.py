@@ -0,0 +1,186 @@
+"""
+Stock ledger of items.
+
+``items.quantity`` is the stock on hand, ``items.checked_out`` what open
+transactions have lent out and ``items.overdue`` the part of that past its
+due date. They only change here, each time in one conditional UPDATE
+together with an appended ``stock_movements`` row, so concurrent checkouts
+queue on the item's row lock and can never take more than is on hand.
+
+A transaction holds stock while it has an item, hasn't been returned and
+isn't rejected. Endpoints compare a transaction's hold before and after a
+change with ``hold_changed`` and the difference is returned and checked out.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+import argparse
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.orm import Session
+from .. import models
+from ..core.audit import current_user
+
+items = models.Item.__table__
+movements = models.StockMovement.__table__
+
+class OutOfStock(Exception):
+    def __init__(self, item_id: int, requested: int, available: Optional[int]):
+        self.item_id = item_id
+        self.requested = requested
+        self.available = available
+        if available is None:
+            message = f"Item {item_id} does not exist"
+        else:
+            message = f"Only {available} of item {item_id} on hand, {requested} requested"
+        super().__init__(message)
+
+def current_user_id(db: Session) -> Optional[int]:
+    user = db.info.get("current_user") or current_user.get()
+    return user.id if user is not None else None
+
+def move_stock(db: Session, item_id: int, kind: str, quantity: int, *, checked_out: int = 0,
+               overdue: int = 0, transaction_id: Optional[int] = None) -> int:
+    """
+    Change the stock on hand of an item by ``quantity`` and its counters by
+    ``checked_out`` and ``overdue``, and append the movement to the ledger.
+
+    Stock is taken with ``quantity = quantity - n WHERE quantity >= n``;
+    raises ``OutOfStock`` when there isn't enough. Returns the new stock on
+    hand. Runs in the caller's transaction.
+    """
+    values: Dict[str, Any] = {"quantity": items.c.quantity + quantity}
+    if checked_out:
+        values["checked_out"] = items.c.checked_out + checked_out
+    if overdue:
+        values["overdue"] = items.c.overdue + overdue
+    stmt = update(items).where(items.c.id == item_id).values(**values).returning(items.c.quantity)
+    if quantity < 0:
+        stmt = stmt.where(items.c.quantity >= -quantity)
+    on_hand = db.execute(stmt).scalar_one_or_none()
+    if on_hand is None:
+        available = db.execute(select(items.c.quantity).where(items.c.id == item_id)).scalar_one_or_none()
+        raise OutOfStock(item_id, -quantity, available)
+    db.execute(insert(movements).values(
+        item_id=item_id,
+        transaction_id=transaction_id,
+        kind=kind,
+        quantity=quantity,
+        on_hand=on_hand,
+        user_id=current_user_id(db),
+    ))
+    return on_hand
+
+def record_openings(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Ledger rows for the initial stock of newly created items"""
+    user_id = current_user_id(db)
+    db.execute(insert(movements), [
+        {"item_id": row["id"], "transaction_id": None, "kind": "opening",
+         "quantity": row["quantity"], "on_hand": row["quantity"], "user_id": user_id}
+        for row in rows
+    ])
+
+def adjust_stock(db: Session, item: models.Item, quantity: int) -> None:
+    """
+    Set the stock on hand of ``item`` by recording the difference.
+
+    ``item`` must have been loaded ``with_for_update()``, so no checkout
+    lands between reading the stock and adjusting it.
+    """
+    if quantity != item.quantity:
+        move_stock(db, item.id, "adjustment", quantity - item.quantity)
+
+class Hold(NamedTuple):
+    item_id: int
+    quantity: int
+    overdue: bool
+
+def stock_hold(transaction: Optional[models.Transaction]) -> Optional[Hold]:
+    """The stock a transaction has out, if any"""
+    if transaction is None or transaction.item_id is None or not transaction.quantity:
+        return None
+    if transaction.date_returned is not None or transaction.status == models.TransactionStatus.rejected:
+        return None
+    return Hold(transaction.item_id, transaction.quantity, bool(transaction.overdue))
+
+def hold_changed(db: Session, transaction: models.Transaction, before: Optional[Hold],
+                 after: Optional[Hold]) -> None:
+    """
+    Return what ``transaction`` held ``before`` and check out what it holds
+    ``after`` a change, in the caller's transaction. Pass ``after=None``
+    when deleting it.
+    """
+    if before is not None and after is not None and before[:2] == after[:2]:
+        # Still the same loan; an extended due date ends its overdue count
+        if before.overdue and (transaction.due_date is None or transaction.due_date > datetime.now()):
+            db.execute(update(items).where(items.c.id == before.item_id)
+                       .values(overdue=items.c.overdue - before.quantity))
+            transaction.overdue = False
+        return
+    if before is not None:
+        move_stock(db, before.item_id, "return", before.quantity, checked_out=-before.quantity,
+                   overdue=-before.quantity if before.overdue else 0, transaction_id=transaction.id)
+        transaction.overdue = False
+    if after is not None:
+        move_stock(db, after.item_id, "checkout", -after.quantity, checked_out=after.quantity,
+                   transaction_id=transaction.id)
+        transaction.overdue = False
+
+# Open loans past their due date that aren't counted yet, added to their
+# items' overdue counters in the same statement
+MARK_OVERDUE = text("""
+    WITH flagged AS (
+        UPDATE transactions SET overdue = true
+        WHERE item_id IS NOT NULL
+          AND date_returned IS NULL
+          AND due_date < :now
+          AND NOT overdue
+          AND status <> 'rejected'
+        RETURNING item_id, quantity
+    ), per_item AS (
+        SELECT item_id, sum(quantity) AS quantity FROM flagged GROUP BY item_id
+    ), counted AS (
+        UPDATE items SET overdue = items.overdue + per_item.quantity
+        FROM per_item WHERE items.id = per_item.item_id
+    )
+    SELECT count(*) FROM flagged
+""")
+
+def mark_overdue(db: Session, now: Optional[datetime] = None) -> int:
+    """Count loans that have become overdue since the last run; returns how many"""
+    return db.execute(MARK_OVERDUE, {"now": now or datetime.now()}).scalar_one()
+
+def ledger_mismatches(db: Session) -> List[Dict[str, Any]]:
+    """Items whose stock differs from the sum of their ledger"""
+    ledger = (
+        select(movements.c.item_id, func.sum(movements.c.quantity).label("ledger"))
+        .group_by(movements.c.item_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(items.c.id, items.c.quantity, func.coalesce(ledger.c.ledger, 0).label("ledger"))
+        .outerjoin(ledger, ledger.c.item_id == items.c.id)
+        .where(items.c.quantity != func.coalesce(ledger.c.ledger, 0))
+    )
+    return [dict(row) for row in rows.mappings()]
+
+def main() -> None:
+    from .session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Compare item stock with the ledger")
+    parser.add_argument("--mark-overdue", action="store_true",
+                        help="first count the loans that became overdue, and commit that")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.mark_overdue:
+            marked = mark_overdue(db)
+            db.commit()
+            print(f"{marked} loans became overdue")
+        # Nothing below writes
+        db.execute(text("SET TRANSACTION READ ONLY"))
+        mismatches = ledger_mismatches(db)
+        for row in mismatches:
+            print(f"item {row['id']}: {row['quantity']} on hand, ledger says {row['ledger']}")
+        print(f"{len(mismatches)} items differ from the ledger")
+
+if __name__ == "__main__":
+    main()
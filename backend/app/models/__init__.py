@@ -3,7 +3,7 @@ from .base import Base
 # from .user import User  # Import your model classes
 # Import other models as needed
 
-__all__ = ['Base', 'User', 'Role', 'UserType', 'Schedule', 'Document', 'DocumentType', 'Item', 'ItemType', 'Transaction', 'TransactionType', 'usertype_roles', 'ScheduleType', 'Shift', 'AuditLog'] 
+__all__ = ['Base', 'User', 'Role', 'UserType', 'Schedule', 'Document', 'DocumentType', 'Item', 'ItemType', 'Transaction', 'TransactionType', 'usertype_roles', 'ScheduleType', 'Shift', 'AuditLog', 'AuditOutbox', 'SerialCounter', 'Person', 'PersonDocument', 'ImportJob', 'ImportRowError', 'ReferenceVersion', 'StockMovement', 'TransactionStatus', 'OverdueDigest', 'Reservation'] 
 
 from .models import (
     User,
@@ -20,6 +20,17 @@ from .models import (
     ScheduleType,
     Shift,
     AuditLog,
+    AuditOutbox,
+    SerialCounter,
+    Person,
+    PersonDocument,
+    ImportJob,
+    ImportRowError,
+    ReferenceVersion,
+    StockMovement,
+    TransactionStatus,
+    OverdueDigest,
+    Reservation,
     BaptismDocument,
     BurialDocument,
     MarriageDocument,
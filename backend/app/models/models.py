@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Text, Table, Time, JSON, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Text, Table, Time, JSON, Date, BigInteger, Boolean, Index, CheckConstraint
 from sqlalchemy.orm import relationship, backref
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func, text
 from enum import Enum as PyEnum
 from ..db.base import Base
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.dialects.postgresql import ARRAY, TSRANGE
 
 usertype_roles = Table(
     "usertype_roles",
@@ -40,13 +41,14 @@ class User(Base):
     hashed_password = Column(String)
     type_id = Column(Integer, ForeignKey("user_types.id"))
     kristna_abat_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    profile_picture = Column(String, nullable=True)  # Store base64 encoded image or URL
+    profile_picture = Column(String, nullable=True)  # sha256 of the image in the blob store
     
     user_type = relationship("UserType", back_populates="users")
     assigned_schedules = relationship("Schedule", foreign_keys="Schedule.assigned_by_id")
     approved_schedules = relationship("Schedule", foreign_keys="Schedule.approved_by_id")
     my_schedule = relationship("Schedule", foreign_keys="Schedule.user_id")
-    kristna_abat = relationship("User", remote_side=[id], backref="kristna_children")
+    kristna_abat = relationship("User", remote_side=[id], back_populates="kristna_children")
+    kristna_children = relationship("User", back_populates="kristna_abat")
 
     # For Religious Documents
     membershipdocument = relationship("MembershipDocument",
@@ -113,12 +115,17 @@ class Shift(Base):
 
 class Schedule(Base):
     __tablename__ = "schedules"
+    __table_args__ = (
+        # Calendar ranges of everyone, and of one user
+        Index("ix_schedules_date", "date"),
+        Index("ix_schedules_user_id_date", "user_id", "date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime)
     description = Column(Text)
     type_id = Column(Integer, ForeignKey("schedule_types.id"))
-    shift_id = Column(Integer, ForeignKey("shifts.id"))
+    shift_id = Column(Integer, ForeignKey("shifts.id"), index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     assigned_by_id = Column(Integer, ForeignKey("users.id"))
     approved_by_id = Column(Integer, ForeignKey("users.id"))
@@ -169,7 +176,11 @@ class Item(Base):
     serial_number = Column(String, unique=True, index=True)
     type_id = Column(Integer, ForeignKey("item_types.id"))
     description = Column(Text)
-    quantity = Column(Integer)
+    # Stock on hand, lent out by open transactions and overdue among those;
+    # changed only through app.db.stock
+    quantity = Column(Integer, nullable=False, default=0)
+    checked_out = Column(Integer, nullable=False, default=0, server_default="0")
+    overdue = Column(Integer, nullable=False, default=0, server_default="0")
     date_joined = Column(DateTime, server_default=func.now())
     date_updated = Column(DateTime, onupdate=func.now())
     
@@ -184,23 +195,89 @@ class TransactionType(Base):
     
     transactions = relationship("Transaction", back_populates="trans_type")
 
+class TransactionStatus(str, PyEnum):
+    pending = "pending"
+    approved = "approved"
+    rejected = "rejected"
+
+    def __str__(self) -> str:
+        return self.value
+
+transaction_status = Enum(TransactionStatus, name="transaction_status", values_callable=lambda e: [m.value for m in e])
+
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Open loans only; returned ones are most of the table
+        Index("ix_transactions_open_due_date", "due_date", postgresql_where=text("date_returned IS NULL")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     type_id = Column(Integer, ForeignKey("transaction_types.id"))
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="SET NULL"), nullable=True, index=True)
     description = Column(Text)
     quantity = Column(Integer)
     date_taken = Column(DateTime)
+    due_date = Column(DateTime, nullable=True)
     date_returned = Column(DateTime, nullable=True)
-    status = Column(String)
+    status = Column(transaction_status, nullable=False, default=TransactionStatus.pending,
+                    server_default=TransactionStatus.pending.value)
+    # Counted in items.overdue by app.db.stock.mark_overdue
+    overdue = Column(Boolean, nullable=False, default=False, server_default=false())
     approved_by_id = Column(Integer, ForeignKey("users.id"))
     requested_by_id = Column(Integer, ForeignKey("users.id"))
     
     trans_type = relationship("TransactionType", back_populates="transactions")
+    item = relationship("Item")
     approved_by = relationship("User", foreign_keys=[approved_by_id])
     requested_by = relationship("User", foreign_keys=[requested_by_id])
 
+class StockMovement(Base):
+    """Append-only ledger of every change to an item's stock on hand"""
+    __tablename__ = "stock_movements"
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
+    transaction_id = Column(Integer, ForeignKey("transactions.id", ondelete="SET NULL"), nullable=True, index=True)
+    kind = Column(String, nullable=False)  # opening, adjustment, checkout, return
+    quantity = Column(Integer, nullable=False)  # signed change of the stock on hand
+    on_hand = Column(Integer, nullable=False)  # stock on hand after the movement
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+class Reservation(Base):
+    """Quantity of an item booked for a period, see app.db.reservations"""
+    __tablename__ = "reservations"
+    __table_args__ = (
+        # Overlap lookups (period && range)
+        Index("ix_reservations_period", "period", postgresql_using="gist"),
+        CheckConstraint("quantity > 0", name="ck_reservations_quantity"),
+        CheckConstraint("NOT isempty(period) AND NOT lower_inf(period) AND NOT upper_inf(period)",
+                        name="ck_reservations_period"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
+    quantity = Column(Integer, nullable=False)
+    period = Column(TSRANGE, nullable=False)  # [start, end)
+    description = Column(Text)
+    # Rejected reservations don't hold stock
+    status = Column(transaction_status, nullable=False, default=TransactionStatus.pending,
+                    server_default=TransactionStatus.pending.value)
+    requested_by_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, server_default=func.now())
+
+    item = relationship("Item")
+    requested_by = relationship("User")
+
+    @property
+    def start(self):
+        return self.period.lower
+
+    @property
+    def end(self):
+        return self.period.upper
+
 class ReligiousDocumentBase(Base):
     __abstract__ = True
     id = Column(Integer, primary_key=True, index=True)
@@ -238,6 +315,13 @@ class ReligiousDocumentBase(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
+    # "field:key" phonetic keys of the name columns, maintained by app.db.search
+    name_keys = Column(ARRAY(String), nullable=True)
+
+    @declared_attr
+    def __table_args__(cls):
+        # Phonetic name search (name_keys && keys)
+        return (Index(f"ix_{cls.__tablename__}_name_keys", "name_keys", postgresql_using="gin"),)
 
     @declared_attr
     def priest(cls):
@@ -291,6 +375,79 @@ class MarriageDocument(ReligiousDocumentBase):
     date_of_marriage = Column(DateTime)
     place_of_marriage = Column(String)
 
+class Person(Base):
+    """A person resolved across the religious registers by app.db.persons"""
+    __tablename__ = "persons"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    documents = relationship("PersonDocument", back_populates="person")
+
+class PersonDocument(Base):
+    """Links one person mention in a religious document to its person"""
+    __tablename__ = "person_documents"
+
+    kind = Column(String, primary_key=True)  # membership, baptism, burial, marriage
+    document_id = Column(Integer, primary_key=True)
+    role = Column(String, primary_key=True)  # subject, or groom/bride of a marriage
+    person_id = Column(Integer, ForeignKey("persons.id", ondelete="CASCADE"), nullable=False, index=True)
+    block_key = Column(String, nullable=False, index=True)  # name|father|birth year
+
+    person = relationship("Person", back_populates="documents")
+
+class ImportJob(Base):
+    """A spreadsheet of religious documents being loaded by app.db.importer"""
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # membership, baptism, burial, marriage
+    filename = Column(String, nullable=False)  # as uploaded
+    path = Column(String, nullable=False)  # stored copy the job reads
+    column_map = Column(JSON)  # field -> header, for headers not named after fields
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    message = Column(String)  # why the job failed
+    last_line = Column(Integer, nullable=False, default=1)  # last committed row; the header is row 1
+    imported_rows = Column(Integer, nullable=False, default=0)
+    failed_rows = Column(Integer, nullable=False, default=0)
+    created_by_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class ImportRowError(Base):
+    """Validation or merge errors of one spreadsheet row"""
+    __tablename__ = "import_errors"
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("import_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    line = Column(Integer, nullable=False)
+    errors = Column(JSON, nullable=False)
+
+class SerialCounter(Base):
+    """Last serial number handed out per (prefix, year)"""
+    __tablename__ = "serial_counters"
+
+    prefix = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class OverdueDigest(Base):
+    """Overdue loans per requester, rebuilt by app.db.overdue"""
+    __tablename__ = "overdue_digest"
+
+    requested_by_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    loans = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    oldest_due_date = Column(DateTime, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
+
+class ReferenceVersion(Base):
+    """Change counter of a cached lookup table, see app.db.reference"""
+    __tablename__ = "reference_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     
@@ -302,4 +459,11 @@ class AuditLog(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     timestamp = Column(DateTime, server_default=func.now())
     
-    user = relationship("User", foreign_keys=[user_id])
\ No newline at end of file
+    user = relationship("User", foreign_keys=[user_id])
+
+class AuditOutbox(Base):
+    """Audit records committed with the business write, awaiting relay to audit_logs"""
+    __tablename__ = "audit_outbox"
+
+    id = Column(Integer, primary_key=True)
+    payload = Column(JSON, nullable=False)
@@ -18,6 +18,7 @@ from .schemas import (
     ItemBase,
     ItemCreate,
     Item,
+    ItemSummary,
     ItemTypeBase,
     ItemTypeCreate,
     ItemType,
@@ -26,6 +27,7 @@ from .schemas import (
     TransactionBase,
     TransactionCreate,
     Transaction,
+    TransactionSummary,
     TransactionTypeBase,
     TransactionTypeCreate,
     TransactionType,
@@ -34,6 +36,7 @@ from .schemas import (
     DocumentBase,
     DocumentCreate,
     Document,
+    DocumentSummary,
     DocumentTypeBase,
     DocumentTypeCreate,
     DocumentType,
@@ -58,13 +61,41 @@ from .schemas import (
     ReligiousDocumentBase,
     ReligiousDocumentCreate,
     ReligiousDocument,
+    ReligiousDocumentSummary,
     MembershipDocumentCreate,
     MembershipDocument,
+    MembershipDocumentSummary,
     BaptismDocumentCreate,
     BaptismDocument,
+    BaptismDocumentSummary,
     BurialDocumentCreate,
     BurialDocument,
+    BurialDocumentSummary,
     MarriageDocumentCreate,
     MarriageDocument,
+    MarriageDocumentSummary,
+    ReligiousSearchResult,
+    PersonTimelineEntry,
+    BulkRowResult,
+    BulkResult,
+    ImportJob,
+    ImportRowError,
+    CertificateFilter,
+    Permissions,
+    ItemStock,
+    StockMovement,
+    TransactionStatus,
+    OverdueLoan,
+    OverdueRequester,
+    OverdueDigest,
+    ReservationCreate,
+    Reservation,
+    ItemAvailability,
+    Availability,
+    CalendarUser,
+    CalendarEntry,
+    CalendarDay,
+    CalendarPeriod,
+    Calendar,
 ) 
 from .auth import Token, TokenData
\ No newline at end of file
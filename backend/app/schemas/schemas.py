@@ -1,7 +1,8 @@
-from pydantic import BaseModel, constr
-from typing import Optional, List
-from datetime import datetime, time
+from pydantic import BaseModel, BeforeValidator, conint, constr
+from typing import Annotated, Any, Dict, Literal, Optional, List
+from datetime import date, datetime, time
 from sqlalchemy import Time
+from ..models import TransactionStatus
 
 # Role schemas
 class RoleBase(BaseModel):
@@ -78,10 +79,12 @@ class ItemBase(BaseModel):
     serial_number: Optional[str] = None
 
 class ItemCreate(ItemBase):
-    pass
+    quantity: conint(ge=0)  # stock on hand
 
 class Item(ItemBase):
     id: int
+    checked_out: int = 0
+    overdue: int = 0
     date_joined: datetime
     date_updated: Optional[datetime]
     item_type: Optional['ItemType'] = None
@@ -89,6 +92,19 @@ class Item(ItemBase):
     class Config:
         from_attributes = True
 
+# List-view projection: only the columns a summary row shows
+class ItemSummary(BaseModel):
+    id: int
+    name: str
+    serial_number: Optional[str] = None
+    type_id: int
+    quantity: int
+    checked_out: int = 0
+    date_joined: datetime
+
+    class Config:
+        from_attributes = True
+
 # Transaction schemas
 class TransactionTypeBase(BaseModel):
     name: str
@@ -103,13 +119,21 @@ class TransactionType(TransactionTypeBase):
     class Config:
         from_attributes = True
 
+def lower_status(value):
+    # Clients send PENDING as well as pending
+    return value.lower() if isinstance(value, str) else value
+
+Status = Annotated[TransactionStatus, BeforeValidator(lower_status)]
+
 class TransactionBase(BaseModel):
     type_id: int
+    item_id: Optional[int] = None
     description: Optional[str] = None
     quantity: int
     date_taken: datetime
+    due_date: Optional[datetime] = None
     date_returned: Optional[datetime] = None
-    status: str
+    status: Status = TransactionStatus.pending
     approved_by_id: int
     requested_by_id: int
 
@@ -118,6 +142,7 @@ class TransactionCreate(TransactionBase):
 
 class Transaction(TransactionBase):
     id: int
+    overdue: bool = False
     trans_type: Optional['TransactionType'] = None
     approved_by: Optional['User'] = None
     requested_by: Optional['User'] = None
@@ -125,6 +150,78 @@ class Transaction(TransactionBase):
     class Config:
         from_attributes = True
 
+class TransactionSummary(BaseModel):
+    id: int
+    type_id: int
+    item_id: Optional[int] = None
+    quantity: int
+    date_taken: datetime
+    due_date: Optional[datetime] = None
+    date_returned: Optional[datetime] = None
+    status: TransactionStatus
+    approved_by_id: int
+    requested_by_id: int
+
+    class Config:
+        from_attributes = True
+
+# Overdue loans
+class OverdueLoan(BaseModel):
+    id: int
+    item_id: Optional[int] = None
+    quantity: Optional[int] = None
+    date_taken: Optional[datetime] = None
+    due_date: datetime
+
+class OverdueRequester(BaseModel):
+    requested_by_id: int
+    name: str
+    phone_number: str
+    loans: int
+    quantity: int
+    oldest_due_date: datetime
+    transactions: List[OverdueLoan]
+
+class OverdueDigest(BaseModel):
+    requested_by_id: int
+    name: str
+    loans: int
+    quantity: int
+    oldest_due_date: datetime
+    refreshed_at: datetime
+
+# Reservation schemas
+class ReservationBase(BaseModel):
+    item_id: int
+    quantity: conint(gt=0)
+    start: datetime
+    end: datetime
+    description: Optional[str] = None
+    status: Status = TransactionStatus.pending
+    requested_by_id: Optional[int] = None
+
+class ReservationCreate(ReservationBase):
+    pass
+
+class Reservation(ReservationBase):
+    id: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ItemAvailability(BaseModel):
+    item_id: int
+    name: str
+    type_id: Optional[int] = None
+    capacity: int
+    available: List[int]  # free quantity per day
+
+class Availability(BaseModel):
+    start: date
+    days: int
+    items: List[ItemAvailability]
+
 # Document schemas
 class DocumentTypeBase(BaseModel):
     name: str
@@ -158,6 +255,17 @@ class Document(DocumentBase):
     class Config:
         from_attributes = True
 
+class DocumentSummary(BaseModel):
+    id: int
+    name: str
+    serial_number: Optional[str] = None
+    type_id: int
+    quantity: int
+    date_joined: datetime
+
+    class Config:
+        from_attributes = True
+
 # Schedule schemas
 class ShiftBase(BaseModel):
     name: str
@@ -210,6 +318,38 @@ class Schedule(ScheduleBase):
     class Config:
         from_attributes = True
 
+# Schedule calendar
+class CalendarUser(BaseModel):
+    id: int
+    name: str
+
+class CalendarEntry(ScheduleBase):
+    id: int
+    # Nullable columns; one unassigned slot shouldn't fail a whole range
+    type_id: Optional[int] = None
+    shift_id: Optional[int] = None
+    user_id: Optional[int] = None
+    assigned_by_id: Optional[int] = None
+    approved_by_id: Optional[int] = None
+    schedule_type: Optional[ScheduleType] = None
+    shift: Optional[Shift] = None
+    user: Optional[CalendarUser] = None
+
+class CalendarDay(BaseModel):
+    date: date
+    schedules: List[CalendarEntry]
+
+class CalendarPeriod(BaseModel):
+    start: date
+    end: date  # exclusive
+    days: List[CalendarDay]  # only days with schedules
+
+class Calendar(BaseModel):
+    view: Literal["day", "week", "month"]
+    start: date
+    end: date
+    periods: List[CalendarPeriod]
+
 # AuditLog schemas
 class AuditLogBase(BaseModel):
     table_name: str
@@ -270,6 +410,19 @@ class ReligiousDocument(ReligiousDocumentBase):
     class Config:
         from_attributes = True
 
+class ReligiousDocumentSummary(BaseModel):
+    id: int
+    serial_number: Optional[str] = None
+    english_name: Optional[str]
+    english_christian_name: Optional[str]
+    amharic_name: str
+    amharic_christian_name: str
+    date_of_birth: datetime
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Membership Document Schemas
 class MembershipDocumentCreate(ReligiousDocumentCreate):
     pass
@@ -277,6 +430,9 @@ class MembershipDocumentCreate(ReligiousDocumentCreate):
 class MembershipDocument(ReligiousDocument):
     pass
 
+class MembershipDocumentSummary(ReligiousDocumentSummary):
+    pass
+
 # Baptism Document Schemas
 class BaptismDocumentCreate(ReligiousDocumentCreate):
     baptism_date: datetime
@@ -290,6 +446,9 @@ class BaptismDocument(ReligiousDocument):
     amharic_god_parent_name: str
     english_god_parent_name: Optional[str]
 
+class BaptismDocumentSummary(ReligiousDocumentSummary):
+    baptism_date: datetime
+
 # Burial Document Schemas
 class BurialDocumentCreate(ReligiousDocumentCreate):
     date_of_death: datetime
@@ -303,6 +462,10 @@ class BurialDocument(ReligiousDocument):
     cause_of_death: str
     burial_date: datetime
 
+class BurialDocumentSummary(ReligiousDocumentSummary):
+    date_of_death: datetime
+    burial_date: datetime
+
 # Marriage Document Schemas
 class MarriageDocumentCreate(ReligiousDocumentCreate):
     english_bride_name: Optional[str]
@@ -333,3 +496,107 @@ class MarriageDocument(ReligiousDocument):
     date_of_marriage: datetime
     place_of_marriage: str
 
+class MarriageDocumentSummary(ReligiousDocumentSummary):
+    english_bride_name: Optional[str]
+    amharic_bride_name: str
+    date_of_marriage: datetime
+
+# Religious document search
+class ReligiousSearchResult(BaseModel):
+    kind: str
+    id: int
+    serial_number: Optional[str] = None
+    english_name: Optional[str] = None
+    english_christian_name: Optional[str] = None
+    amharic_name: Optional[str] = None
+    amharic_christian_name: Optional[str] = None
+    date_of_birth: Optional[datetime] = None
+    rank: float
+
+# Person timeline
+class PersonTimelineEntry(BaseModel):
+    kind: str
+    role: str
+    document_id: int
+    serial_number: Optional[str] = None
+    amharic_name: Optional[str] = None
+    english_name: Optional[str] = None
+    event_date: Optional[datetime] = None
+
+# Bulk create report
+class BulkRowResult(BaseModel):
+    index: int
+    status: str  # created or error
+    id: Optional[int] = None
+    serial_number: Optional[str] = None
+    errors: Optional[List[Any]] = None
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRowResult]
+
+# Register imports
+class ImportJob(BaseModel):
+    id: int
+    kind: str
+    filename: str
+    column_map: Optional[Dict[str, str]] = None
+    status: str  # pending, running, done or failed
+    message: Optional[str] = None
+    last_line: int
+    imported_rows: int
+    failed_rows: int
+    created_by_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ImportRowError(BaseModel):
+    id: int
+    line: int
+    errors: List[Any]
+
+    class Config:
+        from_attributes = True
+
+# Stock ledger
+class ItemStock(BaseModel):
+    id: int
+    name: str
+    serial_number: Optional[str] = None
+    type_id: int
+    quantity: int  # on hand
+    checked_out: int
+    overdue: int
+
+    class Config:
+        from_attributes = True
+
+class StockMovement(BaseModel):
+    id: int
+    item_id: int
+    transaction_id: Optional[int] = None
+    kind: str
+    quantity: int
+    on_hand: int
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# Permissions of the current user
+class Permissions(BaseModel):
+    admin: bool
+    permissions: List[str]
+
+# Certificate batches
+class CertificateFilter(BaseModel):
+    kinds: List[Literal["membership", "baptism", "burial", "marriage"]] = ["membership", "baptism", "burial", "marriage"]
+    ids: Optional[List[int]] = None
+    priest_id: Optional[int] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
@@ -0,0 +1,73 @@
+"""
+Time the schedule calendar over a year of schedules::
+
+    python -m benchmarks.calendar --seed 500
+
+``--seed 500`` adds a year of schedules for 500 new deacons before timing
+month, week and single-user year views. The seeded rows are rolled back
+afterwards.
+"""
+from datetime import date, datetime, time, timedelta
+import argparse
+import random
+import timeit
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+from app import models
+from app.db.calendar import calendar, calendar_range, schedules, users
+from app.db.session import SessionLocal
+
+def seed_schedules(db: Session, deacons: int, year: int, per_week: int = 2) -> int:
+    """A year of schedules for ``deacons`` new users, in the caller's transaction"""
+    rnd = random.Random(year)
+    user_type = models.UserType(name="Benchmark deacon")
+    shift = models.Shift(name="Benchmark morning", start_time=time(6), end_time=time(9))
+    services = [models.ScheduleType(name=f"Benchmark service {i}") for i in range(3)]
+    db.add_all([user_type, shift, *services])
+    db.flush()
+    user_ids = db.execute(insert(users).returning(users.c.id), [
+        {"name": f"Deacon {i}", "phone_number": f"09{90000000 + i}", "hashed_password": "-", "type_id": user_type.id}
+        for i in range(deacons)
+    ]).scalars().all()
+    first = datetime(year, 1, 1, 6)
+    rows = [
+        {"date": first + timedelta(days=rnd.randrange(365)), "type_id": rnd.choice(services).id,
+         "shift_id": shift.id, "user_id": user_id, "assigned_by_id": None, "approved_by_id": None}
+        for user_id in user_ids
+        for _ in range(per_week * 52)
+    ]
+    db.execute(insert(schedules), rows)
+    db.execute(text("ANALYZE schedules"))
+    return len(rows)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time calendar queries")
+    parser.add_argument("--seed", type=int, metavar="DEACONS",
+                        help="add a year of schedules for this many deacons, rolled back afterwards")
+    parser.add_argument("--year", type=int, default=date.today().year)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.seed:
+            print(f"Seeded {seed_schedules(db, args.seed, args.year)} schedules")
+        user_id = db.execute(
+            select(schedules.c.user_id).where(schedules.c.user_id.is_not(None)).order_by(schedules.c.id.desc()).limit(1)
+        ).scalar()
+        month = date(args.year, 6, 1)
+        cases = [
+            ("month, everyone", month, None, "month", None),
+            ("week, everyone", month, None, "week", None),
+            ("year, one user", date(args.year, 1, 1), date(args.year + 1, 1, 1), "month", user_id),
+        ]
+        for label, start, end, view, for_user in cases:
+            start, end = calendar_range(start, end, view)
+            result = calendar(db, start, end, view, user_id=for_user)
+            count = sum(len(day["schedules"]) for period in result["periods"] for day in period["days"])
+            elapsed = timeit.timeit(lambda: calendar(db, start, end, view, user_id=for_user),
+                                    number=args.repeat) / args.repeat
+            print(f"{label}: {count} schedules in {elapsed * 1000:.1f}ms")
+        db.rollback()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Certificate rendering throughput of the process pool on this machine::
+
+    python -m benchmarks.certificates --count 500 --workers 4
+
+The workers are started and have loaded the fonts before timing begins.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict
+import argparse
+import time
+from app.core.certificates import ROWS, TITLES, load_fonts, render_certificates
+from app.core.config import settings
+
+def sample_document(kind: str, number: int) -> Dict[str, Any]:
+    """Certificate fields with made-up values"""
+    document: Dict[str, Any] = {"id": number, "serial_number": f"BENCH-{number:06d}"}
+    for row in ROWS[kind]:
+        if row.amharic_field:
+            document[row.amharic_field] = "ተስፋዬ ወልደ ማርያም"
+        if row.english_field:
+            is_date = "date" in row.english_field
+            document[row.english_field] = datetime(1990, 1, 1) if is_date else "Tesfaye Wolde Mariam"
+    return document
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure certificate rendering throughput")
+    parser.add_argument("--count", type=int, default=500, help="certificates to render")
+    parser.add_argument("--workers", type=int, default=None, help="rendering processes")
+    args = parser.parse_args()
+
+    workers = args.workers or settings.CERTIFICATE_WORKERS
+    kinds = list(TITLES)
+    jobs = [(kinds[i % len(kinds)], sample_document(kinds[i % len(kinds)], i)) for i in range(args.count)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_fonts) as pool:
+        # Start the workers before timing
+        list(pool.map(len, [[]] * workers))
+        started = time.perf_counter()
+        size = sum(len(pdf) for _, pdf in render_certificates(jobs, pool, depth=workers * 2))
+        elapsed = time.perf_counter() - started
+    print(f"{args.count} certificates in {elapsed:.2f}s with {workers} workers: "
+          f"{args.count / elapsed:.1f}/s, {size / args.count / 1024:.1f} KiB each")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Throughput and latency of API routes under concurrent load.
+
+Start the app, once with ``ASYNC_DB=false`` and once with ``ASYNC_DB=true``,
+and run against each, e.g.::
+
+    python -m benchmarks.http_load --url http://127.0.0.1:8000 \\
+        --phone 0911111111 --password admin123 --concurrency 32 --requests 4000
+
+Each client thread keeps one connection open and requests the ``--path``
+values in turn. Only the standard library is used, so the client costs the
+same against either router.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlencode, urlsplit
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+
+DEFAULT_PATHS = ["/api/v1/items/?limit=50", "/api/v1/documents/?limit=50", "/api/v1/items/1"]
+
+# Makes request i on a connection and returns its status
+Send = Callable[[http.client.HTTPConnection, int], int]
+
+def connect(url: str) -> http.client.HTTPConnection:
+    parts = urlsplit(url)
+    if parts.scheme == "https":
+        return http.client.HTTPSConnection(parts.netloc)
+    return http.client.HTTPConnection(parts.netloc)
+
+def post_login(conn: http.client.HTTPConnection, phone: str, password: str) -> Tuple[int, bytes]:
+    conn.request("POST", "/api/v1/auth/login", urlencode({"username": phone, "password": password}),
+                 {"Content-Type": "application/x-www-form-urlencoded"})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+def login(url: str, phone: str, password: str) -> str:
+    status, body = post_login(connect(url), phone, password)
+    if status != 200:
+        raise SystemExit(f"Login failed: {status} {body.decode()}")
+    return json.loads(body)["access_token"]
+
+def get(conn: http.client.HTTPConnection, path: str, headers: Dict[str, str]) -> int:
+    conn.request("GET", path, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+def run(url: str, send: Send, requests: int, concurrency: int) -> Tuple[List[float], Dict[int, int]]:
+    """Latencies in seconds of ``requests`` requests, and their count by status"""
+    counter = iter(range(requests))
+    counter_lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    def client() -> None:
+        conn = connect(url)
+        while True:
+            with counter_lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                status = send(conn, i)
+            except (OSError, http.client.HTTPException):
+                # The server drops the connection after an unhandled error
+                conn.close()
+                conn = connect(url)
+                status = 0
+            elapsed = time.perf_counter() - started
+            with counter_lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        conn.close()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return latencies, statuses
+
+def report(latencies: List[float], statuses: Dict[int, int], elapsed: float, concurrency: int) -> str:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    counts = ", ".join(f"{status or 'dropped'}: {count}" for status, count in sorted(statuses.items()))
+    return (f"{len(latencies)} requests, {concurrency} clients ({counts}): "
+            f"{len(latencies) / elapsed:.0f} req/s, p50 {percentile(0.5):.1f}ms, "
+            f"p99 {percentile(0.99):.1f}ms, mean {statistics.mean(latencies) * 1000:.1f}ms")
+
+def measure(url: str, send: Send, requests: int, concurrency: int, warmup: int) -> str:
+    run(url, send, warmup, concurrency)
+    started = time.perf_counter()
+    latencies, statuses = run(url, send, requests, concurrency)
+    return report(latencies, statuses, time.perf_counter() - started, concurrency)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load API routes and report requests/s and latency percentiles")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--phone", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--path", action="append", dest="paths", help=f"repeatable, default {DEFAULT_PATHS}")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    headers = {"Authorization": f"Bearer {login(args.url, args.phone, args.password)}"}
+
+    def send(conn: http.client.HTTPConnection, i: int) -> int:
+        return get(conn, paths[i % len(paths)], headers)
+
+    print(measure(args.url, send, args.requests, args.concurrency, args.warmup))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Login throughput of a running server.
+
+Each request is a full ``POST /auth/login``, so bcrypt dominates and the
+numbers follow ``PASSWORD_HASH_WORKERS``. Requests shed because more than
+``PASSWORD_HASH_MAX_QUEUE`` verifications were waiting show up as 503s::
+
+    python -m benchmarks.login --url http://127.0.0.1:8000 \\
+        --phone 0911111111 --password admin123 --concurrency 16 --requests 400
+"""
+import argparse
+import http.client
+from .http_load import login, measure, post_login
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure logins per second and their latency")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--phone", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    # Fails early on wrong credentials
+    login(args.url, args.phone, args.password)
+
+    def send(conn: http.client.HTTPConnection, i: int) -> int:
+        return post_login(conn, args.phone, args.password)[0]
+
+    print(measure(args.url, send, args.requests, args.concurrency, args.warmup))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Queries and time of permission checks against the configured database::
+
+    python -m benchmarks.permissions add-item --checks 100000
+
+One user of every user type is checked in turn. The first check loads the
+reference cache; after that a check should run no query, and only the
+periodic reference version checks reach the database.
+"""
+import argparse
+import time
+from fastapi import HTTPException
+from sqlalchemy import event
+from app import models
+from app.core.permissions import has_permissions, require
+from app.db.session import SessionLocal, engine
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Count queries and time permission checks")
+    parser.add_argument("permission", nargs="?", default="add-item")
+    parser.add_argument("--checks", type=int, default=100000)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        users = [
+            db.query(models.User).filter(models.User.type_id == type_id).first()
+            for type_id, in db.query(models.UserType.id)
+        ]
+    users = [user for user in users if user is not None]
+    if not users:
+        print("No users to check")
+        return
+
+    check = require(args.permission)
+    # The first check loads the reference cache
+    allowed = {user.name: has_permissions(user, args.permission) for user in users}
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+    started = time.perf_counter()
+    for i in range(args.checks):
+        user = users[i % len(users)]
+        try:
+            check(user)
+        except HTTPException:
+            pass
+    elapsed = time.perf_counter() - started
+    # Reference version checks are per interval, not per check
+    version_checks = sum("reference_versions" in query for query in queries)
+    print(f"{args.permission}: {allowed}")
+    print(f"{args.checks} checks in {elapsed * 1000:.1f}ms ({elapsed / args.checks * 1e9:.0f}ns each), "
+          f"{len(queries) - version_checks} queries, {version_checks} reference version checks")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Latency of the religious document name search on large registers.
+
+Seeds ``--rows`` documents, spread over the four registers, into the
+configured database and times ``search_religious_documents`` for
+substring, typo and cross-script queries against ``--target-ms``. The
+database must be at ``alembic upgrade head`` so the pg_trgm and name_keys
+indexes exist::
+
+    python -m benchmarks.religious_search --rows 1000000
+
+Seeded rows have serial numbers starting with ``BENCH-`` and are deleted
+afterwards unless ``--keep`` is given; ``--no-seed`` reuses kept rows.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import argparse
+import csv
+import io
+import random
+import statistics
+import time
+from sqlalchemy import text
+from app.db.search import RELIGIOUS_DOCUMENTS, document_name_keys, search_fields, search_religious_documents
+from app.db.session import SessionLocal, engine
+
+SERIAL_PREFIX = "BENCH-"
+
+# (English, Amharic) spellings of common names
+NAMES = [
+    ("Tesfaye", "ተስፋዬ"), ("Abebe", "አበበ"), ("Mulugeta", "ሙሉጌታ"), ("Tsegaye", "ፀጋዬ"),
+    ("Yohannes", "ዮሐንስ"), ("Tewodros", "ቴዎድሮስ"), ("Almaz", "አልማዝ"), ("Meseret", "መሠረት"),
+    ("Selam", "ሰላም"), ("Birhanu", "ብርሃኑ"), ("Girma", "ግርማ"), ("Dereje", "ደረጄ"),
+    ("Ermias", "ኤርምያስ"), ("Henok", "ሄኖክ"), ("Dawit", "ዳዊት"), ("Marta", "ማርታ"),
+    ("Ruth", "ሩት"), ("Samuel", "ሳሙኤል"), ("Fikru", "ፍቅሩ"), ("Tadesse", "ታደሰ"),
+    ("Alemu", "አለሙ"), ("Bekele", "በቀለ"), ("Kebede", "ከበደ"), ("Getachew", "ጌታቸው"),
+    ("Hailu", "ኃይሉ"), ("Lemma", "ለማ"), ("Mekonnen", "መኮንን"), ("Negash", "ነጋሽ"),
+    ("Solomon", "ሰሎሞን"), ("Worku", "ወርቁ"), ("Yared", "ያሬድ"), ("Zewdu", "ዘውዱ"),
+    ("Aster", "አስቴር"), ("Tigist", "ትግስት"), ("Hiwot", "ሕይወት"), ("Mulu", "ሙሉ"),
+    ("Senait", "ሰናይት"), ("Tsion", "ጽዮን"), ("Bethlehem", "ቤተልሔም"), ("Hanna", "ሐና"),
+    ("Mikael", "ሚካኤል"), ("Gebre", "ገብሬ"), ("Wolde", "ወልደ"), ("Kidane", "ኪዳነ"),
+    ("Gebremariam", "ገብረማርያም"), ("Haile", "ኃይለ"), ("Teklu", "ተክሉ"), ("Asfaw", "አስፋው"),
+]
+
+# Label and query; typos, partial names and the other script must match too
+QUERIES = [
+    ("substring", "tesfaye"),
+    ("two words", "mulugeta bekele"),
+    ("partial", "gebrema"),
+    ("typo", "yohanes"),
+    ("phonetic", "tesfay"),
+    ("amharic", "ተስፋዬ"),
+    ("no match", "zzqxv"),
+]
+
+def name_columns(prefix: str = "") -> Dict[str, Tuple[str, str]]:
+    """A random (English, Amharic) name for each of the four name fields"""
+    return {
+        f"{prefix}name": random.choice(NAMES),
+        f"{prefix}christian_name": random.choice(NAMES),
+        f"{prefix}father_name": random.choice(NAMES),
+        f"{prefix}mother_name": random.choice(NAMES),
+    }
+
+def document_row(model, serial_number: str) -> Dict[str, Optional[str]]:
+    names = name_columns()
+    if model is RELIGIOUS_DOCUMENTS["marriage"]:
+        names.update(name_columns("bride_"))
+    row = {"serial_number": serial_number}
+    for field, (english, amharic) in names.items():
+        row[f"english_{field}"] = english
+        row[f"amharic_{field}"] = amharic
+    row["date_of_birth"] = datetime(1940, 1, 1) + timedelta(days=random.randrange(30000))
+    row["place_of_birth"] = "Addis Ababa"
+    row["name_keys"] = "{" + ",".join(document_name_keys(model, row)) + "}"
+    return row
+
+def seed(rows: int, batch_size: int = 50000) -> None:
+    """COPY ``rows`` documents, a quarter per register, then ANALYZE"""
+    per_table = rows // len(RELIGIOUS_DOCUMENTS)
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        for name, model in RELIGIOUS_DOCUMENTS.items():
+            columns = ["serial_number", *search_fields(model), "date_of_birth", "place_of_birth", "name_keys"]
+            for start in range(0, per_table, batch_size):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for i in range(start, min(start + batch_size, per_table)):
+                    row = document_row(model, f"{SERIAL_PREFIX}{name}-{i}")
+                    writer.writerow([row[column] for column in columns])
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            conn.commit()
+            cursor.execute(f"ANALYZE {model.__tablename__}")
+            conn.commit()
+    finally:
+        conn.close()
+
+def delete_seeded() -> None:
+    with engine.begin() as conn:
+        for model in RELIGIOUS_DOCUMENTS.values():
+            conn.execute(
+                text(f"DELETE FROM {model.__tablename__} WHERE serial_number LIKE :prefix"),
+                {"prefix": f"{SERIAL_PREFIX}%"},
+            )
+
+def time_query(query: str, repeat: int) -> Tuple[List[float], int]:
+    """Latencies in ms of ``repeat`` searches, after one warm-up, and the hit count"""
+    with SessionLocal() as db:
+        hits = len(search_religious_documents(db, query))
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            search_religious_documents(db, query)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return sorted(latencies), hits
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the religious document name search")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--target-ms", type=float, default=50.0)
+    parser.add_argument("--no-seed", action="store_true", help="search rows kept by an earlier --keep run")
+    parser.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the generated names")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar():
+            raise SystemExit("pg_trgm is not installed; run `alembic upgrade head` on a server that ships it")
+
+    if not args.no_seed:
+        random.seed(args.seed)
+        started = time.perf_counter()
+        seed(args.rows)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - started:.0f}s")
+    try:
+        for label, query in QUERIES:
+            latencies, hits = time_query(query, args.repeat)
+            p50 = statistics.median(latencies)
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            verdict = "ok" if p99 <= args.target_ms else "over target"
+            print(f"{label:<10} {query!r:<20} {hits:>3} hits  p50 {p50:.1f}ms  p99 {p99:.1f}ms  {verdict}")
+    finally:
+        if not args.no_seed and not args.keep:
+            delete_seeded()
+
+if __name__ == "__main__":
+    main()
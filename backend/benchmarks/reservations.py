@@ -0,0 +1,28 @@
+"""
+Time availability lookups against the configured database::
+
+    python -m benchmarks.reservations --from 2026-11-01 --days 31
+"""
+from datetime import date
+import argparse
+import timeit
+from app.db.reservations import availability
+from app.db.session import SessionLocal
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time availability lookups")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--type-id", type=int)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        result = availability(db, args.start, args.days, type_id=args.type_id)
+        booked = sum(1 for row in result for free in row["available"] if free < row["capacity"])
+        elapsed = timeit.timeit(lambda: availability(db, args.start, args.days, type_id=args.type_id),
+                                number=args.repeat) / args.repeat
+    print(f"{len(result)} items x {args.days} days ({booked} item-days booked): {elapsed * 1000:.1f}ms per lookup")
+
+if __name__ == "__main__":
+    main()
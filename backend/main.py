@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.core.audit import audit_writer
+from app.db.reference import reference_cache
+from app.db.overdue import overdue_job
 from fastapi.middleware.cors import CORSMiddleware
+import logging
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -20,10 +27,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+def start_audit_writer():
+    if settings.AUDIT_MODE != "sync":
+        audit_writer.start()
+
+@app.on_event("startup")
+def load_reference_cache():
+    try:
+        reference_cache.load()
+    except Exception:
+        # Loaded on first use instead
+        logger.exception("Could not load the reference cache")
+
+@app.on_event("startup")
+def start_overdue_job():
+    overdue_job.start()
+
+@app.on_event("shutdown")
+def stop_audit_writer():
+    audit_writer.stop()
+
+@app.on_event("shutdown")
+def stop_overdue_job():
+    overdue_job.stop()
+
 @app.get("/")
 def root():
     return {"message": "Welcome to Inventory Management System"} 
\ No newline at end of file
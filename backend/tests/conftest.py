@@ -0,0 +1,108 @@
+"""
+The tests run against a scratch PostgreSQL database named by
+``TEST_DATABASE_URL``, for example::
+
+    TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost/inventory_test python -m pytest
+
+Its tables are dropped and recreated. Without the variable the tests that
+need the database are skipped.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings requires these; the engine they describe is replaced below
+for name, value in {"POSTGRES_USER": "test", "POSTGRES_PASSWORD": "test", "POSTGRES_SERVER": "localhost",
+                    "POSTGRES_DB": "test", "POSTGRES_PORT": "5432"}.items():
+    os.environ.setdefault(name, value)
+
+from datetime import timedelta
+import pytest
+from sqlalchemy import create_engine, event, text
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+class QueryCounter:
+    """Statements executed on an engine while the counter is active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+@pytest.fixture(scope="session")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from app.db import session
+
+    engine = create_engine(TEST_DATABASE_URL, poolclass=session.InstrumentedQueuePool, pool_size=5, max_overflow=5)
+    # Rebound before the app is imported, so every module picks up this engine
+    session.engine = engine
+    session.SessionLocal.configure(bind=engine)
+    from app.db.base import Base
+    import app.models  # noqa: F401
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        # The religious document search uses pg_trgm operators (migration 9e4b6c1d3f25)
+        if conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="session")
+def app(engine):
+    import main
+    return main.app
+
+@pytest.fixture
+def db(engine):
+    from app.core.security import principal_cache
+    from app.db.reference import reference_cache
+    from app.db.base import Base
+
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    principal_cache.clear()
+    reference_cache.clear()
+    from app.db.session import SessionLocal
+    with SessionLocal() as db:
+        yield db
+
+@pytest.fixture
+def queries(engine):
+    """``with queries() as counted:`` records the statements run meanwhile"""
+    return lambda: QueryCounter(engine)
+
+@pytest.fixture
+def client(app, db):
+    from fastapi.testclient import TestClient
+    return TestClient(app)
+
+@pytest.fixture
+def admin(db):
+    """An admin user and the headers of a bearer token for them"""
+    from app import models
+    from app.core.security import create_access_token
+
+    user_type = models.UserType(name="Admin", roles=[models.Role(name="admin")])
+    user = models.User(name="Admin", phone_number="0911111111", hashed_password="-", user_type=user_type)
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": user.phone_number}, expires_delta=timedelta(minutes=5))
+    return user, {"Authorization": f"Bearer {token}"}
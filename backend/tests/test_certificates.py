@@ -0,0 +1,41 @@
+from datetime import datetime
+import io
+import zipfile
+
+import pytest
+
+from app import models
+
+@pytest.fixture
+def baptisms(db, admin):
+    user, _ = admin
+    documents = [
+        models.BaptismDocument(serial_number=f"BAP-{i}", english_name="Tesfaye Alemu", amharic_name="ተስፋዬ አለሙ",
+                               date_of_birth=datetime(1990, 1, 1), place_of_birth="Addis Ababa",
+                               baptism_date=datetime(1990, 3, i), priest_id=user.id)
+        for i in range(1, 4)
+    ]
+    db.add_all(documents)
+    db.commit()
+    return documents
+
+def test_certificate_of_one_document(client, admin, baptisms):
+    response = client.get(f"/api/v1/documents/certificates/baptism/{baptisms[0].id}", headers=admin[1])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert "baptism-BAP-1.pdf" in response.headers["content-disposition"]
+    assert response.content.startswith(b"%PDF")
+    assert client.get("/api/v1/documents/certificates/baptism/999", headers=admin[1]).status_code == 404
+
+def test_certificates_as_a_zip(client, admin, baptisms):
+    user, headers = admin
+    response = client.post("/api/v1/documents/certificates/",
+                           json={"kinds": ["baptism", "burial"], "priest_id": user.id}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.namelist() == ["baptism-BAP-1.pdf", "baptism-BAP-2.pdf", "baptism-BAP-3.pdf"]
+        assert all(archive.read(name).startswith(b"%PDF") for name in archive.namelist())
+
+def test_certificates_need_a_filter(client, admin):
+    assert client.post("/api/v1/documents/certificates/", json={"kinds": ["baptism"]}, headers=admin[1]).status_code == 400
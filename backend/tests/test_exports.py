@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from sqlalchemy import JSON, Column, DateTime, Integer, MetaData, String, Table, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app import models
+from app.api.export import encode_csv, encode_ndjson, encode_parquet, gzipped
+from app.core.security import create_access_token
+from app.models.models import TransactionStatus, transaction_status
+
+def headers_with(db, phone_number, *roles):
+    """Bearer headers of a new user whose type grants ``roles``"""
+    user_type = models.UserType(name=f"Type {phone_number}", roles=[models.Role(name=role) for role in roles])
+    user = models.User(name="Exporter", phone_number=phone_number, hashed_password="-", user_type=user_type)
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": phone_number}, expires_delta=timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+def test_export_requires_authentication(client):
+    assert client.get("/api/v1/export/items").status_code == 401
+
+@pytest.mark.parametrize("resource", ["items", "users", "audit_logs"])
+def test_export_requires_export_permission(client, db, resource):
+    headers = headers_with(db, "0922222222")
+    assert client.get(f"/api/v1/export/{resource}", headers=headers).status_code == 403
+
+def test_sensitive_exports_need_more_than_export_data(client, db):
+    headers = headers_with(db, "0922222222", "export-data")
+    assert client.get("/api/v1/export/items", headers=headers).status_code == 200
+    assert client.get("/api/v1/export/users", headers=headers).status_code == 403
+    assert client.get("/api/v1/export/audit_logs", headers=headers).status_code == 403
+
+def test_user_export_with_read_user(client, db):
+    headers = headers_with(db, "0922222222", "export-data", "read-user")
+    response = client.get("/api/v1/export/users", headers=headers)
+    assert response.status_code == 200
+    assert "hashed_password" not in response.text.splitlines()[0]
+    assert client.get("/api/v1/export/audit_logs", headers=headers).status_code == 403
+
+def test_admin_exports_audit_logs(client, admin):
+    assert client.get("/api/v1/export/audit_logs", headers=admin[1]).status_code == 200
+
+columns = Table(
+    "sample", MetaData(),
+    Column("id", Integer), Column("status", transaction_status), Column("changes", JSON),
+    Column("keys", ARRAY(String)), Column("taken", DateTime), Column("note", Text),
+).c
+rows = [
+    (1, TransactionStatus.pending, {"name": ["Abebe", "አበበ"]}, ["abb", "ቤ"], datetime(2026, 11, 1, 9, 30), "a, \"b\""),
+    (2, TransactionStatus.rejected, None, None, None, None),
+]
+
+def test_encode_csv_writes_structured_columns_as_json_text():
+    chunks = list(encode_csv(list(columns), [rows[:1], rows[1:]]))
+    assert len(chunks) == 3
+    assert list(csv.reader(io.StringIO(b"".join(chunks).decode()))) == [
+        ["id", "status", "changes", "keys", "taken", "note"],
+        ["1", "pending", '{"name": ["Abebe", "አበበ"]}', '["abb", "ቤ"]', "2026-11-01 09:30:00", 'a, "b"'],
+        ["2", "rejected", "", "", "", ""],
+    ]
+
+def test_encode_ndjson_writes_a_line_per_row():
+    body = b"".join(encode_ndjson(list(columns), [rows])).decode()
+    assert body.endswith("\n")
+    assert [json.loads(line) for line in body.splitlines()] == [
+        {"id": 1, "status": "pending", "changes": {"name": ["Abebe", "አበበ"]}, "keys": ["abb", "ቤ"],
+         "taken": "2026-11-01T09:30:00", "note": 'a, "b"'},
+        {"id": 2, "status": "rejected", "changes": None, "keys": None, "taken": None, "note": None},
+    ]
+
+def test_encode_parquet_round_trips():
+    pq = pytest.importorskip("pyarrow.parquet")
+    body = b"".join(encode_parquet(list(columns), [rows[:1], rows[1:], []]))
+    table = pq.read_table(io.BytesIO(body))
+    assert table.column_names == ["id", "status", "changes", "keys", "taken", "note"]
+    assert table.to_pylist() == [
+        {"id": 1, "status": "pending", "changes": '{"name": ["Abebe", "አበበ"]}', "keys": ["abb", "ቤ"],
+         "taken": datetime(2026, 11, 1, 9, 30), "note": 'a, "b"'},
+        {"id": 2, "status": "rejected", "changes": None, "keys": None, "taken": None, "note": None},
+    ]
+
+def test_gzipped_decompresses_to_the_input():
+    chunks = [b"id,name\n", b"1,a\n" * 1000, b"", b"2,b\n"]
+    assert gzip.decompress(b"".join(gzipped(chunks))) == b"".join(chunks)
+
+@pytest.fixture
+def loans(db):
+    db.add_all([
+        models.Transaction(quantity=2, date_taken=datetime(2026, 11, 1, 9), status=TransactionStatus.approved),
+        models.Transaction(quantity=1, description="Chairs, two", status=TransactionStatus.pending),
+    ])
+    db.commit()
+
+def test_export_csv(client, admin, loans):
+    response = client.get("/api/v1/export/transactions", headers=admin[1])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    exported = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["id"], row["quantity"], row["status"], row["description"]) for row in exported] == [
+        ("1", "2", "approved", ""), ("2", "1", "pending", "Chairs, two"),
+    ]
+
+def test_export_audit_log_changes_as_json_text(client, admin, db):
+    db.add(models.AuditLog(table_name="items", record_id=7, action="UPDATE", changes={"name": ["Old", "New"]}))
+    db.commit()
+    response = client.get("/api/v1/export/audit_logs", headers=admin[1])
+    [row] = [row for row in csv.DictReader(io.StringIO(response.text)) if row["record_id"] == "7"]
+    assert json.loads(row["changes"]) == {"name": ["Old", "New"]}
+
+def test_export_gzipped_ndjson(client, admin, loans):
+    response = client.get("/api/v1/export/transactions", params={"format": "ndjson", "gzip": True},
+                          headers=admin[1])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="transactions.ndjson.gz"' in response.headers["content-disposition"]
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert [(row["id"], row["status"], row["date_taken"]) for row in map(json.loads, lines)] == [
+        (1, "approved", "2026-11-01T09:00:00"), (2, "pending", None),
+    ]
+
+def test_export_parquet(client, admin, loans):
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = client.get("/api/v1/export/transactions", params={"format": "parquet"}, headers=admin[1])
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("status").to_pylist() == ["approved", "pending"]
+    assert table.column("date_taken").to_pylist() == [datetime(2026, 11, 1, 9), None]
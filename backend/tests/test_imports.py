@@ -0,0 +1,42 @@
+from sqlalchemy import select
+
+from app import models
+from app.core.config import settings
+from app.db.importer import create_job, run_import
+
+HEADER = (
+    "Serial number,Amharic name,Amharic christian name,Amharic father name,Amharic mother name,"
+    "Date of birth,Place of birth,Baptism date,Baptism place,God parent,"
+    "Amharic witness name 1,Amharic witness name 2,Address witness 1,Address witness 2"
+)
+ROW = "{serial},{name},ሚካኤል,አለሙ,አልማዝ,1990-01-01,Addis Ababa,1990-03-01,Ledeta,ከበደ,ሰላም,ማርታ,AA,AA"
+CSV = "\n".join([
+    HEADER,
+    ROW.format(serial="BAP-1", name="ተስፋዬ"),
+    ROW.format(serial="BAP-1", name="አበበ"),
+    ROW.format(serial="", name="ሙሉጌታ"),
+]) + "\n"
+
+def test_imports_require_authentication(client):
+    assert client.get("/api/v1/imports/1").status_code == 401
+
+def test_imported_documents_are_audited_as_the_job_creator(engine, db, admin, tmp_path, monkeypatch):
+    user, _ = admin
+    monkeypatch.setattr(settings, "AUDIT_MODE", "sync")
+    path = tmp_path / "baptisms.csv"
+    path.write_text(CSV, encoding="utf-8")
+    job = create_job(db, "baptism", path.name, str(path), {"amharic_god_parent_name": "God parent"}, user.id)
+
+    job = run_import(job.id, workers=1)
+
+    assert (job.status, job.message, job.imported_rows, job.failed_rows) == ("done", None, 2, 1)
+    audit_logs = models.AuditLog.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(audit_logs).where(audit_logs.c.table_name == "baptism_documents").order_by(audit_logs.c.record_id)
+        ).mappings().all()
+    assert [(row["record_id"], row["action"], row["user_id"]) for row in rows] == [
+        (1, "CREATE", user.id),
+        (2, "CREATE", user.id),
+    ]
+    assert rows[0]["changes"] == {"import_job": job.id, "serial_number": "BAP-1"}
@@ -0,0 +1,29 @@
+import pytest
+
+from app import models
+from app.core.permissions import type_permissions
+from app.db.reference import reference_cache, reference_changed
+
+@pytest.fixture
+def cache(db, monkeypatch):
+    monkeypatch.setattr(reference_cache, "check_interval", 3600)
+    reference_cache.load()
+    return reference_cache
+
+def test_unknown_type_is_cached_as_no_permissions(cache, queries):
+    with queries() as first:
+        assert type_permissions(999) == frozenset()
+    misses = cache.misses
+    with queries() as second:
+        for _ in range(100):
+            assert type_permissions(999) == frozenset()
+    assert first.count <= 2
+    assert second.count == 0
+    assert cache.misses == misses
+
+def test_unknown_type_is_forgotten_when_user_types_change(cache, db):
+    assert type_permissions(1) == frozenset()
+    db.add(models.UserType(name="Head", roles=[models.Role(name="add-item")]))
+    reference_changed(db, "user_types")
+    db.commit()
+    assert type_permissions(1) == frozenset({"add-item"})
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import models
+from app.db.persons import resolve_persons
+
+BIRTH = datetime(1980, 5, 1)
+
+def names(**extra):
+    return dict(
+        english_name="Tesfaye", english_father_name="Alemu", english_christian_name="Gebremariam",
+        english_mother_name="Almaz", date_of_birth=BIRTH, place_of_birth="Addis Ababa", **extra
+    )
+
+def persons_by_document(engine):
+    with engine.connect() as conn:
+        table = models.PersonDocument.__table__
+        return {(row.kind, row.document_id): row.person_id for row in conn.execute(select(table))}
+
+def test_membership_does_not_bridge_two_baptisms(engine, db):
+    # Each baptism matches the membership record, but no person is baptized twice
+    db.add_all([
+        models.BaptismDocument(serial_number="BAP-1", **names()),
+        models.MembershipDocument(serial_number="MEM-1", **names()),
+        models.BaptismDocument(serial_number="BAP-2", **names()),
+    ])
+    db.commit()
+    with engine.begin() as conn:
+        stats = resolve_persons(conn, full=True, workers=1)
+
+    linked = persons_by_document(engine)
+    assert linked[("baptism", 1)] != linked[("baptism", 2)]
+    assert linked[("membership", 1)] in {linked[("baptism", 1)], linked[("baptism", 2)]}
+    assert stats["new_persons"] == 2
+    assert stats["conflicts"] == 1
+
+def test_new_mention_does_not_give_a_person_a_second_burial(engine, db):
+    db.add_all([
+        models.BurialDocument(serial_number="BUR-1", burial_date=datetime(2020, 1, 1), **names()),
+        models.MembershipDocument(serial_number="MEM-1", **names()),
+    ])
+    db.commit()
+    with engine.begin() as conn:
+        resolve_persons(conn, full=True, workers=1)
+    db.add(models.BurialDocument(serial_number="BUR-2", burial_date=datetime(2021, 1, 1), **names()))
+    db.commit()
+    with engine.begin() as conn:
+        stats = resolve_persons(conn, workers=1)
+
+    linked = persons_by_document(engine)
+    assert linked[("membership", 1)] == linked[("burial", 1)]
+    assert linked[("burial", 2)] != linked[("burial", 1)]
+    assert stats["merged_persons"] == 0
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from app import models
+from app.db.reference import reference_cache, reference_changed
+
+@pytest.fixture
+def cache(db, monkeypatch):
+    monkeypatch.setattr(reference_cache, "check_interval", 3600)
+    reference_cache.load()
+    return reference_cache
+
+def test_misses_reload_a_table_once_per_interval(cache, queries):
+    with queries() as first:
+        assert cache.get("roles", 999) is None
+    with queries() as second:
+        assert cache.get("roles", 999) is None
+        assert cache.find("roles", "missing") is None
+    assert first.count == 2  # versions and rows
+    assert second.count == 0
+
+def test_miss_finds_a_row_added_elsewhere(cache, db):
+    db.add(models.Role(name="add-item"))
+    db.commit()  # without reference_changed, as another worker would look
+    assert cache.find("roles", "add-item")["name"] == "add-item"
+
+def test_rolled_back_change_does_not_invalidate(cache, db):
+    invalidations = cache.invalidations
+    reference_changed(db, "roles")
+    db.rollback()
+    db.add(models.Role(name="add-item"))
+    db.commit()
+    assert cache.invalidations == invalidations
+    assert "reference_changes" not in db.info
+
+def test_committed_change_invalidates(cache, db):
+    db.add(models.Role(name="add-item"))
+    reference_changed(db, "roles")
+    db.commit()
+    assert [row["name"] for row in cache.rows("roles")] == ["add-item"]
+
+def test_reload_does_not_block_other_tables(cache, monkeypatch):
+    reading, release = threading.Event(), threading.Event()
+    read = cache._read
+
+    def slow_read(db, table, version):
+        if table == "roles":
+            reading.set()
+            release.wait(5)
+        return read(db, table, version)
+
+    monkeypatch.setattr(cache, "_read", slow_read)
+    cache.invalidate("roles")
+    loader = threading.Thread(target=cache.snapshot, args=("roles",))
+    loader.start()
+    try:
+        assert reading.wait(5)
+        # Served while the roles reload is still waiting on the database
+        cache.invalidate("item_types")
+        assert cache.snapshot("item_types").rows == []
+        assert cache.snapshot("user_types").rows == []
+    finally:
+        release.set()
+        loader.join()
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import models
+from app.db.search import RELIGIOUS_DOCUMENTS, backfill_name_keys
+
+@pytest.fixture
+def registers(engine, db, admin):
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar():
+            pytest.skip("pg_trgm is not installed on the test server")
+    user, _ = admin
+    common = dict(place_of_birth="Addis Ababa", date_of_birth=datetime(1990, 1, 1), recorded_by_id=user.id)
+    db.add_all([
+        models.MembershipDocument(serial_number="MEM-1", english_name="Tesfaye Alemu", **common),
+        models.BaptismDocument(serial_number="BAP-1", amharic_name="ተስፋዬ", baptism_date=datetime(1990, 3, 1), **common),
+        models.BurialDocument(serial_number="BUR-1", english_name="Mulugeta Bekele", burial_date=datetime(2020, 1, 1), **common),
+    ])
+    db.commit()
+
+@pytest.mark.parametrize("q", [" ", "   ", "\t"])
+def test_blank_query_is_rejected(client, admin, q):
+    response = client.get("/api/v1/documents/religious/search", params={"q": q}, headers=admin[1])
+    assert response.status_code == 400
+
+def test_query_is_stripped(client, admin, registers):
+    response = client.get("/api/v1/documents/religious/search", params={"q": "  tesfay  "}, headers=admin[1])
+    assert response.status_code == 200
+    assert {(row["kind"], row["serial_number"]) for row in response.json()} == {
+        ("membership", "MEM-1"),
+        ("baptism", "BAP-1"),
+    }
+
+def test_backfill_recomputes_stale_name_keys(engine, db, admin):
+    user, _ = admin
+    document = models.MembershipDocument(serial_number="MEM-2", english_name="Tesfaye", amharic_name="ተስፋዬ",
+                                         place_of_birth="Addis Ababa", date_of_birth=datetime(1990, 1, 1))
+    db.add(document)
+    db.commit()
+    current = document.name_keys
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE membership_documents SET name_keys = '{stale}'"))
+        assert backfill_name_keys(conn, batch_size=1) == 1
+    db.expire_all()
+    assert db.get(models.MembershipDocument, document.id).name_keys == current
+
+def test_name_keys_index_is_declared(engine):
+    with engine.connect() as conn:
+        indexes = set(conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE indexname LIKE '%name_keys' AND indexdef LIKE '%USING gin%'"
+        )).scalars())
+    assert indexes == {f"ix_{model.__tablename__}_name_keys" for model in RELIGIOUS_DOCUMENTS.values()}
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+import pytest
+
+from app import models
+from app.core.security import create_access_token
+from app.db.reservations import window_peaks
+
+def at(day: int, hour: int = 0) -> datetime:
+    return datetime(2026, 11, day, hour)
+
+def booking(start: datetime, end: datetime, quantity: int):
+    return [(start, quantity), (end, -quantity)]
+
+def test_window_peaks_without_bookings():
+    assert window_peaks([], [at(1), at(2), at(3)]) == [0, 0]
+
+def test_back_to_back_bookings_dont_add_up():
+    events = booking(at(1, 9), at(1, 12), 3) + booking(at(1, 12), at(1, 15), 4)
+    assert window_peaks(events, [at(1), at(2)]) == [4]
+
+def test_overlapping_bookings_add_up():
+    events = booking(at(1, 9), at(1, 12), 3) + booking(at(1, 11), at(1, 15), 4)
+    assert window_peaks(events, [at(1), at(2)]) == [7]
+
+def test_window_peaks_per_window():
+    events = (booking(at(1, 9), at(3, 9), 2)     # days 1-3
+              + booking(at(2), at(3), 5)         # exactly day 2
+              + booking(at(3), at(4, 6), 1)      # starts as day 2 ends
+              + booking(at(6, 23), at(8), 4))    # after the last window
+    assert window_peaks(events, [at(day) for day in range(1, 6)]) == [2, 7, 3, 1]
+
+def test_booking_ending_at_a_window_start_is_not_counted():
+    events = booking(at(1, 9), at(2), 6) + booking(at(2, 10), at(2, 11), 1)
+    assert window_peaks(events, [at(1), at(2), at(3)]) == [6, 1]
+
+def test_booking_started_before_the_first_window():
+    events = booking(at(1), at(5), 3)
+    assert window_peaks(events, [at(2), at(3)]) == [3]
+
+@pytest.fixture
+def chairs(db):
+    item = models.Item(name="Chair", serial_number="CHA-1", quantity=4, checked_out=1)
+    db.add(item)
+    db.commit()
+    return item
+
+def reserve(client, headers, item, quantity, start, end, **extra):
+    body = {"item_id": item.id, "quantity": quantity, "start": start, "end": end, **extra}
+    return client.post("/api/v1/reservations/", json=body, headers=headers)
+
+def test_overbooked_overlap_is_refused(client, admin, chairs):
+    user, headers = admin
+    assert reserve(client, headers, chairs, 3, "2026-11-01T09:00:00", "2026-11-01T12:00:00").status_code == 200
+    # Capacity is 5 (4 on hand, 1 checked out), 3 of them booked until noon
+    refused = reserve(client, headers, chairs, 3, "2026-11-01T11:00:00", "2026-11-01T13:00:00")
+    assert refused.status_code == 409
+    assert "Only 2 of item" in refused.json()["detail"]
+    assert reserve(client, headers, chairs, 2, "2026-11-01T11:00:00", "2026-11-01T13:00:00").status_code == 200
+    # Starts as the first one ends, so only the second one overlaps
+    assert reserve(client, headers, chairs, 3, "2026-11-01T12:00:00", "2026-11-01T13:00:00").status_code == 200
+
+def test_rejected_reservations_hold_no_stock(client, admin, chairs):
+    user, headers = admin
+    created = reserve(client, headers, chairs, 5, "2026-11-01T09:00:00", "2026-11-01T12:00:00")
+    assert reserve(client, headers, chairs, 1, "2026-11-01T10:00:00", "2026-11-01T11:00:00").status_code == 409
+    body = {"item_id": chairs.id, "quantity": 5, "start": "2026-11-01T09:00:00", "end": "2026-11-01T12:00:00",
+            "status": "rejected"}
+    assert client.put(f"/api/v1/reservations/{created.json()['id']}", json=body, headers=headers).status_code == 200
+    assert reserve(client, headers, chairs, 5, "2026-11-01T10:00:00", "2026-11-01T11:00:00").status_code == 200
+    # Rejected ones are stored without a check
+    assert reserve(client, headers, chairs, 9, "2026-11-01T10:00:00", "2026-11-01T11:00:00",
+                   status="rejected").status_code == 200
+
+def test_availability_per_day(client, admin, db, chairs):
+    user, headers = admin
+    tables = models.Item(name="Table", serial_number="TAB-1", quantity=2)
+    db.add(tables)
+    db.commit()
+    reserve(client, headers, chairs, 2, "2026-11-01T09:00:00", "2026-11-03T09:00:00")
+    reserve(client, headers, chairs, 3, "2026-11-02T00:00:00", "2026-11-03T00:00:00")
+    reserve(client, headers, chairs, 1, "2026-11-03T00:00:00", "2026-11-03T06:00:00")
+    reserve(client, headers, tables, 2, "2026-11-04T10:00:00", "2026-11-04T11:00:00")
+    reserve(client, headers, chairs, 5, "2026-11-04T00:00:00", "2026-11-05T00:00:00", status="rejected")
+
+    response = client.get("/api/v1/reservations/availability",
+                          params={"from": "2026-11-01", "days": 5}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["days"] == 5
+    assert [(row["name"], row["capacity"], row["available"]) for row in response.json()["items"]] == [
+        ("Chair", 5, [3, 0, 2, 5, 5]),
+        ("Table", 2, [2, 2, 2, 0, 2]),
+    ]
+
+    one_item = client.get("/api/v1/reservations/availability",
+                          params={"from": "2026-11-02", "days": 2, "item_id": tables.id}, headers=headers)
+    assert [row["available"] for row in one_item.json()["items"]] == [[2, 2]]
+
+def test_update_keeps_the_requester(client, db, admin):
+    requester, headers = admin
+    item = models.Item(name="Chair", serial_number="CHA-1", quantity=5)
+    editor = models.User(name="Editor", phone_number="0922222222", hashed_password="-",
+                         user_type=requester.user_type)
+    db.add_all([item, editor])
+    db.commit()
+    editor_headers = {"Authorization": "Bearer " + create_access_token(
+        {"sub": editor.phone_number}, expires_delta=timedelta(minutes=5))}
+    body = {"item_id": item.id, "quantity": 2, "start": "2026-11-01T09:00:00", "end": "2026-11-01T12:00:00"}
+
+    created = client.post("/api/v1/reservations/", json=body, headers=headers)
+    assert created.status_code == 200
+    assert created.json()["requested_by_id"] == requester.id
+
+    updated = client.put(f"/api/v1/reservations/{created.json()['id']}", json=dict(body, quantity=3),
+                         headers=editor_headers)
+    assert updated.status_code == 200
+    assert (updated.json()["quantity"], updated.json()["requested_by_id"]) == (3, requester.id)
+
+    reassigned = client.put(f"/api/v1/reservations/{created.json()['id']}",
+                            json=dict(body, requested_by_id=editor.id), headers=editor_headers)
+    assert reassigned.json()["requested_by_id"] == editor.id
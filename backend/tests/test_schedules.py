@@ -0,0 +1,104 @@
+from datetime import datetime, time
+import pytest
+
+from app import models
+
+def test_schedules_require_authentication(client):
+    assert client.get("/api/v1/schedules/").status_code == 401
+    assert client.get("/api/v1/schedules/calendar").status_code == 401
+
+@pytest.fixture
+def roster(db, admin):
+    """Schedules of two users on a few days of November and December 2026"""
+    admin_user, _ = admin
+    kebede = models.User(name="Kebede", phone_number="0922222222", hashed_password="-", user_type=admin_user.user_type)
+    morning = models.Shift(name="Morning", start_time=time(8), end_time=time(12))
+    service, cleaning = models.ScheduleType(name="Service"), models.ScheduleType(name="Cleaning")
+    slots = [
+        (admin_user, service, datetime(2026, 11, 2, 9)),     # Monday
+        (admin_user, service, datetime(2026, 11, 2, 14)),
+        (kebede, cleaning, datetime(2026, 11, 2, 10)),
+        (admin_user, service, datetime(2026, 11, 8, 9)),     # Sunday
+        (kebede, service, datetime(2026, 11, 9, 9)),    # next Monday
+        (admin_user, service, datetime(2026, 11, 30, 9)),
+        (admin_user, cleaning, datetime(2026, 12, 1, 9)),
+    ]
+    db.add_all(models.Schedule(user=user, schedule_type=kind, shift=morning, date=when) for user, kind, when in slots)
+    db.commit()
+    return admin_user, kebede, service, cleaning
+
+def read_calendar(client, headers, **params):
+    response = client.get("/api/v1/schedules/calendar", params=params, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+def layout(calendar) -> list:
+    """(start, end, [(day, [(user, hour)])]) of each period"""
+    return [
+        (period["start"], period["end"], [
+            (day["date"], [(entry["user"]["name"], entry["date"][11:13]) for entry in day["schedules"]])
+            for day in period["days"]
+        ])
+        for period in calendar["periods"]
+    ]
+
+def test_week_view_starts_periods_on_monday(client, admin, roster):
+    calendar = read_calendar(client, admin[1], **{"from": "2026-11-04", "to": "2026-11-16", "view": "week"})
+    assert (calendar["start"], calendar["end"]) == ("2026-11-04", "2026-11-16")
+    assert layout(calendar) == [
+        ("2026-11-04", "2026-11-09", [("2026-11-08", [("Admin", "09")])]),
+        ("2026-11-09", "2026-11-16", [("2026-11-09", [("Kebede", "09")])]),
+    ]
+
+def test_week_view_buckets_schedules_by_day(client, admin, roster):
+    calendar = read_calendar(client, admin[1], **{"from": "2026-11-02", "view": "week"})
+    assert layout(calendar) == [
+        ("2026-11-02", "2026-11-09", [
+            ("2026-11-02", [("Admin", "09"), ("Kebede", "10"), ("Admin", "14")]),
+            ("2026-11-08", [("Admin", "09")]),
+        ]),
+    ]
+    entry = calendar["periods"][0]["days"][0]["schedules"][0]
+    assert (entry["shift"]["name"], entry["schedule_type"]["name"]) == ("Morning", "Service")
+
+def test_month_view_periods(client, admin, roster):
+    calendar = read_calendar(client, admin[1], **{"from": "2026-11-15", "to": "2026-12-15", "view": "month"})
+    assert layout(calendar) == [
+        ("2026-11-15", "2026-12-01", [("2026-11-30", [("Admin", "09")])]),
+        ("2026-12-01", "2026-12-15", [("2026-12-01", [("Admin", "09")])]),
+    ]
+    whole_month = read_calendar(client, admin[1], **{"from": "2026-11-15", "view": "month"})
+    assert (whole_month["start"], whole_month["end"]) == ("2026-11-15", "2026-12-01")
+
+def test_day_view_has_a_period_per_day(client, admin, roster):
+    calendar = read_calendar(client, admin[1], **{"from": "2026-11-02", "to": "2026-11-04", "view": "day"})
+    assert [(start, end, len(days)) for start, end, days in layout(calendar)] == [
+        ("2026-11-02", "2026-11-03", 1),
+        ("2026-11-03", "2026-11-04", 0),
+    ]
+
+def test_calendar_for_a_user(client, admin, roster):
+    admin_user, kebede, service, cleaning = roster
+    calendar = read_calendar(client, admin[1], **{"from": "2026-11-01", "to": "2026-12-01", "view": "month",
+                                                  "user_id": kebede.id})
+    assert layout(calendar) == [
+        ("2026-11-01", "2026-12-01", [("2026-11-02", [("Kebede", "10")]), ("2026-11-09", [("Kebede", "09")])]),
+    ]
+
+def test_calendar_for_a_schedule_type(client, admin, roster):
+    admin_user, kebede, service, cleaning = roster
+    calendar = read_calendar(client, admin[1], **{"from": "2026-11-01", "to": "2027-01-01", "view": "month",
+                                                  "type_id": cleaning.id})
+    assert [day for start, end, days in layout(calendar) for day in days] == [
+        ("2026-11-02", [("Kebede", "10")]),
+        ("2026-12-01", [("Admin", "09")]),
+    ]
+
+@pytest.mark.parametrize("params", [
+    {"from": "2026-11-02", "to": "2026-11-02"},
+    {"from": "2026-11-02", "to": "2026-11-01"},
+    {"from": "2026-01-01", "to": "2027-01-03"},
+])
+def test_invalid_ranges_are_refused(client, admin, params):
+    response = client.get("/api/v1/schedules/calendar", params=params, headers=admin[1])
+    assert response.status_code == 400
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+from sqlalchemy import event, select
+
+from app import models
+from app.core.config import settings
+from app.db import serials
+from app.db.session import SessionLocal
+
+THREADS = 8
+ROUNDS = 30
+
+def allocate(thread: int):
+    """Serials of the committed rounds of one thread; every fourth round rolls back"""
+    committed = []
+    with SessionLocal() as db:
+        for i in range(ROUNDS):
+            # As in a request, the session already holds its connection
+            db.execute(select(1))
+            numbers = serials.allocate_serials(db, "CON", 1 + (thread + i) % 3)
+            if (thread + i) % 4 == 0:
+                db.rollback()
+            else:
+                db.commit()
+                committed.extend(numbers)
+    return committed
+
+@pytest.mark.parametrize("block_size", [1, 10])
+def test_concurrent_serials_never_collide(db, engine, monkeypatch, block_size):
+    monkeypatch.setattr(settings, "SERIAL_BLOCK_SIZE", block_size)
+    monkeypatch.setattr(serials, "_blocks", {})
+    held = defaultdict(int)
+    peak = defaultdict(int)
+
+    def checkout(*args):
+        thread = threading.get_ident()
+        held[thread] += 1
+        peak[thread] = max(peak[thread], held[thread])
+
+    def checkin(*args):
+        held[threading.get_ident()] -= 1
+
+    event.listen(engine.pool, "checkout", checkout)
+    event.listen(engine.pool, "checkin", checkin)
+    try:
+        with ThreadPoolExecutor(THREADS) as pool:
+            allocated = [serial for result in pool.map(allocate, range(THREADS)) for serial in result]
+    finally:
+        event.remove(engine.pool, "checkout", checkout)
+        event.remove(engine.pool, "checkin", checkin)
+
+    assert len(allocated) == len(set(allocated))
+    counter = db.execute(select(models.SerialCounter.value)).scalar_one()
+    assert max(int(serial.rsplit("-", 1)[1]) for serial in allocated) <= counter
+    if block_size == 1:
+        # Rolled-back rounds give their numbers back
+        assert counter == len(allocated)
+    # Blocks are reserved on the caller's connection, never on a second one
+    assert set(peak.values()) == {1}
+
+def test_rolled_back_block_is_not_handed_out(db, monkeypatch):
+    monkeypatch.setattr(settings, "SERIAL_BLOCK_SIZE", 10)
+    monkeypatch.setattr(serials, "_blocks", {})
+    assert serials.next_numbers(db, "ROL", 2, 2026) == [1, 2]
+    db.rollback()
+    # The block is gone with the transaction, so the next one starts over
+    assert serials.next_numbers(db, "ROL", 1, 2026) == [1]
+    db.commit()
+    assert serials.next_numbers(db, "ROL", 1, 2026) == [2]
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import event
+
+from app import models
+
+class PoolUsage:
+    """Connections checked out of the pool, and the most held at once"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.held = 0
+        self.peak = 0
+
+    def checkout(self, *args):
+        self.checkouts += 1
+        self.held += 1
+        self.peak = max(self.peak, self.held)
+
+    def checkin(self, *args):
+        self.held -= 1
+
+@pytest.fixture
+def pool_usage(engine, monkeypatch):
+    """Pool usage of a call, with the reference cache kept warm"""
+    from app.db.reference import reference_cache
+
+    monkeypatch.setattr(reference_cache, "check_interval", 3600)
+
+    def measure(call):
+        usage = PoolUsage()
+        event.listen(engine.pool, "checkout", usage.checkout)
+        event.listen(engine.pool, "checkin", usage.checkin)
+        try:
+            response = call()
+        finally:
+            event.remove(engine.pool, "checkout", usage.checkout)
+            event.remove(engine.pool, "checkin", usage.checkin)
+        return response, usage
+    return measure
+
+def test_get_db_and_auth_share_one_connection(client, admin, pool_usage):
+    _, headers = admin
+    # The first request loads the user through the request session, the
+    # second finds it in the principal cache
+    for _ in range(2):
+        response, usage = pool_usage(lambda: client.get("/api/v1/auth/me", headers=headers))
+        assert response.status_code == 200
+        assert usage.checkouts == 1
+
+def test_get_db_user_holds_one_connection(client, admin, db, pool_usage):
+    _, headers = admin
+    db.add(models.ItemType(name="Chair"))
+    db.commit()
+    item = {"name": "Chair", "quantity": 3, "type_id": 1}
+    client.post("/api/v1/items/", json=item, headers=headers)
+
+    response, usage = pool_usage(lambda: client.post("/api/v1/items/", json=item, headers=headers))
+    assert response.status_code == 200, response.text
+    # Committing returns the connection; refreshing the item takes it again
+    assert usage.peak == 1
+    assert usage.checkouts <= 2
+
+    response, usage = pool_usage(lambda: client.get(f"/api/v1/items/{response.json()['id']}", headers=headers))
+    assert response.status_code == 200
+    assert usage.checkouts == 1
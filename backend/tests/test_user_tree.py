@@ -0,0 +1,66 @@
+import itertools
+import pytest
+
+from app import models
+from app.core.config import settings
+
+phone_numbers = itertools.count()
+
+def add_tree(db, user_type, roots: int, fanout: int, levels: int):
+    """``roots`` kristna abat, each with ``fanout`` children per level below"""
+    parents = [models.User(name="Abat", phone_number=f"0930{next(phone_numbers):06d}", hashed_password="-",
+                           user_type=user_type) for _ in range(roots)]
+    db.add_all(parents)
+    for _ in range(levels):
+        children = [
+            models.User(name="Child", phone_number=f"0930{next(phone_numbers):06d}", hashed_password="-",
+                        user_type=user_type, kristna_abat=parent)
+            for parent in parents for _ in range(fanout)
+        ]
+        db.add_all(children)
+        parents = children
+    db.commit()
+
+def selectin_queries(depth: int) -> int:
+    """Statements user_load_options issues: user_type and roles per level,
+    plus abat and children at each level above the cap"""
+    if depth == 0:
+        return 2
+    return 2 + 2 * (1 + selectin_queries(depth - 1))
+
+def nesting(user: dict) -> int:
+    below = [user["kristna_abat"]] if user["kristna_abat"] else []
+    below += user["kristna_children"]
+    return 1 + max((nesting(child) for child in below), default=0)
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_user_list_queries_depend_on_depth_only(client, admin, db, queries, monkeypatch, depth):
+    user, headers = admin
+    monkeypatch.setattr(settings, "USER_TREE_DEPTH", depth)
+    client.get("/api/v1/users/?limit=1", headers=headers)  # warms the principal cache
+
+    counts = []
+    # selectinload sends up to 500 keys per IN list, so both trees stay below
+    for roots, fanout in [(2, 2), (3, 3)]:
+        add_tree(db, user.user_type, roots, fanout, levels=depth + 1)
+        with queries() as counted:
+            response = client.get("/api/v1/users/?limit=1000", headers=headers)
+        assert response.status_code == 200
+        counts.append(counted.count)
+        assert max(nesting(row) for row in response.json()) == depth + 1
+
+    assert counts[0] == counts[1]
+    # The page query, then the selectin loads
+    assert counts[1] <= 1 + selectin_queries(depth)
+
+def test_user_detail_queries_bounded(client, admin, db, queries, monkeypatch):
+    user, headers = admin
+    monkeypatch.setattr(settings, "USER_TREE_DEPTH", 2)
+    add_tree(db, user.user_type, roots=1, fanout=6, levels=3)
+    client.get(f"/api/v1/users/{user.id}", headers=headers)
+
+    with queries() as counted:
+        response = client.get("/api/v1/users/2", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["kristna_children"]) == 6
+    assert counted.count <= 1 + selectin_queries(2)
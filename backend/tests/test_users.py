@@ -0,0 +1,48 @@
+from datetime import timedelta
+import pytest
+
+from app import models
+from app.core.security import create_access_token
+
+@pytest.fixture
+def member(db):
+    """A user whose type grants no roles and the headers of their token"""
+    user = models.User(name="Member", phone_number="0922222222", hashed_password="-",
+                       user_type=models.UserType(name="Member"))
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": user.phone_number}, expires_delta=timedelta(minutes=5))
+    return user, {"Authorization": f"Bearer {token}"}
+
+def profile(user, **changes) -> dict:
+    body = {"name": user.name, "phone_number": user.phone_number, "type_id": user.type_id, "password": ""}
+    return {**body, **changes}
+
+def test_member_cannot_change_their_own_type(client, admin, member, db):
+    admin_user, _ = admin
+    user, headers = member
+    response = client.put(f"/api/v1/users/{user.id}", json=profile(user, type_id=admin_user.type_id), headers=headers)
+    assert response.status_code == 403
+    db.expire_all()
+    assert db.get(models.User, user.id).type_id != admin_user.type_id
+
+def test_member_can_edit_their_own_profile(client, member):
+    user, headers = member
+    response = client.put(f"/api/v1/users/{user.id}", json=profile(user, name="Renamed"), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+
+def test_member_cannot_edit_or_create_other_users(client, admin, member):
+    admin_user, _ = admin
+    user, headers = member
+    response = client.put(f"/api/v1/users/{admin_user.id}", json=profile(admin_user, name="Renamed"), headers=headers)
+    assert response.status_code == 403
+    new_user = {"name": "New", "phone_number": "0933333333", "type_id": admin_user.type_id, "password": "secret"}
+    assert client.post("/api/v1/users/", json=new_user, headers=headers).status_code == 403
+
+def test_admin_can_change_a_users_type(client, admin, member):
+    admin_user, headers = admin
+    user, _ = member
+    response = client.put(f"/api/v1/users/{user.id}", json=profile(user, type_id=admin_user.type_id), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["type_id"] == admin_user.type_id
@@ -10,6 +10,7 @@ import { ScrollArea } from "../ui/scroll-area";
 import { Badge } from "../ui/badge";
 import { Card, CardContent } from "../ui/card";
 import { Avatar, AvatarImage, AvatarFallback } from "../ui/avatar";
+import { profilePictureUrl } from '../../services/api';
 
 interface ProfileViewProps {
   user: User | null;
@@ -38,7 +39,7 @@ export const ProfileView: React.FC<ProfileViewProps> = ({
           <div className="space-y-6">
             <div className="flex justify-center">
               <Avatar className="w-32 h-32">
-                <AvatarImage src={user.profile_picture} />
+                <AvatarImage src={profilePictureUrl(user.profile_picture, false)} />
                 <AvatarFallback className="text-2xl">{user.name.charAt(0)}</AvatarFallback>
               </Avatar>
             </div>
@@ -4,6 +4,7 @@ import { FormField } from '../ui/form-field';
 import { Button } from '../ui/button';
 import { Eye, EyeOff, Upload } from 'lucide-react';
 import { Avatar, AvatarImage, AvatarFallback } from '../ui/avatar';
+import { profilePictureUrl } from '../../services/api';
 
 interface UserFormProps {
   initialData?: Partial<User>;
@@ -31,7 +32,7 @@ export const UserForm: React.FC<UserFormProps> = ({
   const [showPassword, setShowPassword] = useState(false);
   const [showConfirmPassword, setShowConfirmPassword] = useState(false);
   const [profilePreview, setProfilePreview] = useState<string | null>(
-    initialData?.profile_picture || null
+    profilePictureUrl(initialData?.profile_picture) || null
   );
   const fileInputRef = useRef<HTMLInputElement>(null);
 
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { User, UserType } from '../../types/user';
 import { userService } from '../../services/userService';
+import { profilePictureUrl } from '../../services/api';
 import { Alert, AlertDescription } from '../ui/alert';
 import {
   Table,
@@ -157,7 +158,7 @@ export const UserList: React.FC<UserListProps> = ({ users, userTypes, onUserUpda
                 onClick={() => handleUserClick(user)}
                 >
                   <Avatar className="w-10 h-10">
-                    <AvatarImage src={user.profile_picture} />
+                    <AvatarImage src={profilePictureUrl(user.profile_picture)} />
                     <AvatarFallback>{user.name.charAt(0)}</AvatarFallback>
                   </Avatar>
                 </TableCell>
@@ -28,6 +28,7 @@ import {
 } from "../components/ui/dropdown-menu";
 import { Avatar, AvatarFallback, AvatarImage } from "../components/ui/avatar";
 import { useAuth } from '../hooks/useAuth';
+import { profilePictureUrl } from '../services/api';
 import { useTranslation } from 'react-i18next';
 import i18n from '../i18n/config';
 
@@ -202,7 +203,7 @@ const MainLayout: React.FC = () => {
               <DropdownMenuTrigger asChild>
                 <Button variant="ghost" className="relative h-8 w-8 rounded-full">
                   <Avatar className="h-8 w-8">
-                    <AvatarImage src={user?.profile_picture} alt={user?.name} />
+                    <AvatarImage src={profilePictureUrl(user?.profile_picture)} alt={user?.name} />
                     <AvatarFallback>
                       {user?.name?.charAt(0) || 'U'}
                     </AvatarFallback>
@@ -1,6 +1,7 @@
 import React from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card";
 import { userTypeService, userService } from "../services/userService";
+import { profilePictureUrl } from "../services/api";
 import { Alert, AlertDescription } from "../components/ui/alert";
 import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { UserTypeRoleAssignment } from "../components/users/UserTypeRoleAssignment";
@@ -39,7 +40,7 @@ const Users = () => {
       header: "Profile Picture", 
       accessor: "profile_picture",
       render: (user: any) => user.profile_picture ? 
-        <img src={user.profile_picture} alt="profile" className="w-10 h-10 rounded-full" /> : 
+        <img src={profilePictureUrl(user.profile_picture)} alt="profile" className="w-10 h-10 rounded-full" /> : 
         null
     }
   ];
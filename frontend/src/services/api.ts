@@ -30,4 +30,11 @@ api.interceptors.response.use(
     }
     return Promise.reject(error);
   }
-);
\ No newline at end of file
+);
+// Profile pictures are stored as blob references; older values may still be
+// inline data URLs or external links, which are used as they are.
+export const profilePictureUrl = (picture?: string | null, thumbnail = true) => {
+  if (!picture) return undefined;
+  if (!/^[0-9a-f]{64}$/.test(picture)) return picture;
+  return `${api.defaults.baseURL}/blobs/${picture}${thumbnail ? '/thumbnail' : ''}`;
+};